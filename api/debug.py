@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from services.auth import authorize_combined
+from services.profiling import list_profiles, load_profile, to_collapsed, to_speedscope
+
+# Only mounted when PROFILING_ENABLED=1
+router = APIRouter(prefix="/debug", dependencies=[Depends(authorize_combined)])
+
+
+@router.get("/profiles")
+def profiles():
+    return {"profiles": list_profiles()}
+
+
+@router.get("/profiles/{profile_id}")
+def profile(profile_id: str, format: str = Query("speedscope", pattern="^(speedscope|collapsed)$")):
+    data = load_profile(profile_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "collapsed":
+        return PlainTextResponse(to_collapsed(data))
+    return to_speedscope(data)
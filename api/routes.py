@@ -1,50 +1,269 @@
-import uuid
-from fastapi import APIRouter, BackgroundTasks, Query, Request, Depends
-from fastapi.responses import HTMLResponse
+from decimal import Decimal
+from functools import partial
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Request, Depends
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.templating import Jinja2Templates
-from models.request_models import PowRequest
-from models.response_models import ResultResponse
-from services.math_ops import compute_pow, compute_fibonacci, compute_factorial
-from services.background_tasks import store_and_compute_fibonacci
+from pydantic import ValidationError
+from models.request_models import ArrayPowRequest, BatchRequest, PowRequest
+from models.response_models import BatchResponse, ResultResponse
+from services.array_pow import (
+    ARRAY_MAX_BYTES, ARRAY_OPERATIONS, compute_arrays, np, parse_binary, to_bytes, to_json_list
+)
+from services.batch import run_batch
+from services.math_ops import (
+    POW_FUNCTIONS, compute_fibonacci, compute_fibonacci_mod, compute_factorial, pow_operation
+)
+from services.background_tasks import (
+    cancel_task, launch, store_and_compute_fibonacci, store_and_compute_fibonacci_mod,
+    store_and_compute_factorial, store_and_compute_pow_mode
+)
+from services.cost_model import INLINE, BACKGROUND, digits_label, route
+from services.result_cache import result_cache
+from services.lanes import expensive_lane, run_compute, run_io
+from services.metrics import CONTENT_TYPE, PAGE_CACHE_LOOKUPS, registry
+from services.page_cache import CACHE_CONTROL, http_date, not_modified, page_cache, page_etag
+from services.single_flight import flight_key, inline_flight, task_flight
+from services.task_runner import TASK_RETRY_AFTER, QueueFullError
 from storage.memory_store import store_request
-from storage.sqlite_store import store_request_sqlite, get_all_requests_sqlite
+from storage.sqlite_store import (
+    InvalidCursorError, decode_cursor, store_request_sqlite, get_requests_page,
+    get_requests_version, get_request_result
+)
+from services.result_view import digit_count, digit_range
 from services.auth import authorize_combined, ensure_logged_in
-from storage.task_store import get_all_tasks
+from storage.task_store import get_all_tasks, get_tasks_version
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
 
+HISTORY_PAGE_SIZE = 50
+MAX_DIGITS_PER_REQUEST = 100000
+
+
+def _pow_label(operation: str, args: tuple) -> str:
+    if operation == "pow_mod":
+        return f"{args[0]}^{args[1]} mod {args[2]}"
+    if operation == "pow_decimal":
+        return f"{args[0]}^{args[1]} ({args[2]} digits)"
+    return f"{args[0]}^{args[1]}"
+
 
 @router.post("/pow", response_model=ResultResponse)
-def pow_endpoint(req: PowRequest, _=Depends(authorize_combined)):
-    result = compute_pow(req.base, req.exponent)
-    store_request("pow", req.model_dump(), result)
-    store_request_sqlite("pow", req.model_dump(), result)
-    return {"result": result}
+async def pow_endpoint(
+    req: PowRequest,
+    background_tasks: BackgroundTasks = None,
+    _=Depends(authorize_combined)
+):
+    try:
+        operation, args = pow_operation(req.mode, req.base, req.exponent, req.modulus,
+                                        req.precision)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    input_data = req.model_dump(exclude_none=True)
+    start_task = partial(store_and_compute_pow_mode, operation, input_data, args)
+    return await _serve(operation, _pow_label(operation, args), input_data,
+                        POW_FUNCTIONS[operation], start_task, background_tasks, *args,
+                        record_as="pow")
+
+
+async def _serve(operation, label, input_data, compute, start_task, background_tasks, *args,
+                 record_as=None):
+    """Answer inline, start a background task or reject, by predicted cost.
+
+    start_task(task_id) schedules the background job; record_as names the
+    history operation when it differs from the cost-model operation.
+    """
+    decision = route(operation, *args)
+    if decision == INLINE:
+        try:
+            result = await run_compute(operation, compute, *args)
+        except (ArithmeticError, ValueError) as e:
+            raise HTTPException(status_code=422, detail=f"Cannot calculate {label}: {e}")
+        if isinstance(result, complex):
+            raise HTTPException(status_code=422, detail=f"{label} is not a real number")
+        store_request(record_as or operation, input_data, result)
+        await run_io(store_request_sqlite, record_as or operation, input_data, result)
+        # Decimals keep every digit of their precision as a string
+        return {"result": str(result) if isinstance(result, Decimal) else result}
+    if decision == BACKGROUND:
+        # Identical requests join the task that is already computing them
+        task_id, created = task_flight.claim(flight_key(operation, *args))
+        if created:
+            try:
+                await launch(background_tasks, start_task, task_id)
+            except QueueFullError as e:
+                raise HTTPException(status_code=503, detail=f"Server busy ({e}), retry later",
+                                    headers={"Retry-After": str(TASK_RETRY_AFTER)})
+        return {
+            "result": f"Task {task_id} started: Calculating {label} in background... "
+                      f"Check status at /status/{task_id}"
+        }
+    raise HTTPException(
+        status_code=422,
+        detail=f"Calculating {label} ({digits_label(operation, *args)}) would exceed the time limit"
+    )
 
 
 @router.get("/fibonacci", response_model=ResultResponse)
-def fibonacci_endpoint(
+async def fibonacci_endpoint(
     n: int = Query(..., ge=0),
+    mod: int | None = Query(None, ge=1),
     background_tasks: BackgroundTasks = None,
     _=Depends(authorize_combined)
 ):
-    task_id = str(uuid.uuid4())
-    background_tasks.add_task(store_and_compute_fibonacci, n, task_id)
-    return {
-        "result": f"Task {task_id} started: Calculating Fibonacci({n}) in background... Check status at /status/{task_id}"
-    }
+    if mod is not None:
+        # Residues stay below mod, so any n is cheap
+        return await _serve("fibonacci_mod", f"Fibonacci({n}) mod {mod}", {"n": n, "mod": mod},
+                            compute_fibonacci_mod, partial(store_and_compute_fibonacci_mod, n, mod),
+                            background_tasks, n, mod, record_as="fibonacci")
+    return await _serve("fibonacci", f"Fibonacci({n})", {"n": n}, compute_fibonacci,
+                        partial(store_and_compute_fibonacci, n), background_tasks, n)
 
 
 @router.get("/factorial", response_model=ResultResponse)
-def factorial_endpoint(
+async def factorial_endpoint(
     n: int = Query(..., ge=0),
+    background_tasks: BackgroundTasks = None,
+    _=Depends(authorize_combined)
+):
+    return await _serve("factorial", f"Factorial({n})", {"n": n}, compute_factorial,
+                        partial(store_and_compute_factorial, n), background_tasks, n)
+
+
+@router.post("/batch", response_model=BatchResponse)
+async def batch_endpoint(req: BatchRequest, _=Depends(authorize_combined)):
+    try:
+        results = await expensive_lane.run(run_batch, [item.model_dump() for item in req.items])
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return {"results": results}
+
+
+async def _read_body(request: Request, limit: int) -> bytearray:
+    length = request.headers.get("content-length")
+    too_large = HTTPException(status_code=413, detail=f"Body exceeds {limit} bytes")
+    if length is not None:
+        try:
+            length = int(length)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid Content-Length: {length!r}")
+        if length > limit:
+            raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise too_large
+    return body
+
+
+def _array_pow(operation: str, body, is_json: bool, base, exponent):
+    # Parsing a large JSON body costs as much as the pow, so both run in the lane
+    if is_json:
+        req = ArrayPowRequest.model_validate_json(body)
+        bases, exponents = (
+            np.asarray(values, dtype=np.float64) if isinstance(values, list) else values
+            for values in (req.bases, req.exponents)
+        )
+    else:
+        bases, exponents = parse_binary(body, base, exponent)
+    return compute_arrays(operation, bases, exponents)
+
+
+@router.post("/array/{operation}")
+async def array_pow_endpoint(
+    request: Request,
+    operation: str,
+    base: float = Query(None, description="Scalar base; the binary body holds exponents"),
+    exponent: float = Query(None, description="Scalar exponent; the binary body holds bases"),
+    _=Depends(authorize_combined)
+):
+    """Vectorized float pow (`pow`, `log_pow`, `log10_pow`) over many elements.
+
+    The body is little-endian float64 (application/octet-stream) or JSON
+    {"bases": [...], "exponents": [...]}. Binary bodies get a binary
+    response of float64 results, JSON bodies a JSON one unless they send
+    `Accept: application/octet-stream`. Results are not stored in the history.
+    """
+    if operation not in ARRAY_OPERATIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown array operation: {operation}")
+    if np is None:
+        raise HTTPException(status_code=501,
+                            detail="Array endpoints need NumPy (pip install -e .[fast])")
+    body = await _read_body(request, ARRAY_MAX_BYTES)
+    is_json = request.headers.get("content-type", "").split(";")[0].strip() == "application/json"
+    try:
+        results = await expensive_lane.run(_array_pow, operation, body, is_json, base, exponent)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if is_json and "application/octet-stream" not in request.headers.get("accept", ""):
+        return JSONResponse({"operation": operation, "count": len(results),
+                             "results": to_json_list(results)})
+    # The response body is the result array's own memory
+    return Response(to_bytes(results), media_type="application/octet-stream",
+                    headers={"X-Array-Length": str(len(results))})
+
+
+@router.get("/result/{request_id}/digits")
+async def result_digits(
+    request_id: int,
+    start: int = Query(0, ge=0),
+    length: int = Query(1000, ge=1, le=MAX_DIGITS_PER_REQUEST, alias="len"),
     _=Depends(authorize_combined)
 ):
-    result = compute_factorial(n)
-    store_request("factorial", {"n": n}, result)
-    store_request_sqlite("factorial", {"n": n}, result)
-    return {"result": result}
+    result = await run_io(get_request_result, request_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Result not found")
+    if isinstance(result, int):
+        total = digit_count(result)
+        digits = await expensive_lane.run(digit_range, result, start, length)
+    else:
+        # Legacy TEXT rows already hold the decimal string
+        total = len(result)
+        digits = result[start:start + length]
+    return {
+        "id": request_id,
+        "total_digits": total,
+        "start": start,
+        "length": len(digits),
+        "digits": digits
+    }
+
+
+@router.get("/cache/stats")
+def cache_stats(_=Depends(authorize_combined)):
+    return {
+        **result_cache.stats(),
+        "single_flight": {"inline": inline_flight.stats(), "tasks": task_flight.stats()}
+    }
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
+def _cached_page(request: Request, key: tuple, version: tuple, template: str, context) -> Response:
+    """Render a page once per write version and answer 304 to current copies.
+
+    The version is read before the page's queries, so a write made while
+    rendering only makes the cached copy newer than its version.
+    """
+    number, updated_at = version
+    etag = page_etag(key, number, updated_at)
+    headers = {"ETag": etag, "Last-Modified": http_date(updated_at), "Cache-Control": CACHE_CONTROL}
+    if not_modified(request.headers, etag, updated_at):
+        PAGE_CACHE_LOOKUPS.inc(page=key[0], result="not_modified")
+        return Response(status_code=304, headers=headers)
+    body = page_cache.get(key, number)
+    if body is None:
+        html = templates.get_template(template).render(request=request, **context())
+        body = html.encode("utf-8")
+        page_cache.put(key, number, body)
+    return HTMLResponse(body, headers=headers)
 
 
 @router.get("/history", response_class=HTMLResponse)
@@ -52,28 +271,43 @@ def view_history(
     request: Request,
     mode: str = Query("all"),
     operation: str = Query(None),
+    since: str = Query(None),
+    until: str = Query(None),
+    before: str = Query(None),
 ):
     auth_result = ensure_logged_in(request)
     if auth_result is not None:
         return auth_result
+    if before:
+        try:
+            decode_cursor(before)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-    all_history = get_all_requests_sqlite()
-    if mode == "last10":
-        history = all_history[:10]
-    elif mode == "filter" and operation:
-        history = [entry for entry in all_history if entry[1] == operation]
-    else:
-        history = all_history
-
-    return templates.TemplateResponse(
-        request,
-        "history.html",
-        {
+    def context():
+        if mode == "last10":
+            history, next_cursor = get_requests_page(limit=10, preview=True)
+            next_cursor = None
+        else:
+            history, next_cursor = get_requests_page(
+                limit=HISTORY_PAGE_SIZE,
+                operation=operation if mode == "filter" else None,
+                since=since,
+                until=until,
+                before=before,
+                preview=True
+            )
+        return {
             "history": history,
             "mode": mode,
-            "operation": operation or ""
+            "operation": operation or "",
+            "since": since or "",
+            "until": until or "",
+            "next_cursor": next_cursor
         }
-    )
+
+    key = ("history", mode, operation, since, until, before)
+    return _cached_page(request, key, get_requests_version(), "history.html", context)
 
 @router.get("/tasks", response_class=HTMLResponse)
 def view_tasks(request: Request):
@@ -81,9 +315,14 @@ def view_tasks(request: Request):
     if auth_result is not None:
         return auth_result
 
-    tasks = get_all_tasks()
-    return templates.TemplateResponse(
-        request,
-        "tasks.html",
-        {"tasks": tasks}
-    )
\ No newline at end of file
+    return _cached_page(request, ("tasks",), get_tasks_version(), "tasks.html",
+                        lambda: {"tasks": get_all_tasks()})
+
+@router.delete("/tasks/{task_id}", status_code=202)
+async def cancel_task_endpoint(task_id: str, _=Depends(authorize_combined)):
+    task = await run_io(cancel_task, task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if task["status"] not in ("cancelling", "cancelled"):
+        raise HTTPException(status_code=409, detail=f"Task is already {task['status']}")
+    return task
@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from benchmarks.harness import benchmark, measure
+from cli.daemon import ping, stop
+
+REPEAT = {"quick": 5, "full": 20}
+ROOT = str(Path(__file__).resolve().parent.parent)
+# What cli/main.py used to import before commands were loaded lazily
+EAGER_IMPORT = (
+    "import cli.main as m; [m.cli.get_command(None, name) for name in m.cli.list_commands(None)]"
+)
+
+
+def _runner(workdir: str, **env):
+    environment = {**os.environ, "PYTHONPATH": ROOT, "MATHCLI_DAEMON": "0", **env}
+
+    def run(*args):
+        subprocess.run([sys.executable, *args], cwd=workdir, env=environment,
+                       capture_output=True, check=True)
+    return run
+
+
+@benchmark("cli_import", "cli")
+def bench_import(profile):
+    repeat = REPEAT[profile]
+    with tempfile.TemporaryDirectory() as workdir:
+        run = _runner(workdir)
+        yield "interpreter", measure(lambda: run("-c", "pass"), repeat)
+        yield "lazy", measure(lambda: run("-c", "import cli.main"), repeat)
+        yield "eager", measure(lambda: run("-c", EAGER_IMPORT), repeat)
+
+
+@benchmark("cli_command", "cli")
+def bench_command(profile):
+    """Whole CLI calls, in a fresh interpreter and through a warm daemon."""
+    repeat = REPEAT[profile]
+    with tempfile.TemporaryDirectory() as workdir:
+        os.makedirs(os.path.join(workdir, "storage"))
+        run = _runner(workdir)
+        # The commands expect the tables the server creates at startup
+        run("-c", "from storage.sqlite_store import init_db; from storage.task_store import "
+                  "init_task_db; init_db(); init_task_db()")
+        status = ("-m", "cli.main", "status", "--task-id", "missing")
+        factorial = ("-m", "cli.main", "factorial", "--n", "1000")
+        yield "status", measure(lambda: run(*status), repeat)
+        yield "factorial", measure(lambda: run(*factorial), repeat)
+
+        socket_path = os.path.join(workdir, "storage", "mathcli.sock")
+        daemon = subprocess.Popen([sys.executable, "-m", "cli.daemon"], cwd=workdir,
+                                  env={**os.environ, "PYTHONPATH": ROOT},
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            deadline = time.monotonic() + 30
+            while ping(socket_path) is None and time.monotonic() < deadline:
+                time.sleep(0.05)
+            run = _runner(workdir, MATHCLI_DAEMON="1")
+            yield "status_daemon", measure(lambda: run(*status), repeat)
+            yield "factorial_daemon", measure(lambda: run(*factorial), repeat)
+        finally:
+            stop(socket_path)
+            daemon.wait(timeout=30)
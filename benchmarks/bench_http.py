@@ -0,0 +1,55 @@
+import time
+from benchmarks.harness import benchmark, summarize_samples
+
+REQUESTS = {"quick": 200, "full": 2000}
+
+
+def _client():
+    # Imported lazily: main initializes the databases run.py points at
+    from fastapi.testclient import TestClient
+    from main import app
+    from services.auth import API_KEY, USERNAME, set_session
+
+    client = TestClient(app)
+    if API_KEY:
+        client.headers["X-API-Key"] = API_KEY
+    client.cookies.set("session", set_session(USERNAME))
+    return client
+
+
+def _load(client, count: int, method: str, url_for, **kwargs) -> dict:
+    samples = []
+    started = time.perf_counter()
+    for i in range(count):
+        start = time.perf_counter()
+        response = client.request(method, url_for(i), **kwargs)
+        samples.append(time.perf_counter() - start)
+        if response.status_code != 304:
+            response.raise_for_status()
+    elapsed = time.perf_counter() - started
+    return summarize_samples(samples, requests_per_second=count / elapsed)
+
+
+@benchmark("http_pow", "http")
+def bench_pow(profile):
+    client = _client()
+    count = REQUESTS[profile]
+    yield "same", _load(client, count, "POST", lambda i: "/pow", json={"base": 2, "exponent": 10})
+
+
+@benchmark("http_factorial", "http")
+def bench_factorial(profile):
+    client = _client()
+    count = REQUESTS[profile]
+    yield "cached", _load(client, count, "GET", lambda i: "/factorial?n=2000")
+    yield "distinct", _load(client, count, "GET", lambda i: f"/factorial?n={1000 + i}")
+
+
+@benchmark("http_history", "http")
+def bench_history(profile):
+    client = _client()
+    count = REQUESTS[profile] // 4
+    yield "first_page", _load(client, count, "GET", lambda i: "/history")
+    etag = client.get("/history").headers["etag"]
+    yield "not_modified", _load(client, count, "GET", lambda i: "/history",
+                                headers={"If-None-Match": etag})
@@ -0,0 +1,66 @@
+from benchmarks.harness import benchmark, measure
+from services.array_pow import compute_arrays, np
+from services.checkpoints import factorial_checkpoints, fibonacci_checkpoints
+from services.math_ops import compute_factorial, compute_fibonacci, compute_pow
+
+# Sizes per profile; "full" adds the expensive top rungs
+LADDERS = {
+    "factorial": {"quick": [1000, 10000, 100000], "full": [1000, 10000, 100000, 1000000]},
+    "fibonacci": {"quick": [10000, 100000, 1000000], "full": [10000, 100000, 1000000, 10000000]},
+    "pow": {"quick": [1000, 100000, 1000000], "full": [1000, 100000, 1000000, 10000000]},
+    "array_pow": {"quick": [1000, 1000000], "full": [1000, 1000000, 10000000]},
+}
+
+
+def _repeat(profile: str, n: int, large: int) -> int:
+    return 1 if n >= large else 5 if profile == "quick" else 10
+
+
+def _uncached(fn):
+    # Measure the engine itself, not the result cache or resume checkpoints
+    def run(*args):
+        factorial_checkpoints.clear()
+        fibonacci_checkpoints.clear()
+        return fn.__wrapped__(*args)
+    return run
+
+
+@benchmark("compute_factorial", "math")
+def bench_factorial(profile):
+    compute = _uncached(compute_factorial)
+    for n in LADDERS["factorial"][profile]:
+        yield n, measure(lambda: compute(n), repeat=_repeat(profile, n, 1000000))
+
+
+@benchmark("compute_fibonacci", "math")
+def bench_fibonacci(profile):
+    compute = _uncached(compute_fibonacci)
+    for n in LADDERS["fibonacci"][profile]:
+        yield n, measure(lambda: compute(n), repeat=_repeat(profile, n, 10000000))
+
+
+@benchmark("compute_pow", "math")
+def bench_pow(profile):
+    compute = _uncached(compute_pow)
+    yield "float", measure(lambda: compute(2.5, 10.3), repeat=1000)
+    for exp in LADDERS["pow"][profile]:
+        yield f"3^{exp}", measure(lambda: compute(3, exp), repeat=_repeat(profile, exp, 10000000))
+
+
+@benchmark("compute_array_pow", "math")
+def bench_array_pow(profile):
+    if np is None:
+        return
+    rng = np.random.default_rng(0)
+    for n in LADDERS["array_pow"][profile]:
+        bases, exponents = rng.uniform(0.5, 2, n), rng.uniform(-10, 10, n)
+        for operation in ("pow", "log_pow"):
+            stats = measure(lambda: compute_arrays(operation, bases, exponents), repeat=5)
+            stats["elements_per_second"] = n / stats["median"]
+            yield f"{operation}_{n}", stats
+    # The same pows one call at a time, for comparison
+    scalar = compute_pow.__wrapped__
+    pairs = list(zip(bases[:100000].tolist(), exponents[:100000].tolist()))
+    stats = measure(lambda: [scalar(b, e) for b, e in pairs], repeat=3)
+    stats["elements_per_second"] = len(pairs) / stats["median"]
+    yield "scalar_loop_100000", stats
@@ -0,0 +1,55 @@
+from benchmarks.harness import benchmark, measure
+from services.export import stream_export
+from storage import sqlite_store
+from storage.engine import flush
+
+ROW_COUNTS = {"quick": [1000, 10000], "full": [1000, 10000, 100000, 1000000]}
+
+
+def _reset():
+    with sqlite_store.get_connection(sqlite_store.DB_FILE) as conn:
+        conn.execute("DELETE FROM requests")
+
+
+def _store(count: int):
+    for i in range(count):
+        sqlite_store.store_request_sqlite("pow", {"base": 2, "exponent": i}, 2.0 ** (i % 1000))
+    flush(sqlite_store.DB_FILE)
+
+
+def _repeat(count: int) -> int:
+    return 3 if count <= 10000 else 1
+
+
+def _rate(stats: dict, count: int) -> dict:
+    stats["rows_per_second"] = count / stats["median"]
+    return stats
+
+
+@benchmark("store_request_sqlite", "storage")
+def bench_store(profile):
+    for count in ROW_COUNTS[profile]:
+        stats = measure(lambda: _store(count), repeat=_repeat(count), setup=_reset)
+        yield count, _rate(stats, count)
+
+
+@benchmark("get_all_requests_sqlite", "storage")
+def bench_read_all(profile):
+    for count in ROW_COUNTS[profile]:
+        _reset()
+        _store(count)
+        stats = measure(sqlite_store.get_all_requests_sqlite, repeat=_repeat(count))
+        yield count, _rate(stats, count)
+
+
+@benchmark("export_csv", "storage")
+def bench_export(profile):
+    for count in ROW_COUNTS[profile]:
+        _reset()
+        _store(count)
+
+        def export():
+            for _ in stream_export(sqlite_store.iter_requests_sqlite(), "csv"):
+                pass
+
+        yield count, _rate(measure(export, repeat=_repeat(count)), count)
@@ -0,0 +1,115 @@
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, UTC
+
+# name -> (function, tags); functions take the size profile and yield results
+BENCHMARKS = {}
+
+
+def benchmark(name: str, group: str):
+    """Register fn(profile) -> iterable of (case, stats dict) under name."""
+    def register(fn):
+        BENCHMARKS[name] = (fn, group)
+        return fn
+    return register
+
+
+def percentile(samples: list, q: float) -> float:
+    ordered = sorted(samples)
+    index = min(int(round(q / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize_samples(samples: list, **extra) -> dict:
+    stats = {
+        "runs": len(samples),
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+    }
+    stats.update(extra)
+    return stats
+
+
+def measure(fn, repeat: int = 5, setup=None, **extra) -> dict:
+    """Time fn() repeat times (after optional setup() each time), in seconds."""
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize_samples(samples, **extra)
+
+
+@contextlib.contextmanager
+def quiet():
+    # Keep print() calls in the measured code out of the report
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(profile: str, groups=None, log=print) -> dict:
+    results = {}
+    for name, (fn, group) in BENCHMARKS.items():
+        if groups and group not in groups:
+            continue
+        log(f"[{group}] {name}")
+        with quiet():
+            cases = list(fn(profile))
+        for case, stats in cases:
+            key = f"{name}[{case}]"
+            results[key] = stats
+            log(f"  {key:<40} median {stats['median'] * 1000:10.3f} ms"
+                f"   p95 {stats['p95'] * 1000:10.3f} ms")
+    return {
+        "meta": {
+            "profile": profile,
+            "timestamp": datetime.now(UTC).isoformat(),
+            "commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.25) -> list:
+    """Rows of (name, baseline median, current median, ratio, regressed)."""
+    rows = []
+    for name, stats in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None or not base["median"]:
+            continue
+        ratio = stats["median"] / base["median"]
+        rows.append((name, base["median"], stats["median"], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(report: dict, path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
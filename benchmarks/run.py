@@ -0,0 +1,67 @@
+"""Benchmark the math engines, storage and HTTP endpoints.
+
+    python -m benchmarks.run [--profile quick|full] [--group math] [--output FILE]
+    python -m benchmarks.run --compare benchmarks/results/baseline.json
+
+Everything runs against throwaway databases in a temporary directory.
+"""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import click
+
+_workdir = tempfile.mkdtemp(prefix="math-bench-")
+atexit.register(shutil.rmtree, _workdir, ignore_errors=True)
+# Must be set before the services read their configuration
+os.environ.setdefault("RESULT_CACHE_DB", str(Path(_workdir) / "result_cache.db"))
+
+from benchmarks import harness  # noqa: E402
+from storage import sqlite_store, task_store  # noqa: E402
+
+sqlite_store.DB_FILE = Path(_workdir) / "math_requests.db"
+task_store.DB_FILE = Path(_workdir) / "background_tasks.db"
+sqlite_store.init_db()
+task_store.init_task_db()
+
+from benchmarks import bench_math, bench_storage, bench_http, bench_cli  # noqa: E402,F401
+
+GROUPS = ["math", "storage", "http", "cli"]
+
+
+@click.command()
+@click.option('--profile', type=click.Choice(["quick", "full"]), default="quick", show_default=True,
+              help='Size ladder: quick for CI, full goes up to 10^6 rows / 10^7 digits')
+@click.option('--group', 'groups', multiple=True, type=click.Choice(GROUPS),
+              help='Only run these groups (repeatable)')
+@click.option('--output', default="benchmarks/results/latest.json", show_default=True,
+              help='Where to write the JSON report')
+@click.option('--compare', 'baseline', default=None, help='Baseline JSON to check for regressions')
+@click.option('--threshold', default=0.25, show_default=True,
+              help='Allowed slowdown of the median before flagging (0.25 = 25%)')
+def main(profile, groups, output, baseline, threshold):
+    """Run the benchmark suite and optionally compare against a baseline."""
+    report = harness.run(profile, set(groups), log=lambda line: click.echo(line, err=True))
+    harness.save(report, output)
+    click.secho(f"Wrote {len(report['results'])} results to {output}", fg="green")
+    if baseline is None:
+        return
+
+    rows = harness.compare(harness.load(baseline), report, threshold)
+    regressions = [row for row in rows if row[4]]
+    for name, before, after, ratio, regressed in rows:
+        click.secho(
+            f"{name:<44} {before * 1000:10.3f} ms -> {after * 1000:10.3f} ms  {ratio:6.2f}x",
+            fg="red" if regressed else "green" if ratio < 1 - threshold else None
+        )
+    if regressions:
+        click.secho(f"{len(regressions)} regression(s) over {threshold:.0%}", fg="red")
+        sys.exit(1)
+    click.secho("No regressions", fg="green")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Thin front end that forwards CLI calls to a running `daemon`.
+
+Only the standard library is imported here, so a call answered by the
+daemon skips loading click, the math engines and SQLite. Without a
+daemon (or with MATHCLI_DAEMON=0) the command runs in this process.
+"""
+import json
+import os
+import socket
+import sys
+
+# Relative, like the databases: each project directory gets its own daemon
+SOCKET_PATH = os.getenv("MATHCLI_SOCKET", os.path.join("storage", "mathcli.sock"))
+# Commands that manage processes or read stdin always run locally
+LOCAL_COMMANDS = {"daemon", "worker"}
+
+
+def send(sock, message: dict):
+    sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+def receive(sock):
+    """Yield the JSON messages of a connection, one per line."""
+    with sock.makefile("rb") as lines:
+        for line in lines:
+            yield json.loads(line)
+
+
+def connect(path: str = SOCKET_PATH):
+    """Open a connection to the daemon, or return None when none is listening."""
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        # Socket file left behind by a daemon that was killed
+        sock.close()
+        return None
+    return sock
+
+
+def call_daemon(argv: list):
+    """Run argv in the daemon; returns its exit code, or None to run it locally."""
+    sock = connect()
+    if sock is None:
+        return None
+    with sock:
+        send(sock, {"args": argv, "env": dict(os.environ), "color": sys.stdout.isatty(),
+                    "cwd": os.getcwd()})
+        for message in receive(sock):
+            if message.get("local"):
+                return None
+            sys.stdout.write(message.get("stdout", ""))
+            sys.stderr.write(message.get("stderr", ""))
+            if "exit" in message:
+                return message["exit"]
+    # The command may already have run, so it is not retried locally
+    sys.stderr.write("mathcli daemon closed the connection\n")
+    return 1
+
+
+def main(argv=None, local=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    use_daemon = os.getenv("MATHCLI_DAEMON", "1") != "0"
+    if use_daemon and argv and argv[0] not in LOCAL_COMMANDS and "-" not in argv:
+        code = call_daemon(argv)
+        if code is not None:
+            sys.exit(code)
+    if local is None:
+        from cli.main import cli as local
+    local(args=argv)
+
+
+if __name__ == "__main__":
+    main()
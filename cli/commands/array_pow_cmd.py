@@ -0,0 +1,49 @@
+import os
+import click
+from services.array_pow import ARRAY_OPERATIONS, compute_arrays, np
+
+def _operand(path, value, name):
+    if (path is None) == (value is None):
+        raise click.UsageError(f"Give exactly one of --{name}s and --{name}")
+    if path is None:
+        return value
+    # Memory-mapped, so only the chunk being computed is read into memory
+    array = np.load(path, mmap_mode="r")
+    if not np.issubdtype(array.dtype, np.number):
+        raise click.BadParameter(f"{path} holds {array.dtype}, not numbers",
+                                 param_hint=f"--{name}s")
+    return array
+
+@click.command(name="array-pow")
+@click.option('--bases', 'bases_path', type=click.Path(exists=True, dir_okay=False),
+              help='.npy file of bases')
+@click.option('--base', type=float, help='One base for every exponent')
+@click.option('--exponents', 'exponents_path', type=click.Path(exists=True, dir_okay=False),
+              help='.npy file of exponents')
+@click.option('--exponent', type=float, help='One exponent for every base')
+@click.option('--op', 'operation', type=click.Choice(ARRAY_OPERATIONS), default='pow',
+              show_default=True,
+              help='pow, or the natural/base-10 log of the power')
+@click.option('--output', required=True, type=click.Path(dir_okay=False),
+              help='.npy file for the float64 results')
+def array_pow(bases_path, base, exponents_path, exponent, operation, output):
+    """Compute float powers of whole .npy arrays (results are not stored in the history)."""
+    if np is None:
+        raise click.ClickException("array-pow needs NumPy (pip install -e .[fast])")
+    bases = _operand(bases_path, base, "base")
+    exponents = _operand(exponents_path, exponent, "exponent")
+    inputs = [path for path in (bases_path, exponents_path) if path is not None]
+    if any(os.path.exists(output) and os.path.samefile(output, path) for path in inputs):
+        raise click.UsageError("--output must not overwrite an input file")
+    shapes = {np.shape(values) for values in (bases, exponents) if np.ndim(values) != 0}
+    if not shapes:
+        raise click.UsageError("Give --bases or --exponents as a .npy array")
+    if len(shapes) > 1:
+        raise click.ClickException(f"Shapes differ: {' vs '.join(map(str, sorted(shapes)))}")
+    shape = shapes.pop()
+    flat = [values.reshape(-1) if np.ndim(values) != 0 else values for values in (bases, exponents)]
+    # Results are written straight into the output file, chunk by chunk
+    results = np.lib.format.open_memmap(output, mode="w+", dtype="<f8", shape=shape)
+    compute_arrays(operation, *flat, out=results.reshape(-1))
+    results.flush()
+    click.secho(f"→ {operation} of {results.size} elements written to {output}", fg="cyan")
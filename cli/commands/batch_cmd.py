@@ -0,0 +1,37 @@
+import json
+import click
+from services.batch import run_batch
+from storage.sqlite_store import result_to_text
+
+@click.command()
+@click.option('--input', 'input_file', required=True, type=click.File('r'),
+              help='JSONL file, one operation per line (e.g. {"op": "factorial", "n": 5})')
+@click.option('--output', default=None, type=click.File('w'),
+              help='Write results as JSONL to this file instead of the terminal')
+def batch(input_file, output):
+    """Run many operations from a JSONL file and store them in one transaction."""
+    items = []
+    for line_no, line in enumerate(input_file, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            items.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            raise click.ClickException(f"Line {line_no}: invalid JSON ({e})")
+
+    results = run_batch(items)
+    failed = 0
+    for item, outcome in zip(items, results):
+        if outcome["error"]:
+            failed += 1
+        else:
+            outcome = {"result": result_to_text(outcome["result"]), "error": None}
+        line = json.dumps({"input": item, **outcome})
+        if output:
+            output.write(line + "\n")
+        else:
+            click.echo(line)
+
+    click.secho(f"Processed {len(items)} operations ({failed} failed). Stored in SQLite.",
+                fg="yellow" if failed else "green", err=output is None)
@@ -0,0 +1,15 @@
+import click
+from storage.task_store import get_task, request_cancel
+
+@click.command()
+@click.option('--task-id', required=True, help='Task ID to cancel')
+def cancel(task_id):
+    """Cancel a queued or running background task."""
+    task = get_task(task_id)
+    if not task:
+        click.secho(f"No task found with ID: {task_id}", fg="red")
+    elif request_cancel(task_id):
+        # The worker checks this flag between steps and frees itself
+        click.secho(f"Cancellation requested for task {task_id}.", fg="yellow")
+    else:
+        click.secho(f"Task {task_id} is already {task['status']}.", fg="white")
@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+import time
+import click
+from cli import daemon as daemon_process
+from cli.client import SOCKET_PATH
+
+# Seconds `daemon start` waits for the new process to answer
+START_TIMEOUT = 30.0
+
+@click.group()
+def daemon():
+    """Keep a warm CLI process so repeated calls skip startup and reuse caches."""
+    pass
+
+@daemon.command()
+def start():
+    """Start the daemon in the background."""
+    pid = daemon_process.ping()
+    if pid is not None:
+        click.secho(f"Daemon already running (pid {pid}).", fg="white")
+        return
+    log_path = os.path.join(os.path.dirname(SOCKET_PATH) or ".", "mathcli-daemon.log")
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    with open(log_path, "ab") as log:
+        subprocess.Popen([sys.executable, "-m", "cli.daemon"], stdin=subprocess.DEVNULL,
+                         stdout=log, stderr=log, start_new_session=True)
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        pid = daemon_process.ping()
+        if pid is not None:
+            click.secho(f"Daemon started (pid {pid}), listening on {SOCKET_PATH}.", fg="green")
+            return
+        time.sleep(0.05)
+    raise click.ClickException(f"Daemon did not start; see {log_path}")
+
+@daemon.command()
+def stop():
+    """Stop the running daemon."""
+    if daemon_process.stop():
+        click.secho("Daemon stopped.", fg="yellow")
+    else:
+        click.secho("No daemon running.", fg="white")
+
+@daemon.command()
+def status():
+    """Show whether a daemon is running."""
+    pid = daemon_process.ping()
+    if pid is None:
+        click.secho("No daemon running.", fg="white")
+    else:
+        click.secho(f"Daemon running (pid {pid}) on {SOCKET_PATH}.", fg="green")
+
+@daemon.command()
+def run():
+    """Run the daemon in the foreground."""
+    click.secho(f"Listening on {SOCKET_PATH} (Ctrl+C to stop).", fg="cyan")
+    try:
+        daemon_process.serve()
+    except KeyboardInterrupt:
+        pass
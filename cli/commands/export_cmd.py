@@ -1,25 +1,32 @@
 import click
-import csv
 from datetime import datetime
-from storage.sqlite_store import get_all_requests_sqlite
+from services.export import EXPORT_FORMATS, export_filename, stream_export
+from storage.sqlite_store import iter_requests_sqlite
 
 @click.command()
 @click.option('--operation', type=click.Choice(['pow', 'fibonacci', 'factorial', 'all']), default='all',
               help="Which operation to export (default: all)")
-@click.option('--output', default=None, help='Output CSV file path (optional)')
-def export(operation, output):
-    """Export operation history from SQLite to a CSV file."""
+@click.option('--output', default=None, help='Output file path (optional)')
+@click.option('--format', 'fmt', type=click.Choice(list(EXPORT_FORMATS)), default='csv',
+              help="Output format: csv, ndjson or columnar (default: csv)")
+@click.option('--gzip', is_flag=True, help='Gzip-compress the output')
+def export(operation, output, fmt, gzip):
+    """Export operation history from SQLite to a CSV, NDJSON or columnar file."""
     if output is None:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output = f"history_export_{operation}_{timestamp}.csv"
+        output = export_filename(f"history_export_{operation}_{timestamp}", fmt, gzip)
 
-    all_records = get_all_requests_sqlite()
-    records = [r for r in all_records if r[1] == operation] if operation != 'all' else all_records
+    count = 0
 
-    with open(output, "w", newline="") as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(["id", "operation", "input_data", "result", "timestamp"])
-        for row in records:
-            writer.writerow(row)
+    def counted(rows):
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
 
-    click.secho(f"Exported {len(records)} records to '{output}'.", fg="yellow")
+    records = iter_requests_sqlite(operation if operation != 'all' else None)
+    with open(output, "wb") as out:
+        for chunk in stream_export(counted(records), fmt, gzip=gzip):
+            out.write(chunk)
+
+    click.secho(f"Exported {count} records to '{output}'.", fg="yellow")
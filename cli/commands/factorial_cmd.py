@@ -1,12 +1,16 @@
 import click
 from services.math_ops import compute_factorial
+from services.result_view import summarize
 from storage.sqlite_store import store_request_sqlite
 
+# Digits echoed to the terminal (all of them are stored)
+MAX_PRINT_DIGITS = 1000
+
 @click.command()
 @click.option('--n', required=True, type=int, help='Number to calculate factorial of (e.g., 5)')
 def factorial(n):
     """Calculate the factorial of n and store the result."""
     result = compute_factorial(n)
-    click.secho(f"→ {n}! = {result}", fg="cyan")
+    click.secho(f"→ {n}! = {summarize(result, MAX_PRINT_DIGITS)}", fg="cyan")
     store_request_sqlite("factorial", {"n": n}, result)
     click.secho("Stored in SQLite.", fg="green")
@@ -1,12 +1,24 @@
 import click
-from services.math_ops import compute_fibonacci
+from services.math_ops import compute_fibonacci, compute_fibonacci_mod
+from services.result_view import summarize
 from storage.sqlite_store import store_request_sqlite
 
+# Digits echoed to the terminal (all of them are stored)
+MAX_PRINT_DIGITS = 1000
+
 @click.command()
 @click.option('--n', required=True, type=int, help='Index of the Fibonacci number (e.g., 8)')
-def fibonacci(n):
+@click.option('--mod', type=click.IntRange(min=1), default=None,
+              help='Only compute the number modulo this (fast for any n)')
+def fibonacci(n, mod):
     """Calculate the nth Fibonacci number and store the result."""
+    if mod is not None:
+        result = compute_fibonacci_mod(n, mod)
+        click.secho(f"→ Fibonacci({n}) mod {mod} = {result}", fg="cyan")
+        store_request_sqlite("fibonacci", {"n": n, "mod": mod}, result)
+        click.secho("Stored in SQLite.", fg="green")
+        return
     result = compute_fibonacci(n)
-    click.secho(f"→ Fibonacci({n}) = {result}", fg="cyan")
+    click.secho(f"→ Fibonacci({n}) = {summarize(result, MAX_PRINT_DIGITS)}", fg="cyan")
     store_request_sqlite("fibonacci", {"n": n}, result)
     click.secho("Stored in SQLite.", fg="green")
@@ -0,0 +1,42 @@
+import json
+import click
+from services.maintenance import RETENTION_ARCHIVE, run_maintenance
+from storage.sqlite_store import init_db
+from storage.task_store import init_task_db
+
+def _mb(size):
+    return f"{size / 1e6:.1f} MB"
+
+@click.command()
+@click.option('--dry-run', is_flag=True, help='Only report what would be deduplicated and expired')
+@click.option('--vacuum/--no-vacuum', default=True, show_default=True,
+              help='Return free pages to the filesystem afterwards')
+@click.option('--json', 'as_json', is_flag=True, help='Print the report as JSON')
+def maintenance(dry_run, vacuum, as_json):
+    """Deduplicate results, apply retention policies and vacuum the databases."""
+    init_db()
+    init_task_db()
+    report = run_maintenance(dry_run=dry_run, vacuum=vacuum)
+    if as_json:
+        click.echo(json.dumps(report, indent=2))
+        return
+    requests, tasks = report["requests"], report["tasks"]
+    verb = "archived" if RETENTION_ARCHIVE else "deleted"
+    if dry_run:
+        verb = f"would be {verb}"
+    dedupe = requests["dedupe"]
+    if dry_run:
+        click.secho(f"Results to deduplicate: {dedupe['moved']} rows", fg="cyan")
+    else:
+        click.secho(f"Results deduplicated: {dedupe['moved']} rows, "
+                    f"{_mb(dedupe['bytes_saved'])} saved", fg="cyan")
+    click.secho(f"History rows {verb}: {requests['expired']}", fg="yellow")
+    click.secho(f"Task rows {verb}: {tasks['expired']}", fg="yellow")
+    for archive in requests["archives"] + tasks["archives"]:
+        click.echo(f"  → {archive}")
+    for name, part in (("requests", requests), ("tasks", tasks)):
+        if "vacuum" in part:
+            vacuum_report = part["vacuum"]
+            note = " (rebuilt once for incremental vacuum)" if vacuum_report["converted"] else ""
+            freed = _mb(vacuum_report['bytes_freed'])
+            click.secho(f"Vacuumed {name} database: {freed} freed{note}", fg="green")
@@ -1,13 +1,41 @@
 import click
-from services.math_ops import compute_pow
+from services.math_ops import POW_FUNCTIONS, POW_MODES, pow_operation
+from services.result_view import summarize
 from storage.sqlite_store import store_request_sqlite
 
+# Digits of exact results echoed to the terminal (all of them are stored)
+MAX_PRINT_DIGITS = 1000
+
+def _parse(value: str, mode: str):
+    if mode == "float":
+        return float(value)
+    if mode == "decimal":
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        raise click.BadParameter(f"{value!r} is not an integer (needed for --mode {mode})")
+
 @click.command()
-@click.option('--base', required=True, type=float, help='Base number (e.g., 2)')
-@click.option('--exp', required=True, type=float, help='Exponent (e.g., 5)')
-def pow(base, exp):
+@click.option('--base', required=True, help='Base number (e.g., 2)')
+@click.option('--exp', required=True, help='Exponent (e.g., 5)')
+@click.option('--mode', type=click.Choice(POW_MODES), default="float", show_default=True,
+              help='float, exact int, modular (needs --mod) or decimal (see --precision)')
+@click.option('--mod', 'modulus', type=int, default=None, help='Modulus for --mode mod')
+@click.option('--precision', type=int, default=None, help='Significant digits for --mode decimal')
+def pow(base, exp, mode, modulus, precision):
     """Calculate base raised to exponent and store the result."""
-    result = compute_pow(base, exp)
-    click.secho(f"→ {base}^{exp} = {result}", fg="cyan")
-    store_request_sqlite("pow", {"base": base, "exp": exp}, result)
+    base, exp = _parse(base, mode), _parse(exp, mode)
+    try:
+        operation, args = pow_operation(mode, base, exp, modulus, precision)
+        result = POW_FUNCTIONS[operation](*args)
+    except (ArithmeticError, ValueError) as e:
+        raise click.ClickException(str(e))
+    suffix = f" mod {modulus}" if mode == "mod" else ""
+    click.secho(f"→ {base}^{exp}{suffix} = {summarize(result, MAX_PRINT_DIGITS)}", fg="cyan")
+    input_data = {"base": base, "exp": exp}
+    if mode != "float":
+        input_data.update({"mode": mode, "modulus": modulus, "precision": precision})
+        input_data = {k: v for k, v in input_data.items() if v is not None}
+    store_request_sqlite("pow", input_data, result)
     click.secho("Stored in SQLite.", fg="green")
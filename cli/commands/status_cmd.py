@@ -1,14 +1,70 @@
+import os
+import time
 import click
 from storage.task_store import get_task
 
+TERMINAL_STATUSES = {"done", "failed", "rejected", "cancelled"}
+# Interval for polling the local database when the server is unreachable
+LOCAL_POLL_SECONDS = 1.0
+
+def _show(task):
+    click.secho(f"Task ID: {task['task_id']}", fg="cyan")
+    click.secho(f"Status: {task['status']}", fg="yellow")
+    click.secho(f"Result: {task['result']}", fg="green" if task['status'] == "done" else "white")
+
+def _wait_remote(url, task_id, deadline):
+    import httpx  # only needed for --wait; it dominates the command's import time
+    headers = {"X-API-Key": os.environ["API_KEY"]} if os.getenv("API_KEY") else {}
+    since = 0
+    with httpx.Client(base_url=url, headers=headers) as client:
+        while True:
+            remaining = deadline - time.monotonic()
+            poll = max(min(remaining, 30.0), 0.1)
+            response = client.get(
+                f"/status/{task_id}/wait",
+                params={"since": since, "timeout": poll},
+                timeout=poll + 10
+            )
+            response.raise_for_status()
+            task = response.json()
+            if task.get("version", 0) > since and task.get("progress") is not None:
+                click.secho(f"Progress: {task['progress']:.0%}", fg="blue", err=True)
+            since = task.get("version", since)
+            if task["status"] in TERMINAL_STATUSES or task["status"] == "not found":
+                return task
+            if remaining <= 0:
+                return task
+
+def _wait_local(task_id, deadline):
+    while True:
+        task = get_task(task_id)
+        if not task or task["status"] in TERMINAL_STATUSES or time.monotonic() >= deadline:
+            return task
+        time.sleep(LOCAL_POLL_SECONDS)
+
 @click.command()
 @click.option('--task-id', required=True, help='Task ID to check status for')
-def status(task_id):
+@click.option('--wait', is_flag=True, help='Block until the task finishes')
+@click.option('--timeout', default=600.0, show_default=True,
+              help='Give up waiting after this many seconds')
+@click.option('--url', default=lambda: os.getenv("MATH_API_URL", "http://localhost:8000"),
+              show_default="MATH_API_URL or http://localhost:8000",
+              help='Server to long-poll when waiting')
+def status(task_id, wait, timeout, url):
     """Check the status and result of a background task."""
-    task = get_task(task_id)
+    if wait:
+        import httpx
+        deadline = time.monotonic() + timeout
+        try:
+            task = _wait_remote(url, task_id, deadline)
+            if task["status"] == "not found":
+                task = None
+        except httpx.HTTPError:
+            # No server to push updates; watch the task table directly
+            task = _wait_local(task_id, deadline)
+    else:
+        task = get_task(task_id)
     if not task:
         click.secho(f"No task found with ID: {task_id}", fg="red")
     else:
-        click.secho(f"Task ID: {task['task_id']}", fg="cyan")
-        click.secho(f"Status: {task['status']}", fg="yellow")
-        click.secho(f"Result: {task['result']}", fg="green" if task['status'] == "done" else "white")
+        _show(task)
@@ -0,0 +1,35 @@
+import multiprocessing
+import signal
+import click
+from services.task_worker import run_worker
+
+@click.command()
+@click.option('--concurrency', default=1, show_default=True, type=click.IntRange(min=1),
+              help='Worker processes to run')
+@click.option('--burst', is_flag=True, help='Exit once the queue is empty')
+def worker(concurrency, burst):
+    """Run durable background jobs (start the server with TASK_BACKEND=queue)."""
+    plural = "es" if concurrency > 1 else ""
+    click.secho(f"Worker started ({concurrency} process{plural}).", fg="cyan")
+    if concurrency == 1:
+        completed = run_worker(burst)
+        click.secho(f"Worker stopped after {completed} job(s).", fg="green")
+        return
+    # Each process claims jobs on its own; Ctrl+C or SIGTERM stops them all
+    # after their running jobs went back to the queue
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run_worker, args=(burst,), name=f"worker-{i}")
+        for i in range(concurrency)
+    ]
+    for process in processes:
+        process.start()
+    # terminate() sends SIGTERM, which each worker handles gracefully
+    signal.signal(signal.SIGTERM, lambda *_: [process.terminate() for process in processes])
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()
+    click.secho("Workers stopped.", fg="green")
@@ -0,0 +1,99 @@
+"""Warm CLI process that runs commands sent by cli.client.
+
+Commands run one at a time in this process, so imports, the result cache
+and factorial/Fibonacci checkpoints stay warm between calls. Settings read
+at import time (RESULT_STORAGE, USE_GMPY2, ...) are those the daemon was
+started with; the caller's environment applies to everything else.
+"""
+import os
+import signal
+import socket
+import sys
+import traceback
+from cli.client import SOCKET_PATH, connect, receive, send
+
+# Exit after this many idle seconds; 0 keeps the daemon running
+DAEMON_IDLE_TIMEOUT = float(os.getenv("MATHCLI_DAEMON_IDLE", "3600"))
+
+
+def ping(path: str = SOCKET_PATH):
+    """The daemon's pid, or None when no daemon is listening."""
+    sock = connect(path)
+    if sock is None:
+        return None
+    with sock:
+        send(sock, {"command": "ping"})
+        return next(receive(sock), {}).get("pid")
+
+
+def stop(path: str = SOCKET_PATH) -> bool:
+    sock = connect(path)
+    if sock is None:
+        return False
+    with sock:
+        send(sock, {"command": "stop"})
+        next(receive(sock), None)
+    return True
+
+
+def _run(runner, cli, request: dict) -> dict:
+    from storage.engine import flush
+    result = runner.invoke(cli, request["args"], env=request.get("env"),
+                           color=request.get("color", False), prog_name="mathcli")
+    stderr = result.stderr
+    if result.exception is not None and not isinstance(result.exception, SystemExit):
+        stderr += "".join(traceback.format_exception(*result.exc_info))
+    # Queued history writes are committed before the caller continues
+    flush()
+    return {"stdout": result.stdout, "stderr": stderr, "exit": result.exit_code}
+
+
+def serve(path: str = SOCKET_PATH, idle_timeout: float = DAEMON_IDLE_TIMEOUT):
+    from click.testing import CliRunner
+    from cli.main import cli
+    if ping(path) is not None:
+        raise RuntimeError(f"A daemon is already listening on {path}")
+    # Load every command module up front; that is the point of the daemon
+    for name in cli.list_commands(None):
+        cli.get_command(None, name)
+    runner = CliRunner()
+    cwd = os.getcwd()
+    if os.path.exists(path):
+        os.unlink(path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen()
+    server.settimeout(idle_timeout or None)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        while True:
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                break
+            with conn:
+                conn.settimeout(None)
+                request = next(receive(conn), None)
+                if request is None:
+                    continue
+                command = request.get("command")
+                if command == "ping":
+                    send(conn, {"pid": os.getpid()})
+                elif command == "stop":
+                    send(conn, {"exit": 0})
+                    break
+                elif request.get("cwd", cwd) != cwd:
+                    # Databases and output files are relative to the daemon's
+                    # directory; callers elsewhere run the command themselves
+                    send(conn, {"local": True})
+                else:
+                    send(conn, _run(runner, cli, request))
+    finally:
+        server.close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    serve()
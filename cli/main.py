@@ -1,20 +1,44 @@
+import importlib
 import click
-from cli.commands.pow_cmd import pow
-from cli.commands.fibonacci_cmd import fibonacci
-from cli.commands.factorial_cmd import factorial
-from cli.commands.export_cmd import export
-from cli.commands.status_cmd import status
 
-@click.group()
+# Command name -> "module:attribute". A command's module (and whatever it
+# imports: math engines, SQLite, httpx) is only loaded when it is used.
+COMMANDS = {
+    "pow": "cli.commands.pow_cmd:pow",
+    "fibonacci": "cli.commands.fibonacci_cmd:fibonacci",
+    "factorial": "cli.commands.factorial_cmd:factorial",
+    "export": "cli.commands.export_cmd:export",
+    "status": "cli.commands.status_cmd:status",
+    "cancel": "cli.commands.cancel_cmd:cancel",
+    "batch": "cli.commands.batch_cmd:batch",
+    "array-pow": "cli.commands.array_pow_cmd:array_pow",
+    "worker": "cli.commands.worker_cmd:worker",
+    "maintenance": "cli.commands.maintenance_cmd:maintenance",
+    "daemon": "cli.commands.daemon_cmd:daemon",
+}
+
+class LazyGroup(click.Group):
+    """A click group that imports command modules on first use."""
+
+    def __init__(self, *args, lazy_commands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = dict(lazy_commands or {})
+
+    def list_commands(self, ctx):
+        return sorted({*super().list_commands(ctx), *self.lazy_commands})
+
+    def get_command(self, ctx, name):
+        if name in self.lazy_commands and name not in self.commands:
+            module, _, attribute = self.lazy_commands[name].partition(":")
+            self.add_command(getattr(importlib.import_module(module), attribute), name)
+        return super().get_command(ctx, name)
+
+@click.group(cls=LazyGroup, lazy_commands=COMMANDS)
 def cli():
     """Math Microservice CLI – Perform math ops and export history."""
     pass
 
-cli.add_command(pow)
-cli.add_command(fibonacci)
-cli.add_command(factorial)
-cli.add_command(export)
-cli.add_command(status)
-
 if __name__ == "__main__":
-    cli()
+    # Hands the call to a running `daemon` when there is one
+    from cli.client import main
+    main(local=cli)
@@ -1,40 +1,63 @@
-import io
-import csv
-import uuid
 import os
+import json
 import sys
-from math import log10
+import time
+from functools import partial
 from dotenv import load_dotenv
 from fastapi import (
     FastAPI, Request, Form, BackgroundTasks,
-    HTTPException, status, Depends
+    HTTPException, status, Depends, Query
 )
 from fastapi.responses import HTMLResponse, StreamingResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.openapi.docs import get_swagger_ui_html
 from api.routes import router
-from services.math_ops import compute_pow, compute_fibonacci, compute_factorial
+from api.debug import router as debug_router
+from services.math_ops import POW_FUNCTIONS, compute_fibonacci, compute_factorial, pow_operation
 from services.background_tasks import (
     store_and_compute_fibonacci,
     store_and_compute_factorial,
-    store_and_compute_pow
+    store_and_compute_pow_mode,
+    launch,
+    start_task_keeper
 )
+from services.export import EXPORT_FORMATS, export_filename, stream_export
 from storage.sqlite_store import (
-    init_db, store_request_sqlite, get_all_requests_sqlite
+    init_db, store_request_sqlite, iter_requests_sqlite
 )
 from storage.task_store import (
     init_task_db, get_task, get_all_tasks
 )
+from services.cost_model import BACKGROUND, INLINE, digits_label, ensure_calibrated, route
+from services.lanes import run_compute, run_io
+from services.single_flight import flight_key, task_flight
+from services.task_runner import QueueFullError
+from services.result_view import summarize
+from services.log_config import configure_logging
+from services.maintenance import start_maintenance_loop
+from services.metrics import HTTP_REQUEST_SECONDS
+from services.profiling import PROFILING_ENABLED, profile_requests
+from services.task_events import TERMINAL_STATUSES, task_events
 from services.auth import (
     authorize, ensure_logged_in, set_session, USERNAME, PASSWORD
 )
 
-# Increase int string limit
+# Increase int string limit for inline JSON results (summaries, exports and
+# /result/{id}/digits convert without str() and are not bound by it)
 sys.set_int_max_str_digits(25000)
 
+configure_logging()
+
 # Initialize DBs
 init_db()
 init_task_db()
+# Heartbeat task leases and settle tasks of servers or workers that died
+start_task_keeper()
+# Retention, dedupe and vacuum every MAINTENANCE_INTERVAL seconds (off by default)
+start_maintenance_loop()
+
+# Fit the cost model to this host before serving requests
+ensure_calibrated()
 
 # App + templates
 app = FastAPI(
@@ -44,12 +67,33 @@ app = FastAPI(
     openapi_url=None       # Disable default /openapi.json
 )
 app.include_router(router)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template, not raw path, to keep label cardinality bounded
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        route=route.path if route is not None else "unmatched",
+        status=response.status_code
+    )
+    return response
+
+# Profiling adds no middleware or routes unless explicitly enabled
+if PROFILING_ENABLED:
+    app.middleware("http")(profile_requests)
+    app.include_router(debug_router)
 templates = Jinja2Templates(directory="templates")
 
 MAX_DISPLAY_DIGITS = 300
 
 def summarize_result(result: int | float | str) -> str:
     try:
+        if isinstance(result, int):
+            return summarize(result, MAX_DISPLAY_DIGITS)
         s = str(result)
         if len(s) > MAX_DISPLAY_DIGITS:
             return f"{s[:MAX_DISPLAY_DIGITS]}... [{len(s)} digits total]"
@@ -87,7 +131,7 @@ def get_form(request: Request):
     return templates.TemplateResponse(request, "index.html", {"request": request})
 
 @app.post("/", response_class=HTMLResponse)
-def post_form(
+async def post_form(
     request: Request,
     background_tasks: BackgroundTasks,
     op_type: str = Form(...),
@@ -95,47 +139,48 @@ def post_form(
     b: int = Form(0),
     _=Depends(ensure_logged_in)
 ):
+    operation = op_type
     if op_type == "pow":
-        if a > 0 and b > 0:
-            est_digits = int(b * log10(a)) + 1
-        else:
-            est_digits = 1
-        if est_digits < 3000:
-            result = compute_pow(a, b)
-            store_request_sqlite("pow", {"base": a, "exponent": b}, result)
-        else:
-            task_id = str(uuid.uuid4())
-            background_tasks.add_task(store_and_compute_pow, a, b, task_id)
-            result = (
-                f"Task {task_id} started: Calculating {a}^{b} (~{est_digits} digits) in background... "
-                f'<a href="/status/{task_id}" target="_blank" class="btn btn-sm btn-outline-info mt-1">Check status</a>'
-            )
-
+        # The form posts integers: exact pow, unless the exponent is negative
+        mode = "int" if b >= 0 else "float"
+        operation, args = pow_operation(mode, a, b)
+        input_data, label = {"base": a, "exponent": b, "mode": mode}, f"{a}^{b}"
+        compute = POW_FUNCTIONS[operation]
+        start_task = partial(store_and_compute_pow_mode, operation, input_data, args)
     elif op_type == "fibonacci":
-        if a < 5000:
-            result = compute_fibonacci(a)
-            store_request_sqlite("fibonacci", {"n": a}, result)
-        else:
-            task_id = str(uuid.uuid4())
-            background_tasks.add_task(store_and_compute_fibonacci, a, task_id)
-            result = (
-                f"Task {task_id} started: Calculating Fibonacci({a}) in background... "
-                f'<a href="/status/{task_id}" target="_blank" class="btn btn-sm btn-outline-info mt-1">Check status</a>'
-            )
-
+        args, input_data, label = (a,), {"n": a}, f"Fibonacci({a})"
+        compute, start_task = compute_fibonacci, partial(store_and_compute_fibonacci, a)
     elif op_type == "factorial":
-        if a < 3000:
-            result = compute_factorial(a)
-            store_request_sqlite("factorial", {"n": a}, result)
-        else:
-            task_id = str(uuid.uuid4())
-            background_tasks.add_task(store_and_compute_factorial, a, task_id)
-            result = (
-                f"Task {task_id} started: Calculating Factorial({a}) in background... "
-                f'<a href="/status/{task_id}" target="_blank" class="btn btn-sm btn-outline-info mt-1">Check status</a>'
-            )
+        args, input_data, label = (a,), {"n": a}, f"Factorial({a})"
+        compute, start_task = compute_factorial, partial(store_and_compute_factorial, a)
     else:
+        compute = None
+
+    if compute is None:
         result = "Invalid operation"
+    else:
+        # The page only shows a summary, so the full decimal is never rendered
+        decision = route(operation, *args, render=False)
+        size = digits_label(operation, *args)
+        if decision == INLINE:
+            try:
+                result = await run_compute(operation, compute, *args)
+                await run_io(store_request_sqlite, op_type, input_data, result)
+            except (ArithmeticError, ValueError) as e:
+                result = f"Cannot calculate {label}: {e}"
+        elif decision == BACKGROUND:
+            task_id, created = task_flight.claim(flight_key(operation, *args))
+            try:
+                if created:
+                    await launch(background_tasks, start_task, task_id)
+                result = (
+                    f"Task {task_id} started: Calculating {label} ({size}) in background... "
+                    f'<a href="/status/{task_id}" target="_blank" class="btn btn-sm btn-outline-info mt-1">Check status</a>'
+                )
+            except QueueFullError as e:
+                result = f"Server busy ({e}); try {label} again later."
+        else:
+            result = f"Calculating {label} ({size}) would exceed the time limit; request rejected."
 
     return templates.TemplateResponse(
         request,
@@ -147,25 +192,91 @@ def post_form(
     )
 
 @app.get("/history/export")
-def export_history(_=Depends(authorize)):
-    history = get_all_requests_sqlite()
-    si = io.StringIO()
-    cw = csv.writer(si)
-    cw.writerow(['ID', 'Operation', 'Input', 'Result', 'Timestamp'])
-    cw.writerows(history)
-    si.seek(0)
+def export_history(
+    format: str = Query("csv", pattern="^(csv|ndjson|columnar)$"),
+    operation: str = Query(None),
+    gzip: bool = Query(False),
+    _=Depends(authorize)
+):
+    chunks = stream_export(
+        iter_requests_sqlite(operation),
+        format,
+        header=['ID', 'Operation', 'Input', 'Result', 'Timestamp'] if format == "csv" else None,
+        gzip=gzip
+    )
+    filename = export_filename('history', format, gzip)
     return StreamingResponse(
-        si,
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=history.csv"}
+        chunks,
+        media_type="application/gzip" if gzip else EXPORT_FORMATS[format][0],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
+# Seconds between SSE keepalive comments while a task is quiet
+SSE_KEEPALIVE_SECONDS = 15
+
+async def _task_state(task_id: str) -> dict:
+    # Running tasks are answered from the in-memory event bus; SQLite is
+    # only read for finished (or unknown) tasks, which carry the result
+    latest = task_events.latest(task_id)
+    if latest is not None and latest.get("status") not in TERMINAL_STATUSES:
+        return {"result": None, **latest}
+    task = await run_io(get_task, task_id)
+    if task is None:
+        return latest or {"task_id": task_id, "status": "not found"}
+    state = {"version": 0, **(latest or {}), **task}
+    if task["status"] == "done":
+        state["progress"] = 1.0
+    return state
+
+def _is_final(state: dict) -> bool:
+    return state["status"] in TERMINAL_STATUSES or state["status"] == "not found"
+
 @app.get("/status/{task_id}")
-def get_task_status(task_id: str):
-    task = get_task(task_id)
-    if task:
-        return task
-    return {"task_id": task_id, "status": "not found"}
+async def get_task_status(task_id: str):
+    return await _task_state(task_id)
+
+@app.get("/status/{task_id}/wait")
+async def wait_task_status(
+    task_id: str,
+    since: int = Query(0, ge=0),
+    timeout: float = Query(30.0, gt=0, le=120)
+):
+    """Long-poll: answer once the task's version exceeds `since` or on timeout."""
+    state = await _task_state(task_id)
+    if _is_final(state) or state.get("version", 0) > since:
+        return state
+    event = await task_events.wait(task_id, since, timeout)
+    if event is None or event["status"] in TERMINAL_STATUSES:
+        return await _task_state(task_id)
+    return {"result": None, **event}
+
+@app.get("/status/{task_id}/events")
+async def stream_task_status(task_id: str):
+    """Server-sent events: the current state, then every change until the task ends."""
+    async def events():
+        subscription = task_events.subscribe(task_id)
+        try:
+            state = await _task_state(task_id)
+            yield f"data: {json.dumps(state)}\n\n"
+            version = state.get("version", 0)
+            while not _is_final(state):
+                event = await subscription.next(SSE_KEEPALIVE_SECONDS)
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                if event["version"] <= version:
+                    continue
+                state = await _task_state(task_id)
+                version = state.get("version", event["version"])
+                yield f"data: {json.dumps(state)}\n\n"
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.get("/docs", include_in_schema=False)
 def custom_swagger_ui(request: Request):
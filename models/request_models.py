@@ -1,9 +1,14 @@
+from typing import List, Literal, Optional, Union
 from pydantic import BaseModel, Field
 
 
 class PowRequest(BaseModel):
-    base: float
-    exponent: float
+    # int first so large JSON integers stay exact for the int/mod modes
+    base: Union[int, float]
+    exponent: Union[int, float]
+    mode: Literal["float", "int", "mod", "decimal"] = "float"
+    modulus: Optional[int] = None
+    precision: Optional[int] = Field(None, ge=1)
 
 
 class FibonacciRequest(BaseModel):
@@ -12,3 +17,20 @@ class FibonacciRequest(BaseModel):
 
 class FactorialRequest(BaseModel):
     n: int = Field(ge=0)
+
+
+class BatchItem(BaseModel):
+    op: str
+    base: Optional[float] = None
+    exponent: Optional[float] = None
+    n: Optional[int] = None
+
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
+
+
+class ArrayPowRequest(BaseModel):
+    # One of the two may be a single number that applies to every element
+    bases: Union[List[float], float]
+    exponents: Union[List[float], float]
@@ -1,5 +1,13 @@
-from typing import Union
+from typing import List, Optional, Union
 from pydantic import BaseModel
 
 class ResultResponse(BaseModel):
     result: Union[float, int, str]
+
+
+class BatchItemResult(BaseModel):
+    result: Optional[Union[float, int, str]] = None
+    error: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    results: List[BatchItemResult]
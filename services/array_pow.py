@@ -0,0 +1,106 @@
+import os
+import time
+from services.metrics import COMPUTE_SECONDS, size_bucket
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# pow: base**exponent; log_pow/log10_pow: log|base**exponent| computed as
+# exponent * log|base|, which stays finite where the power overflows float64
+ARRAY_OPERATIONS = ("pow", "log_pow", "log10_pow")
+# Elements per vectorized pass; temporaries never exceed one chunk
+ARRAY_CHUNK_ELEMENTS = int(os.getenv("ARRAY_CHUNK_ELEMENTS", "65536"))
+# Largest request body the array endpoints accept (16 bytes per (base, exponent) pair)
+ARRAY_MAX_BYTES = int(os.getenv("ARRAY_MAX_BYTES", str(256 * 1024 * 1024)))
+# Wire format of binary bodies and responses
+FLOAT64_LE = "<f8"
+
+
+def _part(values, start: int, stop: int):
+    # Scalars broadcast; array slices are converted one chunk at a time, so
+    # memory-mapped inputs of any dtype are never loaded whole
+    if np.ndim(values) == 0:
+        return values
+    return np.asarray(values[start:stop], dtype=np.float64)
+
+
+def _compute(operation: str, bases, exponents, out):
+    if operation == "pow":
+        np.power(bases, exponents, out=out)
+        return
+    log = np.log if operation == "log_pow" else np.log10
+    log(np.abs(bases), out=out)
+    np.multiply(out, exponents, out=out)
+    # Like pow: a negative base has no real power for a fractional exponent,
+    # and x**0 is 1 for every x (0 and nan included)
+    negative = np.less(bases, 0)
+    if negative.any():
+        np.copyto(out, np.nan, where=negative & (np.mod(exponents, 1) != 0))
+    np.copyto(out, 0.0, where=np.equal(exponents, 0))
+
+
+def array_length(bases, exponents) -> int:
+    """Common length of 1-D inputs; one of them may be a scalar."""
+    lengths = {len(values) for values in (bases, exponents) if np.ndim(values) != 0}
+    if not lengths:
+        raise ValueError("bases or exponents must be an array")
+    if len(lengths) > 1:
+        raise ValueError("bases and exponents differ in length")
+    return lengths.pop()
+
+
+def compute_arrays(operation: str, bases, exponents, out=None, chunk: int = ARRAY_CHUNK_ELEMENTS):
+    """Apply an array operation to 1-D bases and exponents (or a scalar of either).
+
+    Each chunk is computed by NumPy in one pass, without Python-level loops
+    over elements. Results follow IEEE semantics: overflow gives inf and a
+    negative base with a fractional exponent gives nan. Pass `out` (e.g. a
+    memory-mapped array) to write results in place.
+    """
+    if operation not in ARRAY_OPERATIONS:
+        raise ValueError(f"Unknown array operation: {operation}")
+    length = array_length(bases, exponents)
+    if out is None:
+        out = np.empty(length, dtype=FLOAT64_LE)
+    start_time = time.perf_counter()
+    with np.errstate(all="ignore"):
+        for start in range(0, length, chunk):
+            stop = min(start + chunk, length)
+            _compute(operation, _part(bases, start, stop), _part(exponents, start, stop),
+                     out[start:stop])
+    COMPUTE_SECONDS.observe(time.perf_counter() - start_time, operation=f"array_{operation}",
+                            size=size_bucket(length))
+    return out
+
+
+def parse_binary(body, base: float | None = None, exponent: float | None = None):
+    """(bases, exponents) views over a little-endian float64 body, without copying.
+
+    With a scalar base the body holds exponents, with a scalar exponent it
+    holds bases; otherwise it holds interleaved (base, exponent) pairs.
+    """
+    if base is not None and exponent is not None:
+        raise ValueError("Give base or exponent as a parameter, not both")
+    width = 8 if base is not None or exponent is not None else 16
+    if len(body) % width:
+        raise ValueError(f"Body length {len(body)} is not a multiple of {width} bytes")
+    values = np.frombuffer(body, dtype=FLOAT64_LE)
+    if base is not None:
+        return base, values
+    if exponent is not None:
+        return values, exponent
+    pairs = values.reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def to_bytes(results) -> memoryview:
+    """The result buffer as bytes for a response body; no copy is made."""
+    return memoryview(results).cast("B")
+
+
+def to_json_list(results) -> list:
+    # JSON has no inf or nan; they become null
+    finite = np.isfinite(results)
+    return [value if ok else None for value, ok in zip(results.tolist(), finite.tolist())]
@@ -1,4 +1,5 @@
 from fastapi import Request, HTTPException, status
+import logging
 import os
 from dotenv import load_dotenv
 from itsdangerous import URLSafeSerializer
@@ -6,6 +7,8 @@ from fastapi.responses import RedirectResponse
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # --- Configurable Secrets ---
 API_KEY = os.getenv("API_KEY")
 SECRET_KEY = os.getenv("SECRET_KEY", "mathrocks123")
@@ -18,9 +21,10 @@ serializer = URLSafeSerializer(SECRET_KEY)
 # --- API Header Authorization (for curl, CLI, Postman, etc.) ---
 def authorize(request: Request):
     key = request.headers.get("X-API-Key")
-    print("Received key:", key)
-    print("Expected key:", API_KEY)
     if key != API_KEY:
+        # Never log the keys themselves
+        logger.debug("rejected API key",
+                     extra={"path": request.url.path, "key_present": key is not None})
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Invalid or missing API key"
@@ -43,16 +47,19 @@ def ensure_logged_in(request: Request):
     if user != USERNAME:
         return RedirectResponse(url="/login", status_code=302)
 
-def authorize_combined(request: Request):
+def is_authorized(request: Request) -> bool:
     # Check session login first
     token = request.cookies.get("session")
     user = get_session(token) if token else None
     if user == USERNAME:
-        return
+        return True
 
     # Fallback to API key
     key = request.headers.get("X-API-Key")
-    if key == API_KEY:
+    return key == API_KEY
+
+def authorize_combined(request: Request):
+    if is_authorized(request):
         return
 
     raise HTTPException(
@@ -1,24 +1,206 @@
-from services.math_ops import compute_factorial, compute_fibonacci, compute_pow
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from services.lanes import run_io
+from services.metrics import TASKS_FINISHED
+from services.progress import Cancelled
+from services.single_flight import task_flight
+from services.task_events import TERMINAL_STATUSES, task_events
+from services.task_runner import (
+    OPERATIONS, TASK_BACKEND, TASK_LEASE_SECONDS, TASK_MAX_ATTEMPTS, TASK_MAX_QUEUE,
+    TASK_QUEUE_POLL, TASK_WORKERS, QueueFullError, cancel, set_progress_listener, submit
+)
 from storage.sqlite_store import store_request_sqlite
-from storage.task_store import save_task, update_task_status, update_task_result
+from storage.task_store import (
+    save_task, update_task_status, update_task_progress, update_task_result,
+    update_task_error, summarize_result, request_cancel, get_task,
+    enqueue_task, lease_owner_id, renew_leases, recover_expired_tasks
+)
 
-def store_and_compute_fibonacci(n: int, task_id: str):
-    save_task(task_id, "fibonacci", {"n": n})
-    update_task_status(task_id, "in_progress")
-    result = compute_fibonacci(n)
-    store_request_sqlite("fibonacci", {"n": n}, result)
-    update_task_result(task_id, result)
+logger = logging.getLogger(__name__)
+
+# Digits of the result pushed with the final "done" event
+EVENT_RESULT_DIGITS = 300
+# Process-pool tasks of this server are leased under this name
+LEASE_OWNER = lease_owner_id("server")
+
+# Durable jobs dispatched here: task_id -> (operation, last relayed (status, progress))
+_watched = {}
+_watched_lock = threading.Lock()
+_keeper_started = False
+_keeper_lock = threading.Lock()
+
+def _on_progress(task_id: str, fraction: float):
+    fraction = round(fraction, 4)
+    update_task_progress(task_id, fraction)
+    task_events.publish(task_id, progress=fraction)
+
+set_progress_listener(_on_progress)
+
+def start_task_keeper():
+    """Start the thread that heartbeats leases and relays durable job updates."""
+    global _keeper_started
+    with _keeper_lock:
+        if not _keeper_started:
+            threading.Thread(target=_keep_tasks, name="task-keeper", daemon=True).start()
+            _keeper_started = True
+
+def _keep_tasks():
+    next_heartbeat = 0.0
+    while True:
+        try:
+            if time.monotonic() >= next_heartbeat:
+                renew_leases(LEASE_OWNER, TASK_LEASE_SECONDS)
+                # Whichever process notices a dead owner first settles its tasks
+                recover_expired_tasks(TASK_MAX_ATTEMPTS)
+                next_heartbeat = time.monotonic() + TASK_LEASE_SECONDS / 3
+            _relay_queue_updates()
+        except sqlite3.Error as e:
+            logger.warning("task keeper pass failed", extra={"error": str(e)})
+        time.sleep(TASK_QUEUE_POLL)
+
+def _relay_queue_updates():
+    # Workers only write to SQLite; publish their changes to local subscribers
+    with _watched_lock:
+        watched = list(_watched.items())
+    for task_id, (operation, seen) in watched:
+        task = get_task(task_id)
+        state = (task["status"], task["progress"]) if task else ("failed", None)
+        if state == seen:
+            continue
+        if state[0] not in TERMINAL_STATUSES:
+            with _watched_lock:
+                _watched[task_id] = (operation, state)
+            task_events.publish(task_id, status=state[0], progress=state[1])
+            continue
+        with _watched_lock:
+            _watched.pop(task_id, None)
+        TASKS_FINISHED.inc(operation=operation, status=state[0])
+        task_flight.release(task_id)
+        task_events.publish(task_id, status=state[0], result=task["result"] if task else None)
+
+def _enqueue(task_id: str, operation: str, history_operation: str, input_data: dict, args: tuple):
+    if operation not in OPERATIONS:
+        raise ValueError(f"Unknown operation: {operation}")
+    job = {
+        "operation": operation, "args": list(args), "input": input_data,
+        "record_as": history_operation
+    }
+    if not enqueue_task(task_id, history_operation, input_data, job, TASK_MAX_QUEUE):
+        save_task(task_id, history_operation, input_data)
+        message = f"Task queue is full ({TASK_MAX_QUEUE} jobs pending)"
+        _fail(task_id, history_operation, message, "rejected")
+        raise QueueFullError(message)
+    with _watched_lock:
+        _watched[task_id] = (history_operation, ("queued", None))
+    task_events.publish(task_id, status="queued", progress=0.0)
+
+def _dispatch(task_id: str, operation: str, input_data: dict, *args, record_as: str | None = None,
+              defer=None):
+    # record_as names the history operation when it differs from the job's;
+    # defer(fn, *args) runs fn later, for jobs that would block this thread
+    history_operation = record_as or operation
+    try:
+        start_task_keeper()
+        if TASK_BACKEND == "queue":
+            _enqueue(task_id, operation, history_operation, input_data, args)
+            return
+        save_task(task_id, history_operation, input_data, owner=LEASE_OWNER,
+                  lease=TASK_LEASE_SECONDS)
+        task_events.publish(task_id, status="queued", progress=0.0)
+    except BaseException:
+        task_flight.release(task_id)
+        raise
+    if TASK_WORKERS <= 0 and defer is not None:
+        # Without worker processes submit() computes in the calling thread
+        defer(_submit, task_id, operation, history_operation, input_data, args)
+        return
+    _submit(task_id, operation, history_operation, input_data, args)
 
-def store_and_compute_factorial(n: int, task_id: str):
-    save_task(task_id, "factorial", {"n": n})
+def _submit(task_id: str, operation: str, history_operation: str, input_data: dict, args: tuple):
+    try:
+        future = submit(operation, *args, task_id=task_id)
+    except QueueFullError as e:
+        _fail(task_id, history_operation, str(e), "rejected")
+        raise
+    except BaseException:
+        # e.g. BrokenProcessPool: identical requests must not join a task that never started
+        task_flight.release(task_id)
+        raise
     update_task_status(task_id, "in_progress")
-    result = compute_factorial(n)
-    store_request_sqlite("factorial", {"n": n}, result)
+    task_events.publish(task_id, status="in_progress")
+    future.add_done_callback(lambda f: _finish(task_id, history_operation, input_data, f))
+
+def _fail(task_id: str, operation: str, message: str, status: str = "failed"):
+    TASKS_FINISHED.inc(operation=operation, status=status)
+    task_flight.release(task_id)
+    update_task_error(task_id, message, status=status)
+    task_events.publish(task_id, status=status, result=message)
+
+def _finish(task_id: str, operation: str, input_data: dict, future: Future):
+    if future.cancelled():
+        _fail(task_id, operation, "Task was cancelled", "cancelled")
+        return
+    error = future.exception()
+    if isinstance(error, Cancelled):
+        _fail(task_id, operation, "Task was cancelled", "cancelled")
+        return
+    if error is not None:
+        _fail(task_id, operation, f"{type(error).__name__}: {error}")
+        return
+    result = future.result()
+    TASKS_FINISHED.inc(operation=operation, status="done")
+    task_flight.release(task_id)
+    store_request_sqlite(operation, input_data, result)
     update_task_result(task_id, result)
+    task_events.publish(
+        task_id, status="done", progress=1.0,
+        result=summarize_result(result, EVENT_RESULT_DIGITS)
+    )
 
-def store_and_compute_pow(a: float, b: float, task_id: str):
-    save_task(task_id, "pow", {"base": a, "exponent": b})
-    update_task_status(task_id, "in_progress")
-    result = compute_pow(a, b)
-    store_request_sqlite("pow", {"base": a, "exponent": b}, result)
-    update_task_result(task_id, result)
\ No newline at end of file
+def cancel_task(task_id: str):
+    """Cancel a queued or running task and return its task row.
+
+    Returns None for unknown tasks. Tasks that already finished are
+    returned unchanged; queued ones are dropped from the worker pool (or
+    the durable queue) and running ones stop at their next progress
+    checkpoint.
+    """
+    task = get_task(task_id)
+    if task is None or task["status"] in TERMINAL_STATUSES:
+        return task
+    if request_cancel(task_id):
+        # 'cancelled' at once for durable jobs no worker has claimed yet
+        task_events.publish(task_id, status=get_task(task_id)["status"])
+        # Dropping a job that never started fires _finish right away
+        cancel(task_id)
+    return get_task(task_id)
+
+async def launch(background_tasks, start_task, task_id: str):
+    """Start a claimed task before the response is sent.
+
+    The task row (or durable job) exists by the time a client gets the task
+    id, so status lookups never miss it. Raises QueueFullError, after
+    recording the task as rejected, when the pool or the queue is full.
+    """
+    await run_io(start_task, task_id, defer=background_tasks.add_task)
+
+def store_and_compute_fibonacci(n: int, task_id: str, defer=None):
+    _dispatch(task_id, "fibonacci", {"n": n}, n, defer=defer)
+
+def store_and_compute_fibonacci_mod(n: int, mod: int, task_id: str, defer=None):
+    _dispatch(task_id, "fibonacci_mod", {"n": n, "mod": mod}, n, mod, record_as="fibonacci",
+              defer=defer)
+
+def store_and_compute_factorial(n: int, task_id: str, defer=None):
+    _dispatch(task_id, "factorial", {"n": n}, n, defer=defer)
+
+def store_and_compute_pow(a: float, b: float, task_id: str, defer=None):
+    _dispatch(task_id, "pow", {"base": a, "exponent": b}, a, b, defer=defer)
+
+def store_and_compute_pow_mode(operation: str, input_data: dict, args: tuple, task_id: str,
+                               defer=None):
+    """Run one of the pow modes' operations (see math_ops.pow_operation)."""
+    _dispatch(task_id, operation, input_data, *args, record_as="pow", defer=defer)
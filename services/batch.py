@@ -0,0 +1,121 @@
+import os
+from services.cost_model import INLINE, estimate_seconds, route
+from services.math_ops import compute_factorial, compute_fibonacci, compute_pow
+from storage.sqlite_store import store_requests_sqlite_many
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", "10000"))
+# Batches run inline, so each item must be predicted to finish within this
+BATCH_ITEM_BUDGET = float(os.getenv("BATCH_ITEM_BUDGET", "1.0"))
+# ...and the whole batch (distinct items only) within this
+BATCH_TOTAL_BUDGET = float(os.getenv("BATCH_TOTAL_BUDGET", "5.0"))
+# Below this many distinct pows the NumPy round trip is not worth it
+VECTORIZE_MIN_ITEMS = 16
+
+
+def _normalize(item: dict):
+    """Return the (operation, args) key of a batch item or raise ValueError."""
+    op = item.get("op")
+    if op == "pow":
+        if item.get("base") is None or item.get("exponent") is None:
+            raise ValueError("pow requires base and exponent")
+        return "pow", (float(item["base"]), float(item["exponent"]))
+    if op in ("fibonacci", "factorial"):
+        n = item.get("n")
+        if n is None or isinstance(n, bool) or int(n) != n or n < 0:
+            raise ValueError(f"{op} requires a non-negative integer n")
+        if route(op, int(n), inline_budget=BATCH_ITEM_BUDGET) != INLINE:
+            raise ValueError(f"{op}({n}) is too expensive for a batch, use /{op} instead")
+        return op, (int(n),)
+    raise ValueError(f"Unknown operation: {op}")
+
+
+def _input_data(op: str, args: tuple) -> dict:
+    if op == "pow":
+        return {"base": args[0], "exponent": args[1]}
+    return {"n": args[0]}
+
+
+def _compute_one(op: str, args: tuple):
+    if op == "pow":
+        result = compute_pow(*args)
+        if isinstance(result, complex):
+            raise ValueError("pow result is not a real number")
+        return result
+    if op == "fibonacci":
+        return compute_fibonacci(*args)
+    return compute_factorial(*args)
+
+
+def _compute_pows(keys: list) -> dict:
+    """Compute distinct float pows in one NumPy pass.
+
+    Non-finite results fall back to compute_pow so overflow and complex
+    results behave exactly as on the single-item endpoint.
+    """
+    bases = np.array([args[0] for _, args in keys], dtype=np.float64)
+    exponents = np.array([args[1] for _, args in keys], dtype=np.float64)
+    with np.errstate(all="ignore"):
+        values = np.power(bases, exponents)
+    finite = np.isfinite(values)
+    return {
+        key: float(value)
+        for key, value, ok in zip(keys, values.tolist(), finite.tolist())
+        if ok
+    }
+
+
+def run_batch(items: list[dict], persist: bool = True) -> list[dict]:
+    """Compute a list of operations, returning {"result"} or {"error"} per item.
+
+    Identical inputs are computed once, float pows are vectorized when
+    NumPy is installed, and all new results are stored in one transaction.
+    Raises ValueError for batches too large or too costly to run inline.
+    """
+    if len(items) > MAX_BATCH_ITEMS:
+        raise ValueError(f"Batch exceeds {MAX_BATCH_ITEMS} items")
+
+    keys = []
+    for item in items:
+        try:
+            keys.append(_normalize(item))
+        except (ValueError, TypeError) as e:
+            keys.append(e)
+
+    unique = list(dict.fromkeys(k for k in keys if not isinstance(k, Exception)))
+    seconds = sum(estimate_seconds(op, *args) for op, args in unique)
+    if seconds > BATCH_TOTAL_BUDGET:
+        raise ValueError(f"Batch is predicted to take {seconds:.1f}s, "
+                         f"over the {BATCH_TOTAL_BUDGET}s limit")
+    results = {}
+    pows = [k for k in unique if k[0] == "pow"]
+    if np is not None and len(pows) >= VECTORIZE_MIN_ITEMS:
+        results.update(_compute_pows(pows))
+
+    errors = {}
+    for key in unique:
+        if key in results:
+            continue
+        try:
+            results[key] = _compute_one(*key)
+        except Exception as e:
+            errors[key] = f"{type(e).__name__}: {e}"
+
+    if persist and results:
+        store_requests_sqlite_many(
+            (op, _input_data(op, args), result) for (op, args), result in results.items()
+        )
+
+    output = []
+    for key in keys:
+        if isinstance(key, Exception):
+            output.append({"result": None, "error": str(key)})
+        elif key in errors:
+            output.append({"result": None, "error": errors[key]})
+        else:
+            output.append({"result": results[key], "error": None})
+    return output
@@ -0,0 +1,73 @@
+import os
+import threading
+from bisect import bisect_right, insort
+from collections import OrderedDict
+
+# --- Configurable budget (per store) ---
+CHECKPOINT_MEMORY_BYTES = int(os.getenv("CHECKPOINT_MEMORY_BYTES", str(128 * 1024 * 1024)))
+# Below this index recomputing is cheaper than keeping a checkpoint around
+CHECKPOINT_MIN_N = int(os.getenv("CHECKPOINT_MIN_N", "1000"))
+
+
+def _size(value) -> int:
+    if isinstance(value, tuple):
+        return sum(_size(v) for v in value)
+    return (value.bit_length() + 7) // 8
+
+
+class CheckpointStore:
+    """Sparse, byte-budgeted map of index -> intermediate result.
+
+    floor(n) returns the closest checkpoint at or below n, so a computation
+    can resume from it instead of starting over. The least recently used
+    checkpoints are dropped when the budget is exceeded.
+    """
+
+    def __init__(self, max_bytes=CHECKPOINT_MEMORY_BYTES, min_n=CHECKPOINT_MIN_N):
+        self.max_bytes = max_bytes
+        self.min_n = min_n
+        self._indexes = []
+        self._values = OrderedDict()
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def floor(self, n: int):
+        """Return (k, value) for the largest checkpoint k <= n, or None."""
+        with self._lock:
+            pos = bisect_right(self._indexes, n)
+            if pos == 0:
+                return None
+            k = self._indexes[pos - 1]
+            self._values.move_to_end(k)
+            return k, self._values[k][0]
+
+    def add(self, n: int, value):
+        if n < self.min_n:
+            return
+        size = _size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if n in self._values:
+                self._values.move_to_end(n)
+                return
+            insort(self._indexes, n)
+            self._values[n] = (value, size)
+            self._used += size
+            while self._used > self.max_bytes:
+                old, (_, old_size) = self._values.popitem(last=False)
+                self._indexes.remove(old)
+                self._used -= old_size
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+            self._values.clear()
+            self._used = 0
+
+    def __len__(self):
+        return len(self._indexes)
+
+
+factorial_checkpoints = CheckpointStore()
+fibonacci_checkpoints = CheckpointStore()
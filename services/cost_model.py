@@ -0,0 +1,192 @@
+import os
+import sys
+import time
+from math import inf, lgamma, log, log2, log10
+
+# --- Configurable latency budgets (seconds) ---
+# Requests predicted to finish within this budget are answered inline
+COST_INLINE_BUDGET = float(os.getenv("COST_INLINE_BUDGET", "0.05"))
+# Anything predicted to take longer than this is rejected outright
+COST_MAX_SECONDS = float(os.getenv("COST_MAX_SECONDS", os.getenv("TASK_TIMEOUT", "600")))
+COST_CALIBRATE = os.getenv("COST_CALIBRATE", "1") == "1"
+
+# Karatsuba exponent: CPython multiplies big ints in O(bits^1.585)
+MUL_EXPONENT = log2(3)
+LOG2_10 = log2(10)
+
+INLINE = "inline"
+BACKGROUND = "background"
+REJECT = "reject"
+
+# Decimal's non-integer power grows roughly as precision^3
+DECIMAL_EXPONENT = 3
+
+# Seconds per bits^MUL_EXPONENT (str: per digits^2, pow_mod: per modulus
+# bits^2 per exponent bit, pow_decimal: per precision^DECIMAL_EXPONENT),
+# measured on a typical host; calibrate() replaces them with local numbers
+_coefficients = {
+    "factorial": 3.5e-12,
+    "fibonacci": 2.8e-11,
+    "pow": 8.0e-12,
+    "pow_mod": 2.4e-12,
+    "pow_decimal": 6.5e-11,
+    "str": 1.5e-11,
+}
+_calibrated = False
+
+
+def estimate_digits(operation: str, *args) -> int:
+    """Approximate decimal digits of a result, without computing it."""
+    if operation in ("pow", "pow_int"):
+        base, exp = args
+        if abs(base) <= 1 or exp <= 0:
+            return 1
+        return int(exp * log10(abs(base))) + 1
+    if operation == "pow_mod":
+        return int(abs(args[2]).bit_length() / LOG2_10) + 1
+    if operation == "fibonacci_mod":
+        return int(abs(args[1]).bit_length() / LOG2_10) + 1
+    if operation == "pow_decimal":
+        return args[2]
+    if operation == "fibonacci":
+        # F(n) ~ phi^n / sqrt(5)
+        return int(max(args[0], 0) * 0.20898764024997873) + 1
+    if operation == "factorial":
+        return int(lgamma(max(args[0], 0) + 1) / log(10)) + 1
+    return 1
+
+
+def digits_label(operation: str, *args) -> str:
+    """'~N digits' for messages, even where N is past float range."""
+    try:
+        return f"~{estimate_digits(operation, *args)} digits"
+    except OverflowError:
+        return "too many digits to estimate"
+
+
+def _compute_seconds(operation: str, n: int, digits: int) -> float:
+    bits = digits * LOG2_10
+    cost = _coefficients["pow" if operation == "pow_int" else operation] * bits ** MUL_EXPONENT
+    if operation == "factorial":
+        # The product tree does ~log2(n) levels of balanced multiplications
+        cost *= max(log2(max(n, 2)), 1.0)
+    return cost
+
+
+def estimate_seconds(operation: str, *args, render: bool = True) -> float:
+    """Predict the wall time of computing (and, if render, printing) a result.
+
+    Inputs whose cost does not fit in a float are predicted to take forever.
+    """
+    try:
+        return _estimate_seconds(operation, *args, render=render)
+    except OverflowError:
+        return inf
+
+
+def _is_float_pow(operation: str, args: tuple) -> bool:
+    return operation == "pow" and not all(isinstance(a, int) for a in args)
+
+
+def _estimate_seconds(operation: str, *args, render: bool) -> float:
+    if _is_float_pow(operation, args):
+        return 1e-6  # float pow is a single libm call
+    digits = estimate_digits(operation, *args)
+    if operation == "pow_decimal":
+        # The decimal string is linear to render
+        return _coefficients["pow_decimal"] * args[2] ** DECIMAL_EXPONENT
+    if operation == "pow_mod":
+        # One modular squaring (and maybe a multiply) per exponent bit;
+        # CPython reduces by schoolbook division, quadratic in the modulus
+        seconds = (_coefficients["pow_mod"] * max(abs(args[2]).bit_length(), 1) ** 2
+                   * max(abs(args[1]).bit_length(), 1))
+    elif operation == "fibonacci_mod":
+        # Fast doubling reduces three products of residues per bit of n
+        seconds = (3 * _coefficients["pow_mod"] * max(abs(args[1]).bit_length(), 1) ** 2
+                   * max(abs(args[0]).bit_length(), 1))
+    else:
+        n = args[1] if operation in ("pow", "pow_int") else args[0]
+        seconds = _compute_seconds(operation, n, digits)
+    if render:
+        # CPython 3.11 converts int -> str in quadratic time
+        seconds += _coefficients["str"] * digits ** 2
+    return seconds
+
+
+def route(operation: str, *args, render: bool = True,
+          inline_budget: float | None = None, max_seconds: float | None = None) -> str:
+    """Choose INLINE, BACKGROUND or REJECT for a request from its predicted cost.
+
+    Only inline answers are rendered; background tasks store a summary, so
+    the time limit applies to the computation alone.
+    """
+    ensure_calibrated()
+    seconds = estimate_seconds(operation, *args, render=render)
+    if (seconds <= (COST_INLINE_BUDGET if inline_budget is None else inline_budget)
+            and _printable(operation, args, render)):
+        return INLINE
+    compute_seconds = estimate_seconds(operation, *args, render=False)
+    if compute_seconds <= (COST_MAX_SECONDS if max_seconds is None else max_seconds):
+        return BACKGROUND
+    return REJECT
+
+
+def _printable(operation: str, args: tuple, render: bool) -> bool:
+    # Inline responses carry the full decimal result, which str() refuses
+    # past the interpreter's digit limit; background tasks store a summary
+    limit = sys.get_int_max_str_digits()
+    # A float pow result is one float, however large the exponent
+    if not render or not limit or _is_float_pow(operation, args):
+        return True
+    try:
+        return estimate_digits(operation, *args) <= limit
+    except OverflowError:
+        return False
+
+
+def _best_of(fn, repeat=3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def calibrate():
+    """Fit the per-operation coefficients with a ~10ms micro-benchmark."""
+    global _calibrated
+    # Imported here so the model can be used without the math engines loaded
+    from services.math_ops import _fibonacci_pair, _range_product, compute_pow_decimal
+
+    samples = {
+        "factorial": (3000, lambda: _range_product(2, 3000)),
+        "fibonacci": (60000, lambda: _fibonacci_pair(60000)),
+        "pow": (20000, lambda: 3 ** 20000),
+    }
+    for operation, (n, fn) in samples.items():
+        digits = estimate_digits(operation, *((3, n) if operation == "pow" else (n,)))
+        unit = _compute_seconds(operation, n, digits) / _coefficients[operation]
+        _coefficients[operation] = _best_of(fn) / unit
+
+    modulus, exponent = (1 << 2048) - 159, (1 << 256) - 1
+    _coefficients["pow_mod"] = (_best_of(lambda: pow(3, exponent, modulus))
+                                / (modulus.bit_length() ** 2 * exponent.bit_length()))
+    precision = 400
+    _coefficients["pow_decimal"] = (_best_of(lambda: compute_pow_decimal("2.5", "10.3", precision))
+                                    / precision ** DECIMAL_EXPONENT)
+
+    value = 7 ** 4000
+    digits = estimate_digits("pow", 7, 4000)
+    _coefficients["str"] = _best_of(lambda: str(value)) / digits ** 2
+    _calibrated = True
+    return dict(_coefficients)
+
+
+def ensure_calibrated():
+    if not _calibrated and COST_CALIBRATE:
+        calibrate()
+
+
+def coefficients() -> dict:
+    return dict(_coefficients)
@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+import zlib
+
+EXPORT_COLUMNS = ["id", "operation", "input_data", "result", "timestamp"]
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    # One JSON object of column arrays per batch of rows
+    "columnar": ("application/x-ndjson", "columnar.ndjson"),
+}
+CHUNK_ROWS = 500
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _csv_chunks(rows, header):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for batch in _batches(rows, CHUNK_ROWS):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _ndjson_chunks(rows, header):
+    for batch in _batches(rows, CHUNK_ROWS):
+        yield "".join(json.dumps(dict(zip(header, row))) + "\n" for row in batch)
+
+
+def _columnar_chunks(rows, header):
+    for batch in _batches(rows, CHUNK_ROWS):
+        columns = {name: [row[i] for row in batch] for i, name in enumerate(header)}
+        yield json.dumps(columns) + "\n"
+
+
+_WRITERS = {
+    "csv": _csv_chunks,
+    "ndjson": _ndjson_chunks,
+    "columnar": _columnar_chunks,
+}
+
+
+def stream_export(rows, fmt: str = "csv", header=None, gzip: bool = False):
+    """Encode history rows as a stream of byte chunks in the given format."""
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    chunks = (chunk.encode() for chunk in _WRITERS[fmt](rows, header or EXPORT_COLUMNS))
+    if not gzip:
+        yield from chunks
+        return
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_filename(prefix: str, fmt: str, gzip: bool = False) -> str:
+    name = f"{prefix}.{EXPORT_FORMATS[fmt][1]}"
+    return f"{name}.gz" if gzip else name
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, status
+from services.cost_model import estimate_seconds
+from services.metrics import LANE_PENDING
+from services.single_flight import flight_key, inline_flight
+
+# --- Configurable lanes ---
+LANE_CHEAP_WORKERS = int(os.getenv("LANE_CHEAP_WORKERS", "4"))
+LANE_CHEAP_QUEUE = int(os.getenv("LANE_CHEAP_QUEUE", "64"))
+LANE_EXPENSIVE_WORKERS = int(os.getenv("LANE_EXPENSIVE_WORKERS", "2"))
+LANE_EXPENSIVE_QUEUE = int(os.getenv("LANE_EXPENSIVE_QUEUE", "8"))
+LANE_IO_WORKERS = int(os.getenv("LANE_IO_WORKERS", "8"))
+LANE_IO_QUEUE = int(os.getenv("LANE_IO_QUEUE", "256"))
+LANE_RETRY_AFTER = int(os.getenv("LANE_RETRY_AFTER", "1"))
+# Calls predicted to take at least this many seconds go to the expensive lane
+LANE_EXPENSIVE_SECONDS = float(os.getenv("LANE_EXPENSIVE_SECONDS", "0.005"))
+
+
+class LaneSaturated(HTTPException):
+    def __init__(self, lane: str):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Server busy ({lane} lane is full), retry later",
+            headers={"Retry-After": str(LANE_RETRY_AFTER)}
+        )
+
+
+class Lane:
+    """Bounded executor for blocking work called from async handlers.
+
+    At most `workers` calls run at once and at most `max_pending` are
+    admitted (running or waiting); beyond that run() raises LaneSaturated
+    instead of queueing without limit.
+    """
+
+    def __init__(self, name: str, workers: int, max_pending: int):
+        self.name = name
+        self.max_pending = max(max_pending, workers)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"lane-{name}")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def run(self, fn, *args, **kwargs):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise LaneSaturated(self.name)
+            self._pending += 1
+        try:
+            future = self.executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        # Released when the call ends, not when its caller stops waiting: a
+        # cancelled request (client gone) leaves the thread running
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, future=None):
+        with self._lock:
+            self._pending -= 1
+
+
+cheap_lane = Lane("cheap", LANE_CHEAP_WORKERS, LANE_CHEAP_QUEUE)
+expensive_lane = Lane("expensive", LANE_EXPENSIVE_WORKERS, LANE_EXPENSIVE_QUEUE)
+io_lane = Lane("io", LANE_IO_WORKERS, LANE_IO_QUEUE)
+
+for _lane in (cheap_lane, expensive_lane, io_lane):
+    LANE_PENDING.set_function(lambda lane=_lane: lane.pending, lane=_lane.name)
+
+
+def lane_for(operation: str, *args) -> Lane:
+    if estimate_seconds(operation, *args) >= LANE_EXPENSIVE_SECONDS:
+        return expensive_lane
+    return cheap_lane
+
+
+async def run_compute(operation: str, fn, *args):
+    """Run a compute_* call in the lane that matches its estimated cost.
+
+    Identical calls already in flight share that call's result instead of
+    taking another lane slot.
+    """
+    lane = lane_for(operation, *args)
+    return await inline_flight.run(flight_key(operation, *args), lane.run, fn, *args)
+
+
+async def run_io(fn, *args, **kwargs):
+    """Run blocking storage calls off the event loop."""
+    return await io_lane.run(fn, *args, **kwargs)
@@ -0,0 +1,319 @@
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, UTC
+from pathlib import Path
+from storage import sqlite_store, task_store
+from storage.engine import connect, flush
+
+logger = logging.getLogger(__name__)
+
+# --- Configurable retention (0 means unlimited) ---
+RETENTION_MAX_AGE_DAYS = float(os.getenv("RETENTION_MAX_AGE_DAYS", "0"))
+RETENTION_MAX_ROWS = int(os.getenv("RETENTION_MAX_ROWS", "0"))
+RETENTION_MAX_BYTES = int(os.getenv("RETENTION_MAX_BYTES", "0"))
+# Per-operation overrides, e.g. {"factorial": {"max_rows": 1000, "max_bytes": 100000000}}
+RETENTION_POLICIES = json.loads(os.getenv("RETENTION_POLICIES", "{}"))
+# Expired rows are written to gzipped NDJSON files here; "0" deletes them instead
+RETENTION_ARCHIVE = os.getenv("RETENTION_ARCHIVE", "1") == "1"
+ARCHIVE_DIR = Path(os.getenv("ARCHIVE_DIR", str(Path("storage") / "archive")))
+# Results at least this large are moved to the content-addressed results table
+DEDUPE_MIN_BYTES = int(os.getenv("DEDUPE_MIN_BYTES", "1024"))
+# Free pages returned to the filesystem per database and pass
+VACUUM_PAGES = int(os.getenv("VACUUM_PAGES", "10000"))
+# Seconds between passes of the background loop; 0 leaves it off
+MAINTENANCE_INTERVAL = float(os.getenv("MAINTENANCE_INTERVAL", "0"))
+
+BATCH_ROWS = 500
+_UNLIMITED = 2 ** 62
+_run_lock = threading.Lock()
+
+
+def policy_for(operation: str) -> dict:
+    policy = {
+        "max_age_days": RETENTION_MAX_AGE_DAYS,
+        "max_rows": RETENTION_MAX_ROWS,
+        "max_bytes": RETENTION_MAX_BYTES,
+    }
+    policy.update(RETENTION_POLICIES.get(operation, {}))
+    return policy
+
+
+def _cutoff(policy: dict) -> str:
+    # SQLite's CURRENT_TIMESTAMP format, so cutoffs compare as text
+    if not policy["max_age_days"]:
+        return ""
+    moment = datetime.now(UTC) - timedelta(days=policy["max_age_days"])
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _expired_ids(conn, sql: str, operation: str, policy: dict, cutoff: str) -> list:
+    return [row[0] for row in conn.execute(sql, (
+        operation,
+        policy["max_rows"] or _UNLIMITED,
+        policy["max_bytes"] or _UNLIMITED,
+        cutoff,
+    ))]
+
+
+# Newest first per operation: a row expires past max_rows, once the running
+# byte total exceeds max_bytes, or when it is older than the cutoff
+_EXPIRED_REQUESTS = f"""
+    SELECT id FROM (
+        SELECT requests.id AS id, requests.timestamp AS timestamp,
+               ROW_NUMBER() OVER w AS position,
+               SUM(COALESCE(results.size, LENGTH(requests.result_blob), LENGTH(requests.result)))
+                   OVER (w ROWS UNBOUNDED PRECEDING) AS running_bytes
+        FROM {sqlite_store.REQUESTS_FROM}
+        WHERE requests.operation = ?
+        WINDOW w AS (ORDER BY requests.timestamp DESC, requests.id DESC)
+    )
+    WHERE position > ? OR running_bytes > ? OR timestamp < ?
+"""
+
+# Only finished tasks expire; their rows hold short result summaries
+_EXPIRED_TASKS = """
+    SELECT task_id FROM (
+        SELECT task_id, created_at,
+               ROW_NUMBER() OVER w AS position,
+               SUM(LENGTH(COALESCE(result, ''))) OVER (w ROWS UNBOUNDED PRECEDING) AS running_bytes
+        FROM tasks
+        WHERE operation = ? AND status IN ('done', 'failed', 'rejected', 'cancelled')
+        WINDOW w AS (ORDER BY created_at DESC)
+    )
+    WHERE position > ? OR running_bytes > ? OR created_at < ?
+"""
+
+
+@contextmanager
+def _transaction(conn):
+    # Maintenance connections run in autocommit mode (VACUUM needs it)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _chunks(items: list, size: int = BATCH_ROWS):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _archive_path(table: str) -> Path:
+    stamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S%fZ")
+    return ARCHIVE_DIR / f"{table}-{stamp}.ndjson.gz"
+
+
+def _request_record(row) -> dict:
+    row_id, operation, input_data, timestamp, text, blob, encoding = row
+    return {
+        "id": row_id, "operation": operation, "input_data": input_data, "timestamp": timestamp,
+        "result": text, "result_encoding": encoding,
+        "result_blob": base64.b64encode(blob).decode("ascii") if blob is not None else None,
+    }
+
+
+def _task_record(row) -> dict:
+    task_id, operation, input_data, result, status, created_at = row
+    return {"task_id": task_id, "operation": operation, "input_data": input_data,
+            "result": result, "status": status, "created_at": created_at}
+
+
+def _move_out(conn, ids: list, select_sql: str, to_record, delete_sql: str, table: str,
+              dry_run: bool) -> dict:
+    """Archive (when enabled) and delete the rows with the given ids."""
+    if dry_run or not ids:
+        return {"expired": len(ids), "archive": None}
+    archive = None
+    if RETENTION_ARCHIVE:
+        ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+        archive = _archive_path(table)
+        # Rows are written before they are deleted, so a crash can only
+        # leave a row both archived and still present, never lost
+        with gzip.open(archive, "wt", encoding="utf-8") as out:
+            for chunk in _chunks(ids):
+                marks = ",".join("?" * len(chunk))
+                for row in conn.execute(select_sql.format(marks=marks), chunk):
+                    out.write(json.dumps(to_record(row)) + "\n")
+    with _transaction(conn):
+        for chunk in _chunks(ids):
+            conn.execute(delete_sql.format(marks=",".join("?" * len(chunk))), chunk)
+    return {"expired": len(ids), "archive": str(archive) if archive else None}
+
+
+def dedupe_results(conn, min_bytes: int = DEDUPE_MIN_BYTES, dry_run: bool = False) -> dict:
+    """Move large results into the content-addressed results table.
+
+    Rows with identical results (the same operation and input always give
+    one) then share a single copy, keyed by the SHA-256 of the payload.
+    """
+    ids = [row[0] for row in conn.execute("""
+        SELECT id FROM requests
+        WHERE result_hash IS NULL
+              AND COALESCE(LENGTH(result_blob), LENGTH(result)) >= ?
+    """, (min_bytes,))]
+    moved, stored, saved = 0, 0, 0
+    if dry_run:
+        return {"moved": len(ids), "stored": 0, "bytes_saved": 0}
+    for chunk in _chunks(ids, 50):
+        with _transaction(conn):
+            for row_id in chunk:
+                row = conn.execute("""
+                    SELECT result, result_blob, result_encoding FROM requests WHERE id = ?
+                """, (row_id,)).fetchone()
+                if row is None:
+                    continue
+                text, blob, encoding = row
+                payload = blob if blob is not None else text.encode("utf-8")
+                kind = (encoding or "text").encode("ascii")
+                digest = hashlib.sha256(kind + b":" + payload).hexdigest()
+                inserted = conn.execute("""
+                    INSERT OR IGNORE INTO results (hash, result, result_blob, result_encoding, size)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (digest, text, blob, encoding, len(payload))).rowcount
+                # The row keeps its preview, so pages never need the results table
+                result = text or sqlite_store.decode_result(text, blob, encoding)
+                preview = sqlite_store.result_preview(result)
+                conn.execute("""
+                    UPDATE requests
+                    SET result_hash = ?, result = ?, result_blob = NULL, result_encoding = NULL
+                    WHERE id = ?
+                """, (digest, preview, row_id))
+                moved += 1
+                stored += inserted
+                saved += 0 if inserted else len(payload)
+    return {"moved": moved, "stored": stored, "bytes_saved": saved}
+
+
+def _drop_orphaned_results(conn) -> int:
+    with _transaction(conn):
+        return conn.execute("""
+            DELETE FROM results
+            WHERE NOT EXISTS (SELECT 1 FROM requests WHERE requests.result_hash = results.hash)
+        """).rowcount
+
+
+def incremental_vacuum(conn, pages: int = VACUUM_PAGES) -> dict:
+    """Return up to `pages` free pages to the filesystem.
+
+    The first run on a database created without auto_vacuum switches it to
+    incremental mode, which needs one full VACUUM.
+    """
+    converted = False
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        converted = True
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    # executescript steps the pragma to completion; execute() frees one page
+    conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+    after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return {"converted": converted, "bytes_freed": (before - after) * page_size,
+            "free_bytes_left": after * page_size}
+
+
+def _operations(conn, table: str) -> list:
+    return [row[0] for row in conn.execute(f"SELECT DISTINCT operation FROM {table}")]
+
+
+def maintain_requests(dry_run: bool = False, vacuum: bool = True) -> dict:
+    flush(sqlite_store.DB_FILE)
+    # Autocommit connection: VACUUM cannot run inside a transaction
+    conn = connect(sqlite_store.DB_FILE, isolation_level=None)
+    try:
+        report = {"dedupe": dedupe_results(conn, dry_run=dry_run), "expired": 0, "archives": []}
+        for operation in _operations(conn, "requests"):
+            policy = policy_for(operation)
+            ids = _expired_ids(conn, _EXPIRED_REQUESTS, operation, policy, _cutoff(policy))
+            moved = _move_out(
+                conn, ids,
+                f"""SELECT id, operation, input_data, timestamp, {sqlite_store.RESULT_COLUMNS}
+                    FROM {sqlite_store.REQUESTS_FROM} WHERE id IN ({{marks}})""",
+                _request_record, "DELETE FROM requests WHERE id IN ({marks})", "requests", dry_run
+            )
+            report["expired"] += moved["expired"]
+            if moved["archive"]:
+                report["archives"].append(moved["archive"])
+        report["orphaned_results"] = 0 if dry_run else _drop_orphaned_results(conn)
+        if vacuum and not dry_run:
+            report["vacuum"] = incremental_vacuum(conn)
+        return report
+    finally:
+        conn.close()
+
+
+def maintain_tasks(dry_run: bool = False, vacuum: bool = True) -> dict:
+    conn = connect(task_store.DB_FILE, isolation_level=None)
+    try:
+        report = {"expired": 0, "archives": []}
+        for operation in _operations(conn, "tasks"):
+            policy = policy_for(operation)
+            ids = _expired_ids(conn, _EXPIRED_TASKS, operation, policy,
+                               _cutoff(policy).replace(" ", "T"))
+            moved = _move_out(
+                conn, ids,
+                """SELECT task_id, operation, input_data, result, status, created_at
+                   FROM tasks WHERE task_id IN ({marks})""",
+                _task_record, "DELETE FROM tasks WHERE task_id IN ({marks})", "tasks", dry_run
+            )
+            report["expired"] += moved["expired"]
+            if moved["archive"]:
+                report["archives"].append(moved["archive"])
+        if vacuum and not dry_run:
+            report["vacuum"] = incremental_vacuum(conn)
+        return report
+    finally:
+        conn.close()
+
+
+def run_maintenance(dry_run: bool = False, vacuum: bool = True) -> dict:
+    """One pass over both databases: dedupe, retention and incremental vacuum."""
+    with _run_lock:
+        report = {
+            "requests": maintain_requests(dry_run, vacuum),
+            "tasks": maintain_tasks(dry_run, vacuum),
+        }
+    logger.info("maintenance pass finished", extra={"report": report})
+    return report
+
+
+def iter_archive(path):
+    """Yield the rows of an archive file; request results are decoded again."""
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        for line in archive:
+            record = json.loads(line)
+            if "result_blob" in record:
+                blob = record.pop("result_blob")
+                record["result"] = sqlite_store.decode_result(
+                    record["result"], base64.b64decode(blob) if blob is not None else None,
+                    record.pop("result_encoding")
+                )
+            yield record
+
+
+def _loop(interval: float):
+    while True:
+        time.sleep(interval)
+        try:
+            run_maintenance()
+        except sqlite3.Error as e:
+            logger.warning("maintenance pass failed", extra={"error": str(e)})
+
+
+def start_maintenance_loop(interval: float = MAINTENANCE_INTERVAL) -> bool:
+    """Run maintenance every `interval` seconds in a daemon thread; False if disabled."""
+    if interval <= 0:
+        return False
+    threading.Thread(target=_loop, args=(interval,), name="maintenance", daemon=True).start()
+    return True
@@ -1,19 +1,231 @@
-from functools import lru_cache
+import math
+import os
+from decimal import Decimal, InvalidOperation, Overflow, localcontext
+from services.checkpoints import factorial_checkpoints, fibonacci_checkpoints
+from services.progress import check_cancelled, report
+from services.result_cache import cached
 
-@lru_cache(maxsize=128)
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
+# Opt-in: gmpy2's GMP-backed factorial when the package is installed
+USE_GMPY2 = os.getenv("USE_GMPY2", "0") == "1" and gmpy2 is not None
+
+# --- Configurable pow modes ---
+POW_MODES = ("float", "int", "mod", "decimal")
+POW_DECIMAL_PRECISION = int(os.getenv("POW_DECIMAL_PRECISION", "50"))
+POW_MAX_PRECISION = int(os.getenv("POW_MAX_PRECISION", "5000"))
+# Exact results below this many bits come straight from the builtin pow;
+# bigger ones run the windowed loop, which reports progress as it goes
+_POW_PROGRESS_BITS = 1 << 20
+# Cost of a squaring grows as bits^1.585, so the work done after the
+# first k of n exponent bits is roughly (k/n)^2.585 of the total
+_POW_PROGRESS_EXPONENT = 2.585
+
+@cached("pow")
 def compute_pow(base: float, exp: float) -> float:
     return base ** exp
 
-@lru_cache(maxsize=512)
+def _windowed_pow(base: int, exp: int, window: int = 5) -> int:
+    # Left-to-right sliding window: one multiplication per window of up to
+    # `window` exponent bits, by a precomputed odd power of base
+    square = base * base
+    odd_powers = [base]
+    for _ in range((1 << (window - 1)) - 1):
+        odd_powers.append(odd_powers[-1] * square)
+    bits = bin(exp)[2:]
+    result = 1
+    i = 0
+    while i < len(bits):
+        if bits[i] == "0":
+            result *= result
+            i += 1
+        else:
+            j = min(i + window, len(bits))
+            while bits[j - 1] == "0":
+                j -= 1
+            for _ in range(j - i):
+                result *= result
+            result *= odd_powers[int(bits[i:j], 2) >> 1]
+            i = j
+        report((i / len(bits)) ** _POW_PROGRESS_EXPONENT)
+    return result
+
+@cached("pow_int")
+def compute_pow_int(base: int, exp: int) -> int:
+    """Exact base**exp for a non-negative integer exponent."""
+    if exp < 0:
+        raise ValueError("Integer pow needs a non-negative exponent")
+    if USE_GMPY2:
+        return int(gmpy2.mpz(base) ** exp)
+    if abs(base) < 2 or base.bit_length() * exp < _POW_PROGRESS_BITS:
+        return base ** exp
+    return _windowed_pow(base, exp)
+
+def compute_pow_mod(base: int, exp: int, mod: int) -> int:
+    """base**exp % mod without building base**exp (three-argument pow)."""
+    if mod == 0:
+        raise ValueError("Modulus must not be zero")
+    return pow(base, exp, mod)
+
+def compute_pow_decimal(base: str, exp: str, precision: int) -> Decimal:
+    """base**exp rounded to `precision` significant decimal digits."""
+    with localcontext() as context:
+        context.prec = precision
+        try:
+            return Decimal(base) ** Decimal(exp)
+        except Overflow:
+            raise ValueError(f"{base}^{exp} is too large for a decimal") from None
+        except InvalidOperation:
+            raise ValueError(f"{base}^{exp} is not a real number") from None
+
+# Compute function of each pow mode's operation
+POW_FUNCTIONS = {
+    "pow": compute_pow,
+    "pow_int": compute_pow_int,
+    "pow_mod": compute_pow_mod,
+    "pow_decimal": compute_pow_decimal,
+}
+
+def _integral(name: str, value) -> int:
+    if (isinstance(value, bool) or not isinstance(value, (int, float))
+            or isinstance(value, float) and not math.isfinite(value) or value != int(value)):
+        raise ValueError(f"{name} must be an integer in this mode")
+    return int(value)
+
+def pow_operation(mode: str, base, exponent, modulus=None, precision=None) -> tuple[str, tuple]:
+    """Validate pow inputs for a mode and return its (operation, args).
+
+    The operation name selects the compute function, the cost model
+    entry and the worker job for that mode. Raises ValueError on bad input.
+    """
+    if mode == "float":
+        try:
+            return "pow", (float(base), float(exponent))
+        except OverflowError:
+            raise ValueError("base and exponent must fit in a float in this mode") from None
+    if mode == "int":
+        exponent = _integral("exponent", exponent)
+        if exponent < 0:
+            raise ValueError("Integer pow needs a non-negative exponent")
+        return "pow_int", (_integral("base", base), exponent)
+    if mode == "mod":
+        if modulus is None:
+            raise ValueError("Modular pow needs a modulus")
+        modulus = _integral("modulus", modulus)
+        if modulus == 0:
+            raise ValueError("Modulus must not be zero")
+        return "pow_mod", (_integral("base", base), _integral("exponent", exponent), modulus)
+    if mode == "decimal":
+        precision = POW_DECIMAL_PRECISION if precision is None else precision
+        if not 1 <= precision <= POW_MAX_PRECISION:
+            raise ValueError(f"Precision must be between 1 and {POW_MAX_PRECISION}")
+        # str() keeps the shortest decimal spelling of float inputs
+        # (0.1, not 0.1000000000000000055...)
+        return "pow_decimal", (str(base), str(exponent), precision)
+    raise ValueError(f"Unknown pow mode: {mode}")
+
+def _fibonacci_pair(n: int) -> tuple[int, int]:
+    # Fast doubling: walks the bits of n from the top, keeping (F(k), F(k+1))
+    # F(2k) = F(k) * (2*F(k+1) - F(k)), F(2k+1) = F(k)^2 + F(k+1)^2
+    a, b = 0, 1
+    bits = bin(n)[2:]
+    for i, bit in enumerate(bits, start=1):
+        c = a * ((b << 1) - a)
+        d = a * a + b * b
+        if bit == "1":
+            a, b = d, c + d
+        else:
+            a, b = c, d
+        # Operands double every step, so step i costs ~3x step i-1
+        report(3.0 ** (i - len(bits)))
+    return a, b
+
+@cached("fibonacci")
 def compute_fibonacci(n: int) -> int:
+    if n <= 0:
+        return 0
+    checkpoint = fibonacci_checkpoints.floor(n)
+    # Resuming pays off only when the remaining distance is small next to n
+    if checkpoint is not None and (n - checkpoint[0]) * 8 <= n:
+        k, (fk, fk1) = checkpoint
+        # F(k+m) = F(k)F(m-1) + F(k+1)F(m), F(k+m+1) = F(k)F(m) + F(k+1)F(m+1)
+        fm, fm1 = _fibonacci_pair(n - k)
+        pair = fk * (fm1 - fm) + fk1 * fm, fk * fm + fk1 * fm1
+    else:
+        pair = _fibonacci_pair(n)
+    fibonacci_checkpoints.add(n, pair)
+    return pair[0]
+
+def compute_fibonacci_mod(n: int, m: int) -> int:
+    if m <= 0:
+        raise ValueError("modulus must be positive")
+    if n <= 0:
+        return 0
     a, b = 0, 1
-    for _ in range(n):
-        a, b = b, a + b
-    return a
+    for bit in bin(n)[2:]:
+        c = a * ((b << 1) - a) % m
+        d = (a * a + b * b) % m
+        if bit == "1":
+            a, b = d, (c + d) % m
+        else:
+            a, b = c, d
+    return a % m
+
+def _range_product(lo: int, hi: int) -> int:
+    # Product of lo..hi (inclusive) as a balanced tree so both operands of
+    # every multiplication have roughly the same size
+    if hi - lo < 16:
+        result = 1
+        for i in range(lo, hi + 1):
+            result *= i
+        return result
+    mid = (lo + hi) // 2
+    return _range_product(lo, mid) * _range_product(mid + 1, hi)
 
-@lru_cache(maxsize=512)
+def _progressive_product(lo: int, hi: int, chunks: int = 64) -> int:
+    # The same balanced product, evaluated as chunk leaves and then merge
+    # levels so long runs can report progress between multiplications
+    count = hi - lo + 1
+    if count < 4096:
+        return _range_product(lo, hi)
+    step = -(-count // chunks)
+    starts = range(lo, hi + 1, step)
+    parts = []
+    for i, start in enumerate(starts, start=1):
+        parts.append(_range_product(start, min(start + step - 1, hi)))
+        report(0.5 * i / len(starts))
+    # Higher merge levels multiply bigger numbers and cost more
+    weights = []
+    size = len(parts)
+    while size > 1:
+        weights.append(1.5 ** len(weights))
+        size = (size + 1) // 2
+    done = 0.0
+    for weight in weights:
+        merged = []
+        for i in range(0, len(parts), 2):
+            check_cancelled()
+            merged.append(parts[i] * parts[i + 1] if i + 1 < len(parts) else parts[i])
+        parts = merged
+        done += weight
+        report(0.5 + 0.5 * done / sum(weights))
+    return parts[0]
+
+@cached("factorial")
 def compute_factorial(n: int) -> int:
-    result = 1
-    for i in range(2, n + 1):
-        result *= i
+    if n < 2:
+        return 1
+    if USE_GMPY2:
+        return int(gmpy2.fac(n))
+    checkpoint = factorial_checkpoints.floor(n)
+    if checkpoint is None:
+        result = _progressive_product(2, n)
+    elif checkpoint[0] == n:
+        result = checkpoint[1]
+    else:
+        result = checkpoint[1] * _progressive_product(checkpoint[0] + 1, n)
+    factorial_checkpoints.add(n, result)
     return result
@@ -0,0 +1,214 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from math import log10
+
+# Prometheus text exposition format 0.0.4, without the client dependency
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+SECONDS_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300
+)
+BYTES_BUCKETS = tuple(10 ** k for k in range(1, 9))
+
+
+def size_bucket(value) -> str:
+    """Decade label for an input size: 12345 -> "1e4"."""
+    try:
+        value = abs(int(value))
+    except (TypeError, ValueError, OverflowError):
+        return "n/a"
+    return f"1e{int(log10(value))}" if value >= 1 else "0"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in (*zip(names, values), *extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(self._samples(items))
+        return lines
+
+    def _samples(self, items) -> list:
+        return [
+            f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in items
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._functions = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn, **labels):
+        """Read the value from fn() at scrape time."""
+        self._functions[self._key(labels)] = fn
+
+    def value(self, **labels) -> float:
+        key = self._key(labels)
+        fn = self._functions.get(key)
+        return fn() if fn is not None else self._values.get(key, 0)
+
+    def render(self) -> list:
+        with self._lock:
+            for key, fn in self._functions.items():
+                self._values[key] = fn()
+        return super().render()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=SECONDS_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def _samples(self, items) -> list:
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                labels = _labels(self.labelnames, key, [("le", _number(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=SECONDS_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+# --- Metrics recorded across the service ---
+# Worker processes keep their own registry; background jobs are therefore
+# measured from the parent (task_* metrics), not by math_compute_seconds.
+COMPUTE_SECONDS = registry.histogram(
+    "math_compute_seconds", "Time spent in compute engines on cache misses", ["operation", "size"])
+CACHE_LOOKUPS = registry.counter(
+    "math_cache_lookups_total", "Result cache lookups by outcome (memory, disk, miss)",
+    ["operation", "result"])
+RESULT_SIZE_BYTES = registry.histogram(
+    "math_result_size_bytes", "Size of stored results", ["operation"], buckets=BYTES_BUCKETS)
+PAGE_CACHE_LOOKUPS = registry.counter(
+    "page_cache_lookups_total", "Rendered page lookups by outcome (hit, miss, not_modified)",
+    ["page", "result"])
+SQLITE_WRITE_SECONDS = registry.histogram(
+    "sqlite_write_batch_seconds", "Group-commit latency of write-behind batches", ["db"])
+SQLITE_ROWS_WRITTEN = registry.counter(
+    "sqlite_rows_written_total", "Rows committed by the write-behind queue", ["db"])
+SQLITE_WRITE_ERRORS = registry.counter(
+    "sqlite_write_errors_total", "Queued writes dropped after a failed retry", ["db"])
+SQLITE_READ_SECONDS = registry.histogram(
+    "sqlite_read_seconds", "Latency of read queries", ["query"])
+TASK_QUEUE_DEPTH = registry.gauge(
+    "task_queue_depth", "Background jobs pending or running in the worker pool")
+TASK_WAIT_SECONDS = registry.histogram(
+    "task_queue_wait_seconds", "Time background jobs wait for a worker", ["operation"])
+TASK_RUN_SECONDS = registry.histogram(
+    "task_run_seconds", "Time background jobs run in a worker", ["operation", "size"])
+TASKS_FINISHED = registry.counter(
+    "tasks_finished_total", "Background tasks by final status", ["operation", "status"])
+LANE_PENDING = registry.gauge(
+    "lane_pending", "Calls admitted to an executor lane (running or waiting)", ["lane"])
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_seconds", "HTTP request latency", ["method", "route", "status"])
@@ -0,0 +1,76 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from services.metrics import PAGE_CACHE_LOOKUPS
+
+# Rendered pages kept; each (page, query) pair is one entry
+PAGE_CACHE_ENTRIES = int(os.getenv("PAGE_CACHE_ENTRIES", "256"))
+# Browsers keep the page but ask whether it changed before showing it
+CACHE_CONTROL = "private, no-cache"
+
+
+def http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
+
+
+def page_etag(key: tuple, version: int, updated_at: float) -> str:
+    # updated_at tells a recreated database apart from the old one
+    digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()[:16]
+    return f'W/"{digest}-{version}-{int(updated_at * 1000)}"'
+
+
+def not_modified(headers, etag: str, updated_at: float) -> bool:
+    """RFC 9110 conditional GET: If-None-Match wins over If-Modified-Since."""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison, as required for GET
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag.removeprefix("W/") in tags
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates have whole seconds
+    return int(updated_at) <= since
+
+
+class PageCache:
+    """LRU of rendered pages, each valid for one write version.
+
+    Entries are keyed on (page, query); a lookup with a newer version
+    misses and the page is rendered again.
+    """
+
+    def __init__(self, max_entries: int = PAGE_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, version: int) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                PAGE_CACHE_LOOKUPS.inc(page=key[0], result="miss")
+                return None
+            self._entries.move_to_end(key)
+        PAGE_CACHE_LOOKUPS.inc(page=key[0], result="hit")
+        return entry[1]
+
+    def put(self, key: tuple, version: int, body: bytes):
+        with self._lock:
+            self._entries[key] = (version, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+page_cache = PageCache()
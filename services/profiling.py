@@ -0,0 +1,171 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, UTC
+from pathlib import Path
+from services.auth import is_authorized
+
+# --- Configurable profiling (off unless PROFILING_ENABLED=1) ---
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", str(Path("storage") / "profiles")))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+
+_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+# Leaf frames of threads that are only waiting; they would drown the profile
+_IDLE_LEAVES = {
+    ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"), ("selectors.py", "select"), ("thread.py", "_worker"),
+    ("connection.py", "_recv_bytes"), ("connection.py", "poll"),
+}
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _stack(frame) -> list | None:
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+        return None
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    names.reverse()
+    return names
+
+
+class Sampler:
+    """Sample the stacks of all busy threads every `interval` seconds.
+
+    Request work spans the event loop, lane threads and the SQLite writer,
+    so every thread is sampled and the thread name is the root frame.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = _stack(frame)
+                if stack is not None:
+                    self.stacks[";".join([names.get(ident, str(ident)), *stack])] += 1
+            self.samples += 1
+
+
+def save_profile(sampler: Sampler, method: str, path: str, status: int, seconds: float) -> str:
+    profile_id = uuid.uuid4().hex
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    profile = {
+        "id": profile_id,
+        "created_at": datetime.now(UTC).isoformat(),
+        "method": method,
+        "path": path,
+        "status": status,
+        "duration_ms": round(seconds * 1000, 3),
+        "interval_ms": sampler.interval * 1000,
+        "samples": sampler.samples,
+        "stacks": dict(sampler.stacks),
+    }
+    (PROFILE_DIR / f"{profile_id}.json").write_text(json.dumps(profile))
+    _prune()
+    return profile_id
+
+
+def _prune():
+    files = sorted(PROFILE_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for stale in files[PROFILE_KEEP:]:
+        stale.unlink(missing_ok=True)
+
+
+def list_profiles() -> list:
+    """Metadata of stored profiles, newest first."""
+    if not PROFILE_DIR.exists():
+        return []
+    profiles = []
+    for file in PROFILE_DIR.glob("*.json"):
+        profile = json.loads(file.read_text())
+        profile.pop("stacks")
+        profiles.append(profile)
+    return sorted(profiles, key=lambda p: p["created_at"], reverse=True)
+
+
+def load_profile(profile_id: str) -> dict | None:
+    if not _ID_PATTERN.match(profile_id):
+        return None
+    file = PROFILE_DIR / f"{profile_id}.json"
+    return json.loads(file.read_text()) if file.exists() else None
+
+
+def to_collapsed(profile: dict) -> str:
+    """Brendan Gregg's collapsed stacks, for flamegraph.pl or speedscope."""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(profile["stacks"].items()))
+
+
+def to_speedscope(profile: dict) -> dict:
+    frames, index = [], {}
+    samples, weights = [], []
+    for stack, count in profile["stacks"].items():
+        sample = []
+        for name in stack.split(";"):
+            if name not in index:
+                index[name] = len(frames)
+                frames.append({"name": name})
+            sample.append(index[name])
+        samples.append(sample)
+        weights.append(count * profile["interval_ms"])
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": f"{profile['method']} {profile['path']}",
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights,
+        }],
+        "name": f"{profile['method']} {profile['path']}",
+        "exporter": "math-microservice",
+    }
+
+
+def wants_profile(request) -> bool:
+    return request.headers.get("X-Profile") == "1" or request.query_params.get("profile") == "1"
+
+
+async def profile_requests(request, call_next):
+    """HTTP middleware, only installed when PROFILING_ENABLED=1."""
+    if not wants_profile(request) or not is_authorized(request):
+        return await call_next(request)
+    start = time.perf_counter()
+    with Sampler() as sampler:
+        response = await call_next(request)
+    profile_id = save_profile(sampler, request.method, request.url.path,
+                              response.status_code, time.perf_counter() - start)
+    response.headers["X-Profile-Id"] = profile_id
+    return response
@@ -0,0 +1,67 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Compute engines call report() and check_cancelled() at natural checkpoints.
+# Outside a reporting() block they are attribute lookups and do nothing.
+_state = threading.local()
+
+
+class Cancelled(Exception):
+    """Raised at a checkpoint once the running computation was cancelled."""
+
+
+def check_cancelled():
+    should_cancel = getattr(_state, "should_cancel", None)
+    if should_cancel is not None and should_cancel():
+        raise Cancelled()
+
+
+def report(fraction: float):
+    callback = getattr(_state, "callback", None)
+    if callback is not None:
+        callback(min(max(fraction, 0.0), 1.0))
+    check_cancelled()
+
+
+@contextmanager
+def reporting(callback=None, should_cancel=None):
+    """Send report() calls made in this thread to callback(fraction).
+
+    With should_cancel, check_cancelled() (and report()) raise Cancelled once
+    it returns True.
+    """
+    previous = getattr(_state, "callback", None), getattr(_state, "should_cancel", None)
+    _state.callback, _state.should_cancel = callback, should_cancel
+    try:
+        yield
+    finally:
+        _state.callback, _state.should_cancel = previous
+
+
+def throttled(callback, min_interval: float = 0.25, min_delta: float = 0.01):
+    """Wrap callback so it fires at most every min_interval seconds."""
+    last = {"at": 0.0, "fraction": -1.0}
+
+    def wrapper(fraction: float):
+        now = time.monotonic()
+        if fraction < 1.0 and (now - last["at"] < min_interval
+                               or fraction - last["fraction"] < min_delta):
+            return
+        last["at"], last["fraction"] = now, fraction
+        callback(fraction)
+
+    return wrapper
+
+
+def polled(predicate, interval: float):
+    """Wrap predicate so it is evaluated at most every interval seconds."""
+    last = {"at": float("-inf"), "value": False}
+
+    def wrapper():
+        now = time.monotonic()
+        if now - last["at"] >= interval:
+            last["at"], last["value"] = now, predicate()
+        return last["value"]
+
+    return wrapper
@@ -0,0 +1,225 @@
+import os
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from pathlib import Path
+from services.metrics import CACHE_LOOKUPS, COMPUTE_SECONDS, size_bucket
+from storage.engine import get_connection
+
+# --- Configurable budgets ---
+CACHE_DB_FILE = Path(os.getenv("RESULT_CACHE_DB", str(Path("storage") / "result_cache.db")))
+CACHE_MEMORY_BYTES = int(os.getenv("RESULT_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+CACHE_DISK_BYTES = int(os.getenv("RESULT_CACHE_DISK_BYTES", str(1024 * 1024 * 1024)))
+# Small results are cheaper to recompute than to read back from disk
+CACHE_MIN_DISK_BYTES = int(os.getenv("RESULT_CACHE_MIN_DISK_BYTES", "4096"))
+CACHE_DISK_ENABLED = os.getenv("RESULT_CACHE_DISK", "1") == "1"
+
+
+def encode_value(value: int | float) -> tuple[str, bytes]:
+    if isinstance(value, bool):
+        raise TypeError("bool results are not cached")
+    if isinstance(value, int):
+        length = (value.bit_length() + 8) // 8
+        return "int", value.to_bytes(length, "little", signed=True)
+    if isinstance(value, float):
+        return "float", struct.pack("<d", value)
+    raise TypeError(f"Cannot cache {type(value).__name__} results")
+
+
+def decode_value(kind: str, data: bytes) -> int | float:
+    if kind == "int":
+        return int.from_bytes(data, "little", signed=True)
+    if kind == "float":
+        return struct.unpack("<d", data)[0]
+    raise ValueError(f"Unknown cached value kind: {kind}")
+
+
+def value_size(value) -> int:
+    if isinstance(value, int):
+        return (value.bit_length() + 8) // 8
+    return 8
+
+
+class ResultCache:
+    """Two-tier result cache keyed on (operation, inputs).
+
+    The memory tier is an LRU bounded by bytes. Results of at least
+    CACHE_MIN_DISK_BYTES also go to a SQLite blob table that every worker
+    process and the CLI share; it is trimmed least-recently-used first.
+    """
+
+    def __init__(self, memory_bytes=CACHE_MEMORY_BYTES, disk_bytes=CACHE_DISK_BYTES,
+                 db_file=CACHE_DB_FILE, disk_enabled=CACHE_DISK_ENABLED):
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.db_file = Path(db_file)
+        self.disk_enabled = disk_enabled
+        self._entries = OrderedDict()
+        self._used = 0
+        self._lock = threading.Lock()
+        self._disk_ready = False
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+    # --- Disk tier ---
+    def _connect(self):
+        conn = get_connection(self.db_file)
+        if not self._disk_ready:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_access ON cache(last_access)")
+            self._disk_ready = True
+        return conn
+
+    def _disk_get(self, key):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT kind, value FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE cache SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+        return decode_value(row[0], row[1])
+
+    def _disk_put(self, key, value):
+        kind, data = encode_value(value)
+        with self._connect() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO cache (key, kind, value, size, last_access)
+                VALUES (?, ?, ?, ?, ?)
+            """, (key, kind, data, len(data), time.time()))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+            if total <= self.disk_bytes:
+                return
+            rows = conn.execute(
+                "SELECT key, size FROM cache WHERE key != ? ORDER BY last_access", (key,)
+            ).fetchall()
+            for old_key, size in rows:
+                if total <= self.disk_bytes:
+                    break
+                conn.execute("DELETE FROM cache WHERE key = ?", (old_key,))
+                total -= size
+                self.disk_evictions += 1
+
+    # --- Memory tier ---
+    def _memory_put(self, key, value):
+        size = value_size(value)
+        if size > self.memory_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._used -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._used += size
+            while self._used > self.memory_bytes:
+                _, (_, old_size) = self._entries.popitem(last=False)
+                self._used -= old_size
+                self.evictions += 1
+
+    def get(self, key):
+        """Return (found, value)."""
+        tier, value = self.lookup(key)
+        return tier is not None, value
+
+    def lookup(self, key):
+        """Return (tier, value); tier is "memory", "disk" or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return "memory", entry[0]
+        if self.disk_enabled:
+            try:
+                value = self._disk_get(key)
+            except sqlite3.Error:
+                value = None
+            if value is not None:
+                self.hits += 1
+                self.disk_hits += 1
+                self._memory_put(key, value)
+                return "disk", value
+        self.misses += 1
+        return None, None
+
+    def put(self, key, value):
+        try:
+            encode_value(value)
+        except TypeError:
+            return
+        self._memory_put(key, value)
+        if self.disk_enabled and value_size(value) >= CACHE_MIN_DISK_BYTES:
+            try:
+                self._disk_put(key, value)
+            except sqlite3.Error:
+                pass
+
+    def clear(self, disk: bool = False):
+        with self._lock:
+            self._entries.clear()
+            self._used = 0
+        if disk and self.disk_enabled:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM cache")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        stats = {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "disk_evictions": self.disk_evictions,
+            "memory_entries": len(self._entries),
+            "memory_bytes": self._used,
+            "memory_budget_bytes": self.memory_bytes,
+        }
+        if self.disk_enabled:
+            try:
+                with self._connect() as conn:
+                    count, size = conn.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache"
+                    ).fetchone()
+                stats.update(disk_entries=count, disk_bytes=size,
+                             disk_budget_bytes=self.disk_bytes)
+            except sqlite3.Error:
+                pass
+        return stats
+
+
+result_cache = ResultCache()
+
+
+def cached(operation: str):
+    """Memoize a compute function in the shared result cache."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args):
+            key = f"{operation}:{','.join(repr(a) for a in args)}"
+            tier, value = result_cache.lookup(key)
+            CACHE_LOOKUPS.inc(operation=operation, result=tier or "miss")
+            if tier is not None:
+                return value
+            # Sized by n, or by the exponent for pow
+            with COMPUTE_SECONDS.time(operation=operation, size=size_bucket(args[-1])):
+                value = func(*args)
+            result_cache.put(key, value)
+            return value
+        return wrapper
+    return decorator
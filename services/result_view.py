@@ -0,0 +1,155 @@
+from functools import lru_cache
+from math import log10
+
+LOG10_2 = log10(2)
+# Below these sizes the builtin quadratic algorithms are faster
+_DIV_LIMIT_BITS = 4000
+_STR_LIMIT_DIGITS = 1000
+
+
+# --- Subquadratic division (recursive Burnikel-Ziegler) ---
+def _div2n1n(a: int, b: int, n: int):
+    # Divide a < 2**n * b by the n-bit b
+    if a.bit_length() - n <= _DIV_LIMIT_BITS:
+        return divmod(a, b)
+    pad = n & 1
+    if pad:
+        a <<= 1
+        b <<= 1
+        n += 1
+    half = n >> 1
+    mask = (1 << half) - 1
+    b1, b2 = b >> half, b & mask
+    q1, r = _div3n2n(a >> n, (a >> half) & mask, b, b1, b2, half)
+    q2, r = _div3n2n(r, a & mask, b, b1, b2, half)
+    if pad:
+        r >>= 1
+    return q1 << half | q2, r
+
+
+def _div3n2n(a12: int, a3: int, b: int, b1: int, b2: int, n: int):
+    if a12 >> n == b1:
+        q, r = (1 << n) - 1, a12 - (b1 << n) + b1
+    else:
+        q, r = _div2n1n(a12, b1, n)
+    r = (r << n | a3) - q * b2
+    while r < 0:
+        q -= 1
+        r += b
+    return q, r
+
+
+def _int2digits(a: int, n: int) -> list:
+    # Little-endian base 2**n digits of a, split recursively
+    digits = [0] * ((a.bit_length() + n - 1) // n)
+
+    def inner(x, lo, hi):
+        if lo + 1 == hi:
+            digits[lo] = x
+            return
+        mid = (lo + hi) >> 1
+        shift = (mid - lo) * n
+        upper = x >> shift
+        inner(x ^ (upper << shift), lo, mid)
+        inner(upper, mid, hi)
+
+    if a:
+        inner(a, 0, len(digits))
+    return digits
+
+
+def _digits2int(digits: list, n: int) -> int:
+    def inner(lo, hi):
+        if lo + 1 == hi:
+            return digits[lo]
+        mid = (lo + hi) >> 1
+        return (inner(mid, hi) << ((mid - lo) * n)) + inner(lo, mid)
+
+    return inner(0, len(digits)) if digits else 0
+
+
+def fast_divmod(a: int, b: int):
+    """divmod for non-negative a and positive b in O(M(n) log n).
+
+    CPython 3.11 divides big ints in quadratic time; this splits a into
+    base 2**bits(b) digits and divides each with the recursive algorithm.
+    """
+    if b.bit_length() <= _DIV_LIMIT_BITS or a.bit_length() - b.bit_length() <= _DIV_LIMIT_BITS:
+        return divmod(a, b)
+    n = b.bit_length()
+    r = 0
+    q_digits = []
+    for digit in reversed(_int2digits(a, n)):
+        q, r = _div2n1n((r << n) + digit, b, n)
+        q_digits.append(q)
+    q_digits.reverse()
+    return _digits2int(q_digits, n), r
+
+
+@lru_cache(maxsize=64)
+def pow10(k: int) -> int:
+    return 10 ** k
+
+
+# --- Decimal views ---
+def digit_count(n: int) -> int:
+    """Exact number of decimal digits of |n|, from bit_length."""
+    n = abs(n)
+    if n < 10:
+        return 1
+    bits = n.bit_length()
+    # 2**(bits-1) <= n < 2**bits pins the digit count down to two candidates
+    low = int((bits - 1) * LOG10_2) + 1
+    high = int(bits * LOG10_2) + 1
+    if low == high:
+        return low
+    return high if n >= pow10(low) else low
+
+
+def to_decimal(n: int) -> str:
+    """str(n) by divide and conquer, without the int_max_str_digits cap."""
+    if n < 0:
+        return "-" + to_decimal(-n)
+    digits = digit_count(n)
+    if digits <= _STR_LIMIT_DIGITS:
+        return str(n)
+    half = digits // 2
+    hi, lo = fast_divmod(n, pow10(half))
+    return to_decimal(hi) + to_decimal(lo).zfill(half)
+
+
+def leading_digits(n: int, count: int) -> str:
+    """The first `count` digits of |n|; cost is linear in the size of n."""
+    n = abs(n)
+    total = digit_count(n)
+    if total <= count:
+        return to_decimal(n)
+    # The quotient is only `count` digits long, so the division stays cheap
+    return to_decimal(n // pow10(total - count))
+
+
+def digit_range(n: int, start: int, length: int) -> str:
+    """Digits [start, start+length) of |n|, counted from the most significant."""
+    n = abs(n)
+    total = digit_count(n)
+    start = max(start, 0)
+    end = min(start + max(length, 0), total)
+    if start >= end:
+        return ""
+    value = n
+    if end < total:
+        value = fast_divmod(value, pow10(total - end))[0]
+    if start > 0:
+        value = fast_divmod(value, pow10(end - start))[1]
+    return to_decimal(value).zfill(end - start)
+
+
+def summarize(result, max_digits: int, template: str = "{head}... [{total} digits total]") -> str:
+    """Short display form: full value when small, else leading digits and length."""
+    if isinstance(result, bool) or not isinstance(result, int):
+        return str(result)
+    total = digit_count(result)
+    if total <= max_digits:
+        return to_decimal(result)
+    sign = "-" if result < 0 else ""
+    return template.format(head=sign + leading_digits(result, max_digits), total=total)
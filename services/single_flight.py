@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import uuid
+
+
+def flight_key(operation: str, *args) -> tuple:
+    # Equal numbers hash alike (2 == 2.0), so the raw tuple already
+    # normalizes int/float spellings of the same input
+    return (operation, *args)
+
+
+class SingleFlight:
+    """Coalesce concurrent async calls with the same key onto one execution.
+
+    The first caller starts fn(*args) as a task; callers arriving while it
+    runs await the same task. A caller that disconnects does not cancel
+    the shared work for the others.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def run(self, key, fn, *args):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+            self.started += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every caller went away
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._inflight), "started": self.started, "coalesced": self.coalesced
+        }
+
+
+class TaskFlight:
+    """Map a key to the background task that is already computing it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_key = {}
+        self._keys = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def claim(self, key) -> tuple[str, bool]:
+        """Return (task_id, created); created is False when joining a running task."""
+        with self._lock:
+            task_id = self._by_key.get(key)
+            if task_id is not None:
+                self.coalesced += 1
+                return task_id, False
+            task_id = str(uuid.uuid4())
+            self._by_key[key] = task_id
+            self._keys[task_id] = key
+            self.started += 1
+            return task_id, True
+
+    def release(self, task_id: str):
+        """Forget a finished task so the next request starts a fresh one."""
+        with self._lock:
+            key = self._keys.pop(task_id, None)
+            if key is not None and self._by_key.get(key) == task_id:
+                del self._by_key[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._by_key), "started": self.started,
+                "coalesced": self.coalesced
+            }
+
+
+inline_flight = SingleFlight()
+task_flight = TaskFlight()
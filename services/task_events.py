@@ -0,0 +1,97 @@
+import asyncio
+import threading
+from collections import OrderedDict
+
+TERMINAL_STATUSES = {"done", "failed", "rejected", "cancelled"}
+# Latest state is kept for this many tasks; older ones fall back to SQLite
+MAX_TRACKED_TASKS = 10000
+
+
+class Subscription:
+    def __init__(self, bus, task_id: str, loop, queue):
+        self.bus = bus
+        self.task_id = task_id
+        self.loop = loop
+        self.queue = queue
+
+    async def next(self, timeout: float | None = None):
+        """Next event for the task, or None when the timeout elapses."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.bus._unsubscribe(self)
+
+
+class TaskEventBus:
+    """In-process pub/sub of task status and progress changes.
+
+    Publishers may run in any thread; subscribers are asyncio queues that
+    are fed through their loop's call_soon_threadsafe. Each task carries
+    a version number so long-poll clients can ask for "anything newer".
+    """
+
+    def __init__(self, max_tasks: int = MAX_TRACKED_TASKS):
+        self.max_tasks = max_tasks
+        self._lock = threading.Lock()
+        self._latest = OrderedDict()
+        self._subscribers = {}
+
+    def publish(self, task_id: str, **changes) -> dict:
+        with self._lock:
+            event = dict(self._latest.get(task_id) or {"task_id": task_id, "version": 0})
+            event.update(changes)
+            event["version"] += 1
+            self._latest[task_id] = event
+            self._latest.move_to_end(task_id)
+            while len(self._latest) > self.max_tasks:
+                self._latest.popitem(last=False)
+            subscribers = list(self._subscribers.get(task_id, ()))
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub.queue.put_nowait, event)
+            except RuntimeError:
+                # The subscriber's loop has been closed
+                self._unsubscribe(sub)
+        return event
+
+    def latest(self, task_id: str) -> dict | None:
+        with self._lock:
+            event = self._latest.get(task_id)
+            return dict(event) if event else None
+
+    def subscribe(self, task_id: str) -> Subscription:
+        """Subscribe from inside a running event loop."""
+        sub = Subscription(self, task_id, asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers.setdefault(task_id, set()).add(sub)
+        return sub
+
+    def _unsubscribe(self, sub: Subscription):
+        with self._lock:
+            subs = self._subscribers.get(sub.task_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.task_id]
+
+    async def wait(self, task_id: str, since: int = 0, timeout: float = 30.0) -> dict | None:
+        """Return the task's state once its version exceeds `since`.
+
+        Returns the current (possibly unchanged) state, or None for unknown
+        tasks, when nothing happens within the timeout.
+        """
+        sub = self.subscribe(task_id)
+        try:
+            current = self.latest(task_id)
+            if current is not None and current["version"] > since:
+                return current
+            event = await sub.next(timeout)
+            return event if event is not None else self.latest(task_id)
+        finally:
+            sub.close()
+
+
+task_events = TaskEventBus()
@@ -0,0 +1,229 @@
+import os
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, ProcessPoolExecutor
+from services.math_ops import (
+    POW_FUNCTIONS, compute_factorial, compute_fibonacci, compute_fibonacci_mod
+)
+from services.metrics import TASK_QUEUE_DEPTH, TASK_RUN_SECONDS, TASK_WAIT_SECONDS, size_bucket
+from services.progress import polled, report, reporting, throttled
+from storage.task_store import is_cancel_requested
+
+# --- Configurable limits ---
+# TASK_WORKERS=0 runs jobs inline in the calling thread (no worker processes)
+TASK_WORKERS = int(os.getenv("TASK_WORKERS", str(os.cpu_count() or 1)))
+TASK_MAX_QUEUE = int(os.getenv("TASK_MAX_QUEUE", "64"))
+# Seconds a client turned away by a full queue is asked to wait
+TASK_RETRY_AFTER = int(os.getenv("TASK_RETRY_AFTER", "5"))
+TASK_TIMEOUT = float(os.getenv("TASK_TIMEOUT", "600"))
+# Running jobs look up their cancellation flag at most this often (seconds)
+TASK_CANCEL_POLL = float(os.getenv("TASK_CANCEL_POLL", "0.5"))
+# "pool" runs jobs in this server's worker processes; "queue" stores them in
+# SQLite for separate `worker` processes (services/task_worker.py)
+TASK_BACKEND = os.getenv("TASK_BACKEND", "pool")
+# Unfinished tasks are leased; a lease not renewed within this many seconds
+# marks its owner as dead. Leases are renewed every third of this period.
+TASK_LEASE_SECONDS = float(os.getenv("TASK_LEASE_SECONDS", "30"))
+TASK_MAX_ATTEMPTS = int(os.getenv("TASK_MAX_ATTEMPTS", "3"))
+# Seconds before a failed durable job is retried, doubled on each attempt
+TASK_RETRY_DELAY = float(os.getenv("TASK_RETRY_DELAY", "5"))
+# How often idle workers look for jobs and the server for job updates
+TASK_QUEUE_POLL = float(os.getenv("TASK_QUEUE_POLL", "0.5"))
+
+OPERATIONS = {
+    **POW_FUNCTIONS,
+    "fibonacci": compute_fibonacci,
+    "fibonacci_mod": compute_fibonacci_mod,
+    "factorial": compute_factorial,
+}
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+class TaskTimeoutError(TimeoutError):
+    pass
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(max(TASK_MAX_QUEUE, 1))
+# task_id -> worker future, so queued jobs can be dropped on cancel
+_jobs = {}
+# Parent side: callback(task_id, fraction) for progress of running jobs
+_progress_listener = None
+# Worker side: queue that carries progress back to the parent process
+_worker_progress_queue = None
+_progress_queue = None
+
+
+def set_progress_listener(listener):
+    global _progress_listener
+    _progress_listener = listener
+
+
+def _init_worker(progress_queue):
+    global _worker_progress_queue
+    _worker_progress_queue = progress_queue
+
+
+def _pump_progress(progress_queue):
+    while True:
+        try:
+            item = progress_queue.get()
+        except (EOFError, OSError):
+            return  # queue closed at interpreter exit
+        if item is None:
+            return
+        if _progress_listener is not None:
+            try:
+                _progress_listener(*item)
+            except Exception:
+                # A lost progress update must not stop later ones
+                continue
+
+
+def _compute(operation: str, args: tuple, task_id: str | None = None):
+    if task_id is None:
+        return OPERATIONS[operation](*args)
+    if _worker_progress_queue is not None:
+        sink = throttled(lambda fraction: _worker_progress_queue.put((task_id, fraction)))
+    elif _progress_listener is not None:
+        sink = throttled(lambda fraction: _progress_listener(task_id, fraction))
+    else:
+        sink = None
+    # The flag lives in the task table so any process (server, CLI) can set it
+    should_cancel = polled(lambda: is_cancel_requested(task_id), TASK_CANCEL_POLL)
+    with reporting(sink, should_cancel):
+        report(0.0)
+        return OPERATIONS[operation](*args)
+
+
+def _timed_compute(operation: str, args: tuple, task_id: str | None = None):
+    # Wall-clock start time so the parent can tell how long the job queued
+    started_at = time.time()
+    start = time.perf_counter()
+    result = _compute(operation, args, task_id)
+    return result, started_at, time.perf_counter() - start
+
+
+def _record_timing(operation: str, args: tuple, submitted_at: float, started_at: float,
+                   seconds: float):
+    TASK_WAIT_SECONDS.observe(max(started_at - submitted_at, 0.0), operation=operation)
+    TASK_RUN_SECONDS.observe(seconds, operation=operation, size=size_bucket(args[-1]))
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor, _progress_queue
+    with _executor_lock:
+        if _executor is None:
+            # spawn avoids forking a process that already runs server threads
+            context = multiprocessing.get_context("spawn")
+            _progress_queue = context.Queue()
+            threading.Thread(
+                target=_pump_progress, args=(_progress_queue,), name="task-progress", daemon=True
+            ).start()
+            _executor = ProcessPoolExecutor(
+                max_workers=TASK_WORKERS,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(_progress_queue,)
+            )
+        return _executor
+
+
+def shutdown(wait: bool = True):
+    global _executor, _progress_queue
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait, cancel_futures=True)
+            _executor = None
+        if _progress_queue is not None:
+            _progress_queue.put(None)
+            _progress_queue = None
+
+
+def submit(operation: str, *args, task_id: str | None = None,
+           timeout: float | None = None) -> Future:
+    """Run a compute job in the worker pool and return a future for its result.
+
+    Raises QueueFullError when TASK_MAX_QUEUE jobs are already pending or
+    running. The returned future fails with TaskTimeoutError once the
+    timeout elapses; the queue slot is held until the worker really finishes.
+    With a task_id, the job's progress is sent to the progress listener.
+    """
+    if operation not in OPERATIONS:
+        raise ValueError(f"Unknown operation: {operation}")
+
+    outer = Future()
+    submitted_at = time.time()
+    if TASK_WORKERS <= 0:
+        try:
+            result, started_at, seconds = _timed_compute(operation, args, task_id)
+            _record_timing(operation, args, submitted_at, started_at, seconds)
+            outer.set_result(result)
+        except Exception as e:
+            outer.set_exception(e)
+        return outer
+
+    if not _slots.acquire(blocking=False):
+        raise QueueFullError(f"Task queue is full ({TASK_MAX_QUEUE} jobs pending)")
+
+    try:
+        inner = get_executor().submit(_timed_compute, operation, args, task_id)
+    except Exception:
+        _slots.release()
+        raise
+    TASK_QUEUE_DEPTH.inc()
+
+    limit = TASK_TIMEOUT if timeout is None else timeout
+    timer = threading.Timer(limit, _expire, (inner, outer, limit))
+    timer.daemon = True
+
+    def _done(f: Future):
+        timer.cancel()
+        _slots.release()
+        TASK_QUEUE_DEPTH.dec()
+        if task_id is not None:
+            _jobs.pop(task_id, None)
+        if f.cancelled():
+            outer.cancel()
+        elif f.exception() is not None:
+            _settle(outer.set_exception, f.exception())
+        else:
+            result, started_at, seconds = f.result()
+            _record_timing(operation, args, submitted_at, started_at, seconds)
+            _settle(outer.set_result, result)
+
+    if task_id is not None:
+        _jobs[task_id] = inner
+    inner.add_done_callback(_done)
+    timer.start()
+    return outer
+
+
+def cancel(task_id: str) -> bool:
+    """Drop a job that has not started yet; True if it was dropped.
+
+    Running jobs stop at their next progress checkpoint once the task is
+    flagged with storage.task_store.request_cancel().
+    """
+    inner = _jobs.get(task_id)
+    return inner is not None and inner.cancel()
+
+
+def _expire(inner: Future, outer: Future, limit: float):
+    # Jobs that have not started yet are dropped; running ones stop at their
+    # next checkpoint once the task row is marked failed
+    inner.cancel()
+    _settle(outer.set_exception, TaskTimeoutError(f"Task exceeded {limit:g}s timeout"))
+
+
+def _settle(setter, value):
+    # The timer and the worker callback race to settle the same future
+    try:
+        setter(value)
+    except InvalidStateError:
+        pass
@@ -0,0 +1,130 @@
+import logging
+import signal
+import threading
+import time
+from services.progress import Cancelled, polled, report, reporting, throttled
+from services.task_runner import (
+    OPERATIONS, TASK_CANCEL_POLL, TASK_LEASE_SECONDS, TASK_MAX_ATTEMPTS,
+    TASK_QUEUE_POLL, TASK_RETRY_DELAY, TASK_TIMEOUT
+)
+from storage.engine import flush
+from storage.sqlite_store import init_db, store_request_sqlite
+from storage.task_store import (
+    claim_task, init_task_db, is_cancel_requested, lease_owner_id, recover_expired_tasks,
+    renew_leases, requeue_task, update_task_error, update_task_progress, update_task_result
+)
+
+logger = logging.getLogger(__name__)
+
+# Bad input fails the same way on every attempt, so it is not retried
+PERMANENT_ERRORS = (ArithmeticError, ValueError, TypeError)
+
+
+class Worker:
+    """Runs durable jobs (TASK_BACKEND=queue) one at a time.
+
+    The lease of the running job is renewed from a heartbeat thread; when
+    the worker dies, the job's lease expires and another worker (or the
+    server) puts it back in the queue. stop() makes the running job give
+    its lease back at its next checkpoint.
+    """
+
+    def __init__(self, lease: float = TASK_LEASE_SECONDS, poll: float = TASK_QUEUE_POLL,
+                 max_attempts: int = TASK_MAX_ATTEMPTS, retry_delay: float = TASK_RETRY_DELAY,
+                 timeout: float = TASK_TIMEOUT):
+        self.owner = lease_owner_id("worker")
+        self.lease = lease
+        self.poll = poll
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+        self.completed = 0
+        self._stopping = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    def run(self, burst: bool = False):
+        """Work until stop() is called; with burst, also stop once the queue is empty."""
+        heartbeat = threading.Thread(target=self._heartbeat, name="task-heartbeat", daemon=True)
+        heartbeat.start()
+        try:
+            while not self._stopping.is_set():
+                recover_expired_tasks(self.max_attempts)
+                if self.run_one():
+                    continue
+                if burst:
+                    break
+                self._stopping.wait(self.poll)
+        finally:
+            self._stopping.set()
+            heartbeat.join()
+            flush()
+
+    def _heartbeat(self):
+        while not self._stopping.wait(self.lease / 3):
+            renew_leases(self.owner, self.lease)
+
+    def run_one(self) -> bool:
+        """Claim and run one job; False when no job was ready."""
+        claimed = claim_task(self.owner, self.lease)
+        if claimed is None:
+            return False
+        task_id, job, attempts = claimed
+        logger.info("claimed task", extra={"task_id": task_id, "operation": job["operation"],
+                                           "attempt": attempts})
+        deadline = time.monotonic() + self.timeout
+        cancel_requested = polled(lambda: is_cancel_requested(task_id), TASK_CANCEL_POLL)
+
+        def should_cancel():
+            return self._stopping.is_set() or time.monotonic() > deadline or cancel_requested()
+
+        sink = throttled(lambda fraction: update_task_progress(task_id, round(fraction, 4)))
+        try:
+            with reporting(sink, should_cancel):
+                report(0.0)
+                result = OPERATIONS[job["operation"]](*job["args"])
+        except Cancelled:
+            self._stopped(task_id, deadline)
+        except PERMANENT_ERRORS as e:
+            update_task_error(task_id, f"{type(e).__name__}: {e}", owner=self.owner)
+        except Exception as e:
+            self._retry(task_id, attempts, f"{type(e).__name__}: {e}")
+        else:
+            # Only the lease holder records the result, so a job that was
+            # run twice after a lost lease is stored once
+            if update_task_result(task_id, result, owner=self.owner):
+                store_request_sqlite(job["record_as"], job["input"], result)
+                flush()
+                self.completed += 1
+        return True
+
+    def _stopped(self, task_id: str, deadline: float):
+        if is_cancel_requested(task_id):
+            update_task_error(task_id, "Task was cancelled", status="cancelled", owner=self.owner)
+        elif time.monotonic() > deadline:
+            update_task_error(task_id, f"Task exceeded {self.timeout:g}s timeout", owner=self.owner)
+        else:
+            # Shutting down: the next worker starts the job over
+            requeue_task(task_id, self.owner, count_attempt=False)
+
+    def _retry(self, task_id: str, attempts: int, message: str):
+        if attempts >= self.max_attempts:
+            update_task_error(task_id, f"Gave up after {attempts} attempts: {message}",
+                              owner=self.owner)
+            return
+        logger.warning("retrying task",
+                       extra={"task_id": task_id, "attempt": attempts, "error": message})
+        delay = self.retry_delay * 2 ** (attempts - 1)
+        requeue_task(task_id, self.owner, delay=delay, error=message)
+
+
+def run_worker(burst: bool = False) -> int:
+    """Entry point of one worker process; returns the number of jobs completed."""
+    init_db()
+    init_task_db()
+    worker = Worker()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: worker.stop())
+    worker.run(burst=burst)
+    return worker.completed
@@ -15,9 +15,12 @@ setup(
         "anyio",
         "flake8"
     ],
+    extras_require={
+        "fast": ["gmpy2", "numpy"]
+    },
     entry_points={
         "console_scripts": [
-            "mathcli = cli.main:cli"
+            "mathcli = cli.client:main"
         ]
     },
     include_package_data=True,
@@ -0,0 +1,246 @@
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from services.metrics import SQLITE_ROWS_WRITTEN, SQLITE_WRITE_ERRORS, SQLITE_WRITE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# --- Configurable write batching ---
+SQLITE_WRITE_BEHIND = os.getenv("SQLITE_WRITE_BEHIND", "1") == "1"
+SQLITE_BATCH_ROWS = int(os.getenv("SQLITE_BATCH_ROWS", "500"))
+SQLITE_BATCH_INTERVAL = float(os.getenv("SQLITE_BATCH_INTERVAL_MS", "5")) / 1000
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "30"))
+# Longest time interpreter shutdown waits for queued writes
+SQLITE_EXIT_FLUSH_TIMEOUT = float(os.getenv("SQLITE_EXIT_FLUSH_TIMEOUT", "10"))
+
+_local = threading.local()
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def _key(db_file) -> str:
+    return str(Path(db_file))
+
+
+def connect(db_file, **kwargs) -> sqlite3.Connection:
+    """Open a new connection in WAL mode (readers never block the writer)."""
+    conn = sqlite3.connect(db_file, timeout=SQLITE_BUSY_TIMEOUT, **kwargs)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # Safe with WAL: a power loss may drop the last commits but never corrupts
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def get_connection(db_file) -> sqlite3.Connection:
+    """Return this thread's pooled connection to db_file, opening it once."""
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    key = _key(db_file)
+    conn = connections.get(key)
+    if conn is None:
+        conn = connections[key] = connect(db_file)
+    return conn
+
+
+# --- Write versions ---
+# Triggers count the changes to a table in the database itself, so writes
+# from every process (server, workers, CLI, maintenance) are seen by readers.
+_NOW = "(julianday('now') - 2440587.5) * 86400.0"
+
+
+def install_write_version(conn, table: str, columns=()):
+    """Count inserts, deletes and updates (of `columns`, or any) of table."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS write_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """)
+    conn.execute(f"INSERT OR IGNORE INTO write_versions VALUES (?, 0, {_NOW})", (table,))
+    bump = (f"UPDATE write_versions SET version = version + 1, updated_at = {_NOW} "
+            f"WHERE name = '{table}'")
+    of = f" OF {', '.join(columns)}" if columns else ""
+    for event in ("INSERT", "DELETE", f"UPDATE{of}"):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_version_{event.split()[0].lower()}
+            AFTER {event} ON {table} BEGIN {bump}; END
+        """)
+
+
+def get_write_version(db_file, table: str) -> tuple[int, float]:
+    """(version, unix time of the last change) of a table with a write version."""
+    row = get_connection(db_file).execute("""
+        SELECT version, updated_at FROM write_versions WHERE name = ?
+    """, (table,)).fetchone()
+    return (row[0], row[1]) if row else (0, 0.0)
+
+
+class WriteBehindQueue:
+    """Group-commits queued writes for one database from a single thread.
+
+    Statements are applied in order, in one transaction per batch of up to
+    SQLITE_BATCH_ROWS rows or SQLITE_BATCH_INTERVAL seconds, whichever
+    comes first. If the writer thread fails (e.g. the database cannot be
+    opened), queued writes are dropped and later puts and flushes raise
+    the failure.
+    """
+
+    def __init__(self, db_file, batch_rows=SQLITE_BATCH_ROWS, interval=SQLITE_BATCH_INTERVAL):
+        self.db_file = db_file
+        self.batch_rows = batch_rows
+        self.interval = interval
+        self._queue = queue.Queue()
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, sql: str, params: tuple):
+        # Checked under the lock so nothing is queued after a failure drained the queue
+        with self._pending_lock:
+            if self._error is not None:
+                raise self._error
+            self._pending += 1
+            self._queue.put((sql, params))
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Block until every write queued so far has been committed.
+
+        Returns False if timeout ran out first; raises the writer's failure.
+        """
+        with self._pending_lock:
+            if self._error is not None:
+                raise self._error
+            if not self._pending:
+                return True
+            done = threading.Event()
+            self._queue.put(done)
+        finished = done.wait(timeout)
+        if self._error is not None:
+            raise self._error
+        return finished
+
+    def _run(self):
+        try:
+            self._write_batches()
+        except Exception as e:
+            logger.error("sqlite writer stopped",
+                         extra={"db": Path(self.db_file).name, "error": str(e)})
+            with self._pending_lock:
+                self._error = e
+                # Wake every flush waiting on this thread
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if isinstance(item, threading.Event):
+                        item.set()
+
+    def _write_batches(self):
+        conn = connect(self.db_file, check_same_thread=False)
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            writes = [item for item in batch if not isinstance(item, threading.Event)]
+            if writes:
+                self._commit(conn, writes)
+                with self._pending_lock:
+                    self._pending -= len(writes)
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def _commit(self, conn, writes):
+        db = Path(self.db_file).name
+        try:
+            with SQLITE_WRITE_SECONDS.time(db=db), conn:
+                for sql, rows in _group(writes):
+                    conn.executemany(sql, rows)
+            SQLITE_ROWS_WRITTEN.inc(len(writes), db=db)
+        except sqlite3.Error:
+            # Retry one by one so a single bad row does not drop the batch
+            for sql, params in writes:
+                try:
+                    with conn:
+                        conn.execute(sql, params)
+                    SQLITE_ROWS_WRITTEN.inc(db=db)
+                except sqlite3.Error as e:
+                    SQLITE_WRITE_ERRORS.inc(db=db)
+                    logger.warning("dropped queued write", extra={"db": db, "error": str(e)})
+
+
+def _group(writes):
+    # Consecutive writes of the same statement become one executemany
+    groups = []
+    for sql, params in writes:
+        if groups and groups[-1][0] == sql:
+            groups[-1][1].append(params)
+        else:
+            groups.append((sql, [params]))
+    return groups
+
+
+def get_writer(db_file) -> WriteBehindQueue:
+    key = _key(db_file)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = _writers[key] = WriteBehindQueue(db_file)
+        return writer
+
+
+def execute_write(db_file, sql: str, params: tuple = ()):
+    """Queue a write for group commit, or run it now if batching is off."""
+    if SQLITE_WRITE_BEHIND:
+        get_writer(db_file).put(sql, params)
+        return
+    conn = get_connection(db_file)
+    with conn:
+        conn.execute(sql, params)
+
+
+def flush(db_file=None, timeout: float | None = None) -> bool:
+    """Wait for queued writes (of one database, or all) to be committed.
+
+    Returns False if timeout (shared by all databases) ran out first.
+    """
+    with _writers_lock:
+        if db_file is None:
+            writers = list(_writers.values())
+        else:
+            writer = _writers.get(_key(db_file))
+            writers = [writer] if writer else []
+    deadline = None if timeout is None else time.monotonic() + timeout
+    for writer in writers:
+        remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+        if not writer.flush(remaining):
+            return False
+    return True
+
+
+def _flush_at_exit():
+    try:
+        if not flush(timeout=SQLITE_EXIT_FLUSH_TIMEOUT):
+            logger.warning("queued writes not committed before exit")
+    except Exception as e:
+        logger.error("queued writes lost at exit", extra={"error": str(e)})
+
+
+atexit.register(_flush_at_exit)
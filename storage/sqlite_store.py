@@ -1,13 +1,35 @@
 # storage/sqlite_store.py
 
-import sqlite3
+import logging
+import os
+import lzma
+import zlib
 from pathlib import Path
-from math import log10
+from services.metrics import RESULT_SIZE_BYTES, SQLITE_READ_SECONDS
+from services.result_view import digit_count as exact_digit_count, summarize, to_decimal
+from storage.engine import (
+    connect, execute_write, flush, get_connection, get_write_version, install_write_version
+)
+
+logger = logging.getLogger(__name__)
 
 DB_FILE = Path("storage") / "math_requests.db"
 
+# "binary" stores int results as int.to_bytes BLOBs, "text" keeps decimal TEXT
+RESULT_STORAGE = os.getenv("RESULT_STORAGE", "binary")
+# Optional compression of binary results: "none", "zlib" or "lzma"
+RESULT_COMPRESSION = os.getenv("RESULT_COMPRESSION", "none")
+
+# Digits kept in the preview that pages show instead of the full result
+PREVIEW_DIGITS = 100
+
+_COMPRESSORS = {
+    "zlib": (zlib.compress, zlib.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+
 def init_db():
-    with sqlite3.connect(DB_FILE) as conn:
+    with get_connection(DB_FILE) as conn:
         conn.execute("""
             CREATE TABLE IF NOT EXISTS requests (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -17,39 +39,286 @@ def init_db():
                 timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
             )
         """)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(requests)")}
+        # Older databases only have the decimal TEXT column
+        for name, kind in (("result_blob", "BLOB"), ("result_encoding", "TEXT"),
+                           ("result_digits", "INTEGER"), ("result_hash", "TEXT")):
+            if name not in columns:
+                conn.execute(f"ALTER TABLE requests ADD COLUMN {name} {kind}")
+        # Content-addressed results shared by deduplicated rows (see services/maintenance.py)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                hash TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                result_blob BLOB,
+                result_encoding TEXT,
+                size INTEGER NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_requests_result_hash ON requests (result_hash)
+        """)
+        # Keyset pagination walks (timestamp, id) newest first, per operation or overall
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_requests_operation_timestamp
+            ON requests (operation, timestamp, id)
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_requests_timestamp
+            ON requests (timestamp, id)
+        """)
+        _fill_previews(conn)
+        # Changes to what /history shows invalidate its rendered pages
+        install_write_version(conn, "requests", ("operation", "input_data", "result", "timestamp"))
+
+def _fill_previews(conn):
+    # Binary rows stored before previews existed have an empty text column
+    missing = conn.execute(f"""
+        SELECT id, {RESULT_COLUMNS} FROM {REQUESTS_FROM} WHERE requests.result = ''
+    """).fetchall()
+    conn.executemany("UPDATE requests SET result = ? WHERE id = ?", [
+        (result_preview(decode_result(*stored)), row_id) for row_id, *stored in missing
+    ])
+
+# Rows with a result_hash keep their result in the results table
+RESULT_COLUMNS = """
+    COALESCE(results.result, requests.result),
+    COALESCE(results.result_blob, requests.result_blob),
+    COALESCE(results.result_encoding, requests.result_encoding)
+"""
+REQUESTS_FROM = "requests LEFT JOIN results ON results.hash = requests.result_hash"
 
 def digit_count(n: int) -> int:
-    return int(log10(n)) + 1 if n > 0 else 1
+    return exact_digit_count(n) if n > 0 else 1
 
 
 # ...existing code...
 
-def store_request_sqlite(operation: str, input_data: dict, result: int | float):
+def result_to_text(result: int | float) -> str:
     try:
-        # Try to convert result to string (may fail for huge ints)
-        result_str = str(result)
+        # Divide-and-conquer conversion: subquadratic and not capped by
+        # sys.set_int_max_str_digits
+        if isinstance(result, int) and not isinstance(result, bool):
+            return to_decimal(result)
+        return str(result)
     except ValueError:
         # If too large, store a message or just the digit count
         if isinstance(result, int):
-            result_str = f"[int with {digit_count(result)} digits]"
-        else:
-            result_str = "[unrepresentable result]"
+            return f"[int with {digit_count(result)} digits]"
+        return "[unrepresentable result]"
     except Exception as e:
         # Catch-all for any other conversion errors
-        result_str = f"[error: {str(e)}]"
-    print(f"[SQLITE] Writing: {operation=}, {input_data=}, result has {digit_count(result) if isinstance(result, int) else 'N/A'} digits")
-    print(f"[SQLITE] Using DB: {DB_FILE.resolve()}")
-    with sqlite3.connect(DB_FILE) as conn:
-        conn.execute("""
-            INSERT INTO requests (operation, input_data, result)
-            VALUES (?, ?, ?)
-        """, (operation, str(input_data), result_str))
+        return f"[error: {str(e)}]"
+
+def result_preview(result) -> str:
+    """Leading digits and length of a result, or the whole of a short one."""
+    if not isinstance(result, str):
+        return summarize(result, PREVIEW_DIGITS)
+    digits = result.lstrip("-")
+    if len(digits) <= PREVIEW_DIGITS or not digits.isdigit():
+        return result
+    sign = result[:len(result) - len(digits)]
+    return f"{sign}{digits[:PREVIEW_DIGITS]}... [{len(digits)} digits total]"
+
+def encode_result(result: int | float):
+    """Return (text, blob, encoding, digits) column values for a result.
+
+    Binary rows keep the preview in the text column. It comes before the
+    BLOB in the row, so pages read it without touching the BLOB's
+    overflow pages.
+    """
+    if RESULT_STORAGE != "binary" or not isinstance(result, int) or isinstance(result, bool):
+        return result_to_text(result), None, None, None
+    length = (result.bit_length() + 8) // 8
+    blob = result.to_bytes(length, "little", signed=True)
+    encoding = "int"
+    if RESULT_COMPRESSION in _COMPRESSORS:
+        blob = _COMPRESSORS[RESULT_COMPRESSION][0](blob)
+        encoding = f"int+{RESULT_COMPRESSION}"
+    return result_preview(result), blob, encoding, digit_count(abs(result))
+
+def decode_result(text: str, blob: bytes | None, encoding: str | None):
+    """Return the stored result as an int, or the stored text for TEXT rows."""
+    if blob is None or not encoding:
+        return text
+    kind, _, compression = encoding.partition("+")
+    if compression:
+        blob = _COMPRESSORS[compression][1](blob)
+    if kind != "int":
+        raise ValueError(f"Unknown result encoding: {encoding}")
+    return int.from_bytes(blob, "little", signed=True)
+
+def render_result(text: str, blob: bytes | None, encoding: str | None,
+                  max_digits: int | None = None) -> str:
+    if blob is None or not encoding:
+        return text
+    result = decode_result(text, blob, encoding)
+    if max_digits is not None:
+        return summarize(result, max_digits)
+    return result_to_text(result)
+
+def store_request_sqlite(operation: str, input_data: dict, result: int | float):
+    result_str, blob, encoding, digits = encode_result(result)
+    size = len(blob) if blob is not None else len(result_str)
+    RESULT_SIZE_BYTES.observe(size, operation=operation)
+    if logger.isEnabledFor(logging.DEBUG):
+        # str() of a large input is not free; skip it unless it is logged
+        logger.debug("queued request row", extra={
+            "operation": operation, "input": str(input_data), "digits": digits, "bytes": size
+        })
+    execute_write(DB_FILE, """
+        INSERT INTO requests
+            (operation, input_data, result, result_blob, result_encoding, result_digits)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (operation, str(input_data), result_str, blob, encoding, digits))
+
+def store_requests_sqlite_many(entries):
+    """Insert (operation, input_data, result) entries in a single transaction."""
+    rows = [
+        (operation, str(input_data), *encode_result(result))
+        for operation, input_data, result in entries
+    ]
+    flush(DB_FILE)
+    with get_connection(DB_FILE) as conn:
+        conn.executemany("""
+            INSERT INTO requests
+                (operation, input_data, result, result_blob, result_encoding, result_digits)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, rows)
+
+def get_request_result(request_id: int):
+    flush(DB_FILE)
+    with SQLITE_READ_SECONDS.time(query="result"):
+        row = get_connection(DB_FILE).execute(f"""
+            SELECT {RESULT_COLUMNS} FROM {REQUESTS_FROM} WHERE id = ?
+        """, (request_id,)).fetchone()
+    return decode_result(*row) if row else None
+
+def encode_cursor(row) -> str:
+    return f"{row[4]}|{row[0]}"
+
+class InvalidCursorError(ValueError):
+    pass
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    timestamp, separator, row_id = cursor.rpartition("|")
+    try:
+        if not separator:
+            raise ValueError
+        return timestamp, int(row_id)
+    except ValueError:
+        raise InvalidCursorError(f"Invalid history cursor: {cursor!r}") from None
+
+def get_requests_page(limit: int | None = 50, operation: str | None = None,
+                      since: str | None = None, until: str | None = None,
+                      before: str | None = None, preview: bool = False):
+    """Return (rows, next_cursor) for one page of history, newest first.
+
+    Filters run in SQL on the (operation, timestamp) indexes. Pass the
+    returned cursor as `before` to fetch the next page; it is None on the
+    last page. With preview, rows carry the stored preview instead of the
+    result, and stored results are not read at all.
+    """
+    conditions, params = [], []
+    if operation:
+        conditions.append("operation = ?")
+        params.append(operation)
+    if since:
+        conditions.append("timestamp >= ?")
+        params.append(since)
+    if until:
+        conditions.append("timestamp < ?")
+        params.append(until)
+    if before:
+        conditions.append("(timestamp, id) < (?, ?)")
+        params.extend(decode_cursor(before))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    columns, source = f"id, operation, input_data, timestamp, {RESULT_COLUMNS}", REQUESTS_FROM
+    if preview:
+        columns, source = "id, operation, input_data, timestamp, result", "requests"
+    sql = f"""
+        SELECT {columns}
+        FROM {source}
+        {where}
+        ORDER BY timestamp DESC, id DESC
+    """
+    if limit is not None:
+        # One extra row tells whether another page exists
+        sql += " LIMIT ?"
+        params.append(limit + 1)
+    flush(DB_FILE)
+    with SQLITE_READ_SECONDS.time(query="page"):
+        fetched = get_connection(DB_FILE).execute(sql, params).fetchall()
+    if preview:
+        rows = _with_previews(fetched)
+    else:
+        rows = [
+            (row[0], row[1], row[2], render_result(row[4], row[5], row[6]), row[3])
+            for row in fetched
+        ]
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+def _with_previews(fetched) -> list:
+    # init_db() fills in missing previews; rows written since by an older
+    # process get theirs computed here. Reads never write: that would bump
+    # the write version and invalidate the page being rendered
+    missing = [row[0] for row in fetched if row[4] == ""]
+    filled = {}
+    if missing:
+        marks = ",".join("?" * len(missing))
+        for row_id, *stored in get_connection(DB_FILE).execute(f"""
+            SELECT id, {RESULT_COLUMNS} FROM {REQUESTS_FROM} WHERE id IN ({marks})
+        """, missing):
+            filled[row_id] = result_preview(decode_result(*stored))
+    return [
+        (row[0], row[1], row[2], filled.get(row[0]) or result_preview(row[4]), row[3])
+        for row in fetched
+    ]
+
+def get_requests_version() -> tuple[int, float]:
+    """(version, last change time) of the history; any write bumps it."""
+    flush(DB_FILE)
+    return get_write_version(DB_FILE, "requests")
+
+def iter_requests_sqlite(operation: str | None = None, batch_size: int = 500):
+    """Yield history rows newest first, fetching batch_size rows at a time.
+
+    Uses its own connection so a streaming response can resume the
+    generator from any thread.
+    """
+    flush(DB_FILE)
+    conn = connect(DB_FILE, check_same_thread=False)
+    try:
+        sql = f"""
+            SELECT id, operation, input_data, timestamp, {RESULT_COLUMNS}
+            FROM {REQUESTS_FROM}
+        """
+        params = ()
+        if operation:
+            sql += " WHERE operation = ?"
+            params = (operation,)
+        cursor = conn.execute(sql + " ORDER BY timestamp DESC, id DESC", params)
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            for row in batch:
+                yield (row[0], row[1], row[2], render_result(row[4], row[5], row[6]), row[3])
+    finally:
+        conn.close()
 
 def get_all_requests_sqlite():
-    with sqlite3.connect(DB_FILE) as conn:
-        cursor = conn.execute("""
-            SELECT id, operation, input_data, result, timestamp
-            FROM requests
+    flush(DB_FILE)
+    with SQLITE_READ_SECONDS.time(query="all"):
+        fetched = get_connection(DB_FILE).execute(f"""
+            SELECT id, operation, input_data, timestamp, {RESULT_COLUMNS}
+            FROM {REQUESTS_FROM}
             ORDER BY timestamp DESC
-        """)
-        return cursor.fetchall()
+        """).fetchall()
+    return [
+        (row[0], row[1], row[2], render_result(row[4], row[5], row[6]), row[3])
+        for row in fetched
+    ]
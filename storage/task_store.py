@@ -1,12 +1,20 @@
-import sqlite3
+import json
+import os
+import socket
+import time
+import uuid
 from pathlib import Path
 from datetime import datetime, UTC
-from math import log10
+from services.result_view import digit_count as exact_digit_count, summarize
+from storage.engine import get_connection, get_write_version, install_write_version
 
 DB_FILE = Path("storage") / "background_tasks.db"
 
+# Characters of a task's result (or error) shown on the /tasks page
+PREVIEW_CHARS = 100
+
 def init_task_db():
-    with sqlite3.connect(DB_FILE) as conn:
+    with get_connection(DB_FILE) as conn:
         conn.execute("""
             CREATE TABLE IF NOT EXISTS tasks (
                 task_id TEXT PRIMARY KEY,
@@ -17,33 +25,176 @@ def init_task_db():
                 created_at TEXT
             )
         """)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(tasks)")}
+        if "progress" not in columns:
+            conn.execute("ALTER TABLE tasks ADD COLUMN progress REAL")
+        if "lease_owner" not in columns:
+            conn.execute("ALTER TABLE tasks ADD COLUMN job TEXT")
+            conn.execute("ALTER TABLE tasks ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+            conn.execute("ALTER TABLE tasks ADD COLUMN lease_owner TEXT")
+            conn.execute("ALTER TABLE tasks ADD COLUMN lease_expires_at REAL")
+            conn.execute("ALTER TABLE tasks ADD COLUMN available_at REAL")
+            # Unfinished rows from before leases existed can never complete
+            conn.execute("""
+                UPDATE tasks SET status = 'failed', result = 'Interrupted by a server restart'
+                WHERE status IN ('queued', 'in_progress', 'cancelling')
+            """)
+        if "result_preview" not in columns:
+            conn.execute("ALTER TABLE tasks ADD COLUMN result_preview TEXT")
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_tasks_queue ON tasks (status, available_at)
+        """)
+        # Lease renewals do not change what /tasks shows, so they keep the version
+        install_write_version(conn, "tasks", ("operation", "input_data", "status", "result",
+                                              "result_preview", "progress", "created_at"))
+
+def lease_owner_id(role):
+    """Unique name for a process that holds task leases."""
+    return f"{role}:{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
 
-def save_task(task_id, operation, input_data):
-    with sqlite3.connect(DB_FILE) as conn:
+def save_task(task_id, operation, input_data, owner=None, lease=None):
+    # A leased row is owned by the process running it; see renew_leases()
+    expires_at = time.time() + lease if owner is not None else None
+    with get_connection(DB_FILE) as conn:
         conn.execute("""
-            INSERT INTO tasks (task_id, operation, input_data, status, created_at)
-            VALUES (?, ?, ?, 'queued', ?)
-        """, (task_id, operation, str(input_data), datetime.now(UTC).isoformat()
-))
+            INSERT INTO tasks (task_id, operation, input_data, status, created_at,
+                               lease_owner, lease_expires_at)
+            VALUES (?, ?, ?, 'queued', ?, ?, ?)
+        """, (task_id, operation, str(input_data), datetime.now(UTC).isoformat(),
+              owner, expires_at))
+
+# --- Durable job queue (TASK_BACKEND=queue) ---
+# Jobs wait as 'queued' rows with a JSON job spec and no lease. A worker
+# claims one by taking its lease, renews the lease while it runs and clears
+# it when the job finishes. Rows whose lease expires go back to the queue
+# (or fail once out of attempts), so a crashed worker loses no work.
+def enqueue_task(task_id, operation, input_data, job, max_pending):
+    """Insert a queued job; False when max_pending jobs are already waiting or running."""
+    with get_connection(DB_FILE) as conn:
+        cursor = conn.execute("""
+            INSERT INTO tasks
+                (task_id, operation, input_data, status, created_at, job, available_at)
+            SELECT ?, ?, ?, 'queued', ?, ?, ?
+            WHERE (SELECT COUNT(*) FROM tasks
+                   WHERE job IS NOT NULL AND status IN ('queued', 'in_progress', 'cancelling')) < ?
+        """, (task_id, operation, str(input_data), datetime.now(UTC).isoformat(),
+              json.dumps(job), time.time(), max_pending))
+        return cursor.rowcount > 0
+
+def claim_task(owner, lease):
+    """Atomically lease the oldest runnable job; returns (task_id, job, attempts) or None."""
+    now = time.time()
+    with get_connection(DB_FILE) as conn:
+        rows = conn.execute("""
+            UPDATE tasks
+            SET status = 'in_progress', lease_owner = ?, lease_expires_at = ?,
+                attempts = attempts + 1
+            WHERE task_id = (
+                SELECT task_id FROM tasks
+                WHERE status = 'queued' AND job IS NOT NULL AND lease_owner IS NULL
+                      AND available_at <= ?
+                ORDER BY available_at LIMIT 1
+            )
+            RETURNING task_id, job, attempts
+        """, (owner, now + lease, now)).fetchall()
+    if not rows:
+        return None
+    task_id, job, attempts = rows[0]
+    return task_id, json.loads(job), attempts
+
+def renew_leases(owner, lease):
+    """Heartbeat: extend every unfinished lease held by owner."""
+    with get_connection(DB_FILE) as conn:
+        cursor = conn.execute("""
+            UPDATE tasks SET lease_expires_at = ?
+            WHERE lease_owner = ? AND status IN ('queued', 'in_progress', 'cancelling')
+        """, (time.time() + lease, owner))
+        return cursor.rowcount
+
+def requeue_task(task_id, owner, delay=0.0, error=None, count_attempt=True):
+    """Give a leased job back to the queue, runnable again after delay seconds."""
+    with get_connection(DB_FILE) as conn:
+        cursor = conn.execute("""
+            UPDATE tasks
+            SET status = 'queued', lease_owner = NULL, lease_expires_at = NULL, progress = NULL,
+                available_at = ?, result = ?, attempts = attempts - ?
+            WHERE task_id = ? AND lease_owner = ? AND status = 'in_progress'
+        """, (time.time() + delay, error, 0 if count_attempt else 1, task_id, owner))
+        return cursor.rowcount > 0
+
+def recover_expired_tasks(max_attempts):
+    """Settle rows whose owner stopped renewing its lease.
+
+    Returns (requeued, failed, cancelled) row counts.
+    """
+    now = time.time()
+    with get_connection(DB_FILE) as conn:
+        cancelled = conn.execute("""
+            UPDATE tasks SET status = 'cancelled', result = 'Task was cancelled',
+                             lease_owner = NULL, lease_expires_at = NULL
+            WHERE status = 'cancelling' AND lease_expires_at < ?
+        """, (now,)).rowcount
+        requeued = conn.execute("""
+            UPDATE tasks SET status = 'queued', lease_owner = NULL, lease_expires_at = NULL,
+                             progress = NULL, available_at = ?
+            WHERE status = 'in_progress' AND job IS NOT NULL AND lease_expires_at < ?
+                  AND attempts < ?
+        """, (now, now, max_attempts)).rowcount
+        # Durable jobs out of attempts, and process-pool jobs of a dead server
+        failed = conn.execute("""
+            UPDATE tasks
+            SET status = 'failed', result = 'Worker stopped responding (lease expired)',
+                lease_owner = NULL, lease_expires_at = NULL
+            WHERE status IN ('queued', 'in_progress') AND lease_expires_at < ?
+        """, (now,)).rowcount
+        return requeued, failed, cancelled
 
 def update_task_status(task_id, status):
-    with sqlite3.connect(DB_FILE) as conn:
+    # A pending cancellation is only replaced by the task's final status
+    with get_connection(DB_FILE) as conn:
         conn.execute("""
-            UPDATE tasks SET status = ? WHERE task_id = ?
+            UPDATE tasks SET status = ? WHERE task_id = ? AND status != 'cancelling'
         """, (status, task_id))
 
+def update_task_progress(task_id, progress):
+    with get_connection(DB_FILE) as conn:
+        conn.execute("""
+            UPDATE tasks SET progress = ? WHERE task_id = ?
+        """, (progress, task_id))
+
+def request_cancel(task_id):
+    """Flag a queued or running task as 'cancelling'; True if it was flagged.
+
+    Durable jobs that no worker has claimed yet are cancelled right away.
+    """
+    with get_connection(DB_FILE) as conn:
+        cursor = conn.execute("""
+            UPDATE tasks
+            SET status = CASE WHEN status = 'queued' AND job IS NOT NULL AND lease_owner IS NULL
+                              THEN 'cancelled' ELSE 'cancelling' END,
+                result = CASE WHEN status = 'queued' AND job IS NOT NULL AND lease_owner IS NULL
+                              THEN 'Task was cancelled' ELSE result END
+            WHERE task_id = ? AND status IN ('queued', 'in_progress')
+        """, (task_id,))
+        return cursor.rowcount > 0
+
+def is_cancel_requested(task_id):
+    # Failed covers timed-out tasks whose worker is still running
+    with get_connection(DB_FILE) as conn:
+        row = conn.execute("""
+            SELECT status FROM tasks WHERE task_id = ?
+        """, (task_id,)).fetchone()
+        return row is not None and row[0] in ('cancelling', 'cancelled', 'failed')
+
 def digit_count(n: int) -> int:
     try:
-        return int(log10(n)) + 1 if isinstance(n, int) and n > 0 else len(str(n))
+        return exact_digit_count(n) if isinstance(n, int) and n > 0 else len(str(n))
     except Exception:
         return -1
 
 def summarize_result(result, max_digits=3000):
     try:
-        s = str(result)
-        if len(s) > max_digits:
-            return f"{s[:max_digits]}... [truncated, {len(s)} digits]"
-        return s
+        return summarize(result, max_digits, "{head}... [truncated, {total} digits]")
     except ValueError:
         if isinstance(result, int):
             return f"[int with {digit_count(result)} digits]"
@@ -51,28 +202,53 @@ def summarize_result(result, max_digits=3000):
     except Exception as e:
         return f"[error: {str(e)}]"
 
-def update_task_result(task_id, result):
+def _owned_by(owner):
+    # With an owner, only the holder of the lease may settle the row
+    return ("", ()) if owner is None else (" AND lease_owner = ?", (owner,))
+
+def update_task_result(task_id, result, owner=None):
     result_str = summarize_result(result)
-    with sqlite3.connect(DB_FILE) as conn:
-        conn.execute("""
-            UPDATE tasks SET result = ?, status = 'done' WHERE task_id = ?
-        """, (result_str, task_id))
+    preview = summarize_result(result, PREVIEW_CHARS)
+    condition, params = _owned_by(owner)
+    with get_connection(DB_FILE) as conn:
+        cursor = conn.execute("""
+            UPDATE tasks SET result = ?, result_preview = ?, status = 'done', progress = 1.0,
+                             lease_owner = NULL, lease_expires_at = NULL
+            WHERE task_id = ?""" + condition, (result_str, preview, task_id, *params))
+        return cursor.rowcount > 0
+
+def update_task_error(task_id, message, status="failed", owner=None):
+    preview = message[:PREVIEW_CHARS]
+    condition, params = _owned_by(owner)
+    with get_connection(DB_FILE) as conn:
+        cursor = conn.execute("""
+            UPDATE tasks SET result = ?, result_preview = ?, status = ?,
+                             lease_owner = NULL, lease_expires_at = NULL
+            WHERE task_id = ?""" + condition, (message, preview, status, task_id, *params))
+        return cursor.rowcount > 0
 
 
 def get_task(task_id):
-    with sqlite3.connect(DB_FILE) as conn:
+    with get_connection(DB_FILE) as conn:
         cursor = conn.execute("""
-            SELECT task_id, status, result FROM tasks WHERE task_id = ?
+            SELECT task_id, status, result, progress FROM tasks WHERE task_id = ?
         """, (task_id,))
         row = cursor.fetchone()
         if row:
-            return {"task_id": row[0], "status": row[1], "result": row[2]}
+            return {"task_id": row[0], "status": row[1], "result": row[2], "progress": row[3]}
         return None
 
+def get_tasks_version():
+    """(version, last change time) of what get_all_tasks() returns."""
+    return get_write_version(DB_FILE, "tasks")
+
 def get_all_tasks():
-    with sqlite3.connect(DB_FILE) as conn:
-        cursor = conn.execute("""
-            SELECT task_id, operation, input_data, status, result FROM tasks
+    """Every task, newest first; "result" is the short preview of the result."""
+    with get_connection(DB_FILE) as conn:
+        cursor = conn.execute(f"""
+            SELECT task_id, operation, input_data, status,
+                   COALESCE(result_preview, SUBSTR(result, 1, {PREVIEW_CHARS})), progress
+            FROM tasks
             ORDER BY created_at DESC
         """)
         return [
@@ -81,7 +257,8 @@ def get_all_tasks():
                 "operation": row[1],
                 "input": row[2],
                 "status": row[3],
-                "result": row[4]
+                "result": row[4],
+                "progress": row[5]
             }
             for row in cursor.fetchall()
         ]
\ No newline at end of file
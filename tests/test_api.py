@@ -1,3 +1,5 @@
+import time
+import uuid
 from fastapi.testclient import TestClient
 from main import app
 
@@ -17,7 +19,224 @@ def test_fibonacci_api():
     assert response.status_code == 200
     assert "result" in response.json()
 
+def test_fibonacci_mod_api():
+    response = client.get("/fibonacci", params={"n": 10**100, "mod": 10**9 + 7})
+    assert response.status_code == 200
+    assert response.json()["result"] == 175077019
+    assert client.get("/fibonacci?n=10&mod=0").status_code == 422
+
 def test_factorial_api():
     response = client.get("/factorial?n=5")
     assert response.status_code == 200
-    assert response.json()["result"] == 120
\ No newline at end of file
+    assert response.json()["result"] == 120
+
+def test_history_pages():
+    from services.auth import set_session, USERNAME
+    client.cookies.set("session", set_session(USERNAME))
+    try:
+        for params in ["", "?mode=last10", "?mode=filter&operation=factorial"]:
+            response = client.get("/history" + params)
+            assert response.status_code == 200
+            assert "Request History" in response.text
+        for cursor in ("garbage", "x|y", "2024-01-01 00:00:00|"):
+            response = client.get("/history", params={"before": cursor})
+            assert response.status_code == 400
+            assert "Invalid history cursor" in response.json()["detail"]
+    finally:
+        client.cookies.clear()
+
+def test_history_and_tasks_pages_are_conditional():
+    from services.auth import set_session, USERNAME
+    from services.background_tasks import LEASE_OWNER
+    from storage import task_store
+    # Tasks started by earlier tests would change the pages between requests
+    deadline = time.monotonic() + 30
+    while task_store.get_connection(task_store.DB_FILE).execute(
+            "SELECT COUNT(*) FROM tasks WHERE lease_owner = ?", (LEASE_OWNER,)).fetchone()[0]:
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    client.cookies.set("session", set_session(USERNAME))
+    try:
+        etags = {}
+        for path in ("/history?mode=last10", "/tasks"):
+            first = client.get(path)
+            assert first.status_code == 200
+            etags[path] = first.headers["etag"]
+            assert client.get(path, headers={"If-None-Match": etags[path]}).status_code == 304
+            last_modified = first.headers["last-modified"]
+            assert client.get(path, headers={"If-Modified-Since": last_modified}).status_code == 304
+            assert client.get(path).text == first.text
+        # Any write to the history gives the page a new version
+        client.get("/factorial?n=7")
+        path = "/history?mode=last10"
+        changed = client.get(path, headers={"If-None-Match": etags[path]})
+        assert changed.status_code == 200
+        assert "5040" in changed.text
+    finally:
+        client.cookies.clear()
+
+def test_history_export_streams_csv():
+    from services.auth import API_KEY
+    response = client.get("/history/export?operation=factorial",
+                          headers={"X-API-Key": API_KEY} if API_KEY else {})
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0] == "ID,Operation,Input,Result,Timestamp"
+    assert all(",factorial," in line for line in lines[1:])
+
+def test_batch_api():
+    items = [
+        {"op": "pow", "base": 2, "exponent": 10},
+        {"op": "factorial", "n": 5},
+        {"op": "factorial", "n": 5},
+        {"op": "fibonacci"},
+        {"op": "sqrt", "n": 4},
+        {"op": "pow", "base": 10.0, "exponent": 400},
+    ]
+    response = client.post("/batch", json={"items": items})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["result"] for r in results[:3]] == [1024, 120, 120]
+    assert all(r["error"] for r in results[3:])
+
+def test_large_factorial_goes_to_background():
+    response = client.get("/factorial?n=50000")
+    assert response.status_code == 200
+    assert "in background" in response.json()["result"]
+
+def test_huge_factorial_rejected():
+    response = client.get("/factorial?n=1000000000")
+    assert response.status_code == 422
+    for path in ("/factorial", "/fibonacci"):
+        for n in (10**300, 10**400):
+            response = client.get(f"{path}?n={n}")
+            assert response.status_code == 422
+            assert "would exceed the time limit" in response.json()["detail"]
+
+def test_result_digits_api():
+    from storage.sqlite_store import get_requests_page
+    client.get("/factorial?n=3000")
+    row = get_requests_page(limit=1, operation="factorial")[0][0]
+    response = client.get(f"/result/{row[0]}/digits?start=0&len=5")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["digits"] == "41493"
+    assert body["total_digits"] == 9131
+    assert client.get("/result/999999999/digits").status_code == 404
+
+def test_status_wait_and_events():
+    from services.task_events import task_events
+    task_events.publish("evt-task", status="in_progress", progress=0.25)
+    response = client.get("/status/evt-task/wait?since=0&timeout=1")
+    assert response.status_code == 200
+    assert response.json()["progress"] == 0.25
+
+    task_events.publish("evt-task", status="failed", result="boom")
+    response = client.get("/status/evt-task/events")
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert '"status": "failed"' in response.text
+
+    assert client.get("/status/missing-task/wait?timeout=1").json()["status"] == "not found"
+
+def test_cancel_task_api():
+    from services.auth import API_KEY
+    from storage.task_store import get_task, save_task, update_task_status, update_task_result
+    headers = {"X-API-Key": API_KEY} if API_KEY else {}
+    task_id = str(uuid.uuid4())
+    save_task(task_id, "factorial", {"n": 10})
+    update_task_status(task_id, "in_progress")
+    response = client.delete(f"/tasks/{task_id}", headers=headers)
+    assert response.status_code == 202
+    assert get_task(task_id)["status"] == "cancelling"
+    update_task_result(task_id, 3628800)
+    assert client.delete(f"/tasks/{task_id}", headers=headers).status_code == 409
+    assert client.delete("/tasks/no-such-task", headers=headers).status_code == 404
+
+def test_background_request_joins_running_task():
+    from services.single_flight import flight_key, task_flight
+    task_id, _ = task_flight.claim(flight_key("factorial", 50002))
+    try:
+        response = client.get("/factorial?n=50002")
+        assert task_id in response.json()["result"]
+    finally:
+        task_flight.release(task_id)
+
+def test_metrics_endpoint():
+    client.get("/factorial?n=7")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    sample = 'http_request_seconds_count{method="GET",route="/factorial",status="200"}'
+    assert sample in response.text
+    assert "math_cache_lookups_total" in response.text
+
+def test_pow_modes_api():
+    response = client.post("/pow", json={"base": 2, "exponent": 100, "mode": "int"})
+    assert response.json()["result"] == 2**100
+    response = client.post("/pow", json={"base": 3, "exponent": 10**30, "mode": "mod",
+                                         "modulus": 1000000007})
+    assert response.json()["result"] == pow(3, 10**30, 1000000007)
+    response = client.post("/pow", json={"base": 2, "exponent": 0.5, "mode": "decimal",
+                                         "precision": 30})
+    assert response.json()["result"] == "1.41421356237309504880168872421"
+    assert client.post("/pow", json={"base": 2, "exponent": 0.5, "mode": "int"}).status_code == 422
+    assert client.post("/pow", json={"base": 2.0, "exponent": 5000.0}).status_code == 422
+    assert client.post("/pow", json={"base": 2, "exponent": 100000}).status_code == 422
+    response = client.post("/pow", json={"base": 3, "exponent": 2 * 10**6, "mode": "int"})
+    assert "in background" in response.json()["result"]
+
+def test_pow_modes_reject_non_finite_and_huge_inputs():
+    # Python's JSON parser accepts Infinity and NaN
+    for body in ('{"base": Infinity, "exponent": 2, "mode": "int"}',
+                 '{"base": 2, "exponent": Infinity, "mode": "mod", "modulus": 7}',
+                 '{"base": 2, "exponent": NaN, "mode": "int"}',
+                 '{"base": 2, "exponent": 1e300, "mode": "int"}'):
+        response = client.post("/pow", content=body, headers={"Content-Type": "application/json"})
+        assert response.status_code == 422, body
+    for payload in ({"base": 2, "exponent": 10**400}, {"base": 10**400, "exponent": 2}):
+        assert client.post("/pow", json=payload).status_code == 422
+    response = client.post("/pow", json={"base": 10, "exponent": 1e30, "mode": "decimal"})
+    assert response.status_code == 422
+    assert "too large for a decimal" in response.json()["detail"]
+
+def test_queue_backend_stores_job_before_responding(tmp_path, monkeypatch):
+    from services import background_tasks
+    from services.task_worker import Worker
+    from storage import task_store
+    monkeypatch.setattr(background_tasks, "TASK_BACKEND", "queue")
+    monkeypatch.setattr(task_store, "DB_FILE", tmp_path / "tasks.db")
+    task_store.init_task_db()
+    task_id = client.get("/factorial?n=50003").json()["result"].split()[1]
+    assert task_store.get_task(task_id)["status"] == "queued"
+    Worker(poll=0.01).run(burst=True)
+    # The server relays the worker's updates to long-poll clients
+    state = {"version": 0}
+    for _ in range(5):
+        params = {"since": state["version"], "timeout": 10}
+        state = client.get(f"/status/{task_id}/wait", params=params).json()
+        if state["status"] == "done":
+            break
+    assert state["status"] == "done"
+
+def test_pool_backend_stores_task_before_responding():
+    from storage.task_store import get_task
+    task_id = client.get("/factorial?n=50005").json()["result"].split()[1]
+    assert get_task(task_id) is not None
+
+def test_full_task_queue_returns_503(monkeypatch):
+    from services import background_tasks
+    from services.single_flight import flight_key, task_flight
+    from services.task_runner import QueueFullError
+
+    def full(*args, **kwargs):
+        raise QueueFullError("Task queue is full (0 jobs pending)")
+
+    monkeypatch.setattr(background_tasks, "TASK_BACKEND", "pool")
+    monkeypatch.setattr(background_tasks, "submit", full)
+    response = client.get("/factorial?n=50006")
+    assert response.status_code == 503
+    assert "Task queue is full" in response.json()["detail"]
+    assert "Retry-After" in response.headers
+    new_id, created = task_flight.claim(flight_key("factorial", 50006))
+    task_flight.release(new_id)
+    assert created
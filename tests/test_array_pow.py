@@ -0,0 +1,75 @@
+import math
+import pytest
+from click.testing import CliRunner
+from fastapi.testclient import TestClient
+
+np = pytest.importorskip("numpy")
+
+from cli.main import cli  # noqa: E402
+from main import app  # noqa: E402
+from services.array_pow import compute_arrays  # noqa: E402
+from services.auth import API_KEY  # noqa: E402
+
+client = TestClient(app)
+HEADERS = {"X-API-Key": API_KEY} if API_KEY else {}
+
+def test_chunks_match_one_pass():
+    bases = np.linspace(-3, 3, 1001)
+    exponents = np.linspace(-4, 4, 1001)
+    for operation in ("pow", "log_pow", "log10_pow"):
+        whole = compute_arrays(operation, bases, exponents, chunk=10**6)
+        np.testing.assert_array_equal(compute_arrays(operation, bases, exponents, chunk=7), whole)
+
+def test_log_pow_follows_pow():
+    bases = np.array([10.0, -2.0, -8.0, 0.0, 0.0, 5.0])
+    exponents = np.array([400.0, 3.0, 1 / 3, 0.0, 2.0, -1.0])
+    powers = compute_arrays("pow", bases, exponents)
+    logs = compute_arrays("log_pow", bases, exponents)
+    assert math.isinf(powers[0]) and logs[0] == pytest.approx(400 * math.log(10))
+    assert logs[1] == pytest.approx(math.log(8))
+    assert math.isnan(powers[2]) and math.isnan(logs[2])
+    assert powers[3] == 1.0 and logs[3] == 0.0
+    assert logs[4] == -math.inf
+    assert compute_arrays("log10_pow", 10.0, exponents)[5] == pytest.approx(-1.0)
+
+def test_binary_endpoint_round_trip():
+    pairs = np.array([[2.0, 10.0], [9.0, 0.5], [-8.0, 0.5]], dtype="<f8")
+    response = client.post("/array/pow", content=pairs.tobytes(),
+                           headers={**HEADERS, "Content-Type": "application/octet-stream"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/octet-stream"
+    results = np.frombuffer(response.content, dtype="<f8")
+    assert results[:2].tolist() == [1024.0, 3.0] and math.isnan(results[2])
+    response = client.post("/array/log10_pow?base=10", content=np.arange(4, dtype="<f8").tobytes(),
+                           headers=HEADERS)
+    assert np.frombuffer(response.content, dtype="<f8").tolist() == [0.0, 1.0, 2.0, 3.0]
+    assert client.post("/array/pow", content=b"\0" * 12, headers=HEADERS).status_code == 400
+    assert client.post("/array/sqrt", content=b"", headers=HEADERS).status_code == 404
+    response = client.post("/array/pow", content=b"\0" * 16,
+                           headers={**HEADERS, "Content-Length": "sixteen"})
+    assert response.status_code == 400
+
+def test_json_endpoint():
+    response = client.post("/array/pow", json={"bases": [2, 3, 1e300], "exponents": 2},
+                           headers=HEADERS)
+    assert response.json() == {"operation": "pow", "count": 3, "results": [4.0, 9.0, None]}
+    response = client.post("/array/pow", json={"bases": [2, 3], "exponents": 2},
+                           headers={**HEADERS, "Accept": "application/octet-stream"})
+    assert np.frombuffer(response.content, dtype="<f8").tolist() == [4.0, 9.0]
+    assert client.post("/array/pow", json={"bases": [2], "exponents": [1, 2]},
+                       headers=HEADERS).status_code == 400
+    assert client.post("/array/pow", json={"bases": ["x"], "exponents": 2},
+                       headers=HEADERS).status_code == 422
+
+def test_cli_reads_and_writes_npy(tmp_path):
+    np.save(tmp_path / "bases.npy", np.arange(1, 7).reshape(2, 3))
+    np.save(tmp_path / "exponents.npy", np.full((2, 3), 2.0))
+    output = tmp_path / "out.npy"
+    result = CliRunner().invoke(cli, ["array-pow", "--bases", str(tmp_path / "bases.npy"),
+                                      "--exponents", str(tmp_path / "exponents.npy"),
+                                      "--output", str(output)])
+    assert result.exit_code == 0, result.output
+    assert np.load(output).tolist() == [[1.0, 4.0, 9.0], [16.0, 25.0, 36.0]]
+    result = CliRunner().invoke(cli, ["array-pow", "--base", "2", "--exponent", "3",
+                                      "--output", str(output)])
+    assert result.exit_code == 2
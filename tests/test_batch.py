@@ -0,0 +1,33 @@
+import pytest
+from services import batch
+from services.batch import run_batch
+
+def test_run_batch_dedupes_and_keeps_order(monkeypatch):
+    stored = []
+    monkeypatch.setattr(batch, "store_requests_sqlite_many", lambda rows: stored.extend(rows))
+    results = run_batch([
+        {"op": "fibonacci", "n": 10},
+        {"op": "factorial", "n": 4},
+        {"op": "fibonacci", "n": 10},
+        {"op": "factorial", "n": -1},
+    ])
+    assert [r["result"] for r in results] == [55, 24, 55, None]
+    assert results[3]["error"]
+    assert len(stored) == 2
+
+def test_run_batch_vectorized_pow_matches_scalar():
+    pytest.importorskip("numpy")
+    items = [{"op": "pow", "base": b / 4, "exponent": e} for b in range(1, 9) for e in range(-3, 4)]
+    items.append({"op": "pow", "base": 1e300, "exponent": 2})
+    results = run_batch(items, persist=False)
+    for item, outcome in zip(items[:-1], results):
+        assert outcome["result"] == (item["base"] ** item["exponent"])
+    assert "OverflowError" in results[-1]["error"]
+
+def test_run_batch_rejects_costly_batches(monkeypatch):
+    monkeypatch.setattr(batch, "BATCH_TOTAL_BUDGET", 0.0)
+    with pytest.raises(ValueError, match="predicted to take"):
+        run_batch([{"op": "factorial", "n": 5}], persist=False)
+    # Repeats of one item are only computed, and counted, once
+    monkeypatch.setattr(batch, "BATCH_TOTAL_BUDGET", 1.0)
+    assert len(run_batch([{"op": "factorial", "n": 5}] * 1000, persist=False)) == 1000
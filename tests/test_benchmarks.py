@@ -0,0 +1,14 @@
+from benchmarks.harness import compare, measure, percentile
+
+def test_percentile_and_measure():
+    assert percentile(list(range(101)), 95) == 95
+    stats = measure(lambda: sum(range(100)), repeat=7, extra="x")
+    assert stats["runs"] == 7 and stats["min"] <= stats["median"] <= stats["p99"]
+    assert stats["extra"] == "x"
+
+def test_compare_flags_regressions():
+    baseline = {"results": {"a": {"median": 1.0}, "b": {"median": 1.0}, "gone": {"median": 1.0}}}
+    current = {"results": {"a": {"median": 1.1}, "b": {"median": 1.5}, "new": {"median": 9.0}}}
+    compared = compare(baseline, current, threshold=0.25)
+    rows = {name: regressed for name, _, _, _, regressed in compared}
+    assert rows == {"a": False, "b": True}
@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+import time
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+pytestmark = pytest.mark.skipif(not hasattr(__import__("socket"), "AF_UNIX"),
+                                reason="needs AF_UNIX sockets")
+
+@pytest.fixture
+def workdir(tmp_path):
+    env = {**os.environ, "PYTHONPATH": ROOT, "MATHCLI_SOCKET": str(tmp_path / "mathcli.sock")}
+    os.makedirs(tmp_path / "storage")
+
+    def run(*args, check=True):
+        return subprocess.run([sys.executable, *args], cwd=tmp_path, env=env,
+                              capture_output=True, text=True, check=check, timeout=60)
+
+    run("-c", "from storage.sqlite_store import init_db; from storage.task_store import "
+              "init_task_db; init_db(); init_task_db()")
+    return run
+
+def test_cli_main_imports_no_commands(workdir):
+    out = workdir("-c", "import sys, cli.main; print(sorted(m for m in sys.modules "
+                        "if m.startswith('cli.commands.')))").stdout
+    assert out.strip() == "[]"
+    help_text = workdir("-m", "cli.main", "--help").stdout
+    for name in ("pow", "fibonacci", "factorial", "worker", "daemon"):
+        assert name in help_text
+
+def test_daemon_runs_commands(workdir, tmp_path):
+    assert "Daemon started" in workdir("-m", "cli.main", "daemon", "start").stdout
+    try:
+        assert "Daemon running" in workdir("-m", "cli.client", "daemon", "status").stdout
+        assert "= 55" in workdir("-m", "cli.client", "fibonacci", "--n", "10").stdout
+        failed = workdir("-m", "cli.client", "pow", "--base", "2", "--exp", "x", "--mode", "int",
+                         check=False)
+        assert failed.returncode == 2
+        assert "is not an integer" in failed.stderr
+        # The daemon commits history before answering, so the row is already visible
+        workdir("-m", "cli.client", "export", "--operation", "fibonacci", "--output", "history.csv")
+        assert "55" in (tmp_path / "history.csv").read_text()
+    finally:
+        workdir("-m", "cli.main", "daemon", "stop")
+    time.sleep(0.1)
+    assert "No daemon running" in workdir("-m", "cli.main", "daemon", "status").stdout
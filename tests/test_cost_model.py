@@ -0,0 +1,39 @@
+from services import cost_model
+from services.cost_model import BACKGROUND, INLINE, REJECT, estimate_seconds, route
+
+def test_estimates_grow_with_input():
+    assert estimate_seconds("factorial", 1000) < estimate_seconds("factorial", 100000)
+    assert estimate_seconds("fibonacci", 1000) < estimate_seconds("fibonacci", 10**7)
+    assert estimate_seconds("pow", 2.0, 1000.0) == estimate_seconds("pow", 2.0, 10**9 * 1.0)
+
+def test_route_against_budgets():
+    cost_model.ensure_calibrated()
+    assert route("factorial", 10) == INLINE
+    assert route("pow", 2.5, 3.0) == INLINE
+    assert route("fibonacci", 10**6, inline_budget=0) == BACKGROUND
+    assert route("factorial", 10**9) == REJECT
+    # Costs past float range are rejected, not raised
+    assert route("factorial", 10**300) == REJECT
+    assert route("fibonacci", 10**300) == REJECT
+    assert route("fibonacci_mod", 10**300, 10**9 + 7) == INLINE
+    assert route("pow_int", 3, 10**400) == REJECT
+    # Background tasks store a summary, so rendering does not count toward the limit
+    n = 1_500_000
+    assert estimate_seconds("factorial", n, render=False) <= cost_model.COST_MAX_SECONDS
+    assert route("factorial", n, max_seconds=estimate_seconds("factorial", n) / 2) == BACKGROUND
+    # A float pow is one float, however many digits it would have
+    assert route("pow", 2.0, 100000.0) == INLINE
+
+def test_calibrate_sets_positive_coefficients():
+    coefficients = cost_model.calibrate()
+    assert set(coefficients) == {"factorial", "fibonacci", "pow", "pow_mod", "pow_decimal", "str"}
+    assert all(value > 0 for value in coefficients.values())
+
+def test_pow_modes_route_by_their_own_cost():
+    cost_model.ensure_calibrated()
+    assert route("pow_mod", 3, 10**100, 10**9 + 7) == INLINE
+    assert route("pow_int", 3, 100) == INLINE
+    assert route("pow_int", 3, 10**7) == BACKGROUND
+    assert route("pow_int", 3, 10**12) == REJECT
+    assert route("pow_decimal", "2", "0.5", 50) == INLINE
+    assert route("pow_decimal", "2", "0.5", 5000, inline_budget=0.001) == BACKGROUND
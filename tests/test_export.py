@@ -0,0 +1,26 @@
+import csv
+import gzip
+import io
+import json
+from services.export import stream_export
+
+ROWS = [(i, "pow", "{'base': 2}", str(2**i), "2026-01-01 00:00:00") for i in range(1200)]
+
+def test_csv_export_streams_in_chunks():
+    chunks = list(stream_export(iter(ROWS), "csv"))
+    assert len(chunks) > 1
+    parsed = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert parsed[0] == ["id", "operation", "input_data", "result", "timestamp"]
+    assert parsed[1:] == [[str(c) for c in row] for row in ROWS]
+
+def test_gzip_ndjson_export():
+    data = gzip.decompress(b"".join(stream_export(iter(ROWS), "ndjson", gzip=True)))
+    lines = data.decode().splitlines()
+    assert len(lines) == len(ROWS)
+    assert json.loads(lines[3])["result"] == "8"
+
+def test_columnar_export():
+    data = b"".join(stream_export(iter(ROWS), "columnar"))
+    batches = [json.loads(line) for line in data.splitlines()]
+    assert sum(len(b["id"]) for b in batches) == len(ROWS)
+    assert batches[0]["operation"][0] == "pow"
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+import pytest
+from services.cost_model import estimate_digits
+from services.lanes import Lane, LaneSaturated, lane_for, cheap_lane, expensive_lane
+
+def test_estimate_digits():
+    assert estimate_digits("factorial", 3000) == len(str(__import__("math").factorial(3000)))
+    assert estimate_digits("fibonacci", 5000) == 1045
+    assert estimate_digits("pow", 2, 10) == 4
+    assert lane_for("factorial", 10) is cheap_lane
+    assert lane_for("factorial", 100000) is expensive_lane
+
+def test_lane_rejects_when_saturated():
+    lane = Lane("test", workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def scenario():
+        first = asyncio.ensure_future(lane.run(release.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(LaneSaturated) as exc:
+            await lane.run(lambda: None)
+        assert exc.value.status_code == 503
+        assert exc.value.headers["Retry-After"]
+        release.set()
+        await first
+        assert await lane.run(lambda: 42) == 42
+
+    asyncio.run(scenario())
+
+def test_cancelled_caller_keeps_its_slot_until_the_call_ends():
+    lane = Lane("test", workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def scenario():
+        waiter = asyncio.ensure_future(lane.run(release.wait))
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        # The thread is still busy, so the lane is still full
+        assert lane.pending == 1
+        with pytest.raises(LaneSaturated):
+            await lane.run(lambda: None)
+        release.set()
+        for _ in range(100):
+            if not lane.pending:
+                break
+            await asyncio.sleep(0.01)
+        assert await lane.run(lambda: 42) == 42
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+    assert lane.pending == 0
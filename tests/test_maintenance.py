@@ -0,0 +1,90 @@
+import sqlite3
+import pytest
+from services import maintenance
+from storage import sqlite_store, task_store
+from storage.engine import flush
+
+@pytest.fixture(autouse=True)
+def dbs(tmp_path, monkeypatch):
+    monkeypatch.setattr(sqlite_store, "DB_FILE", tmp_path / "requests.db")
+    monkeypatch.setattr(task_store, "DB_FILE", tmp_path / "tasks.db")
+    monkeypatch.setattr(maintenance, "ARCHIVE_DIR", tmp_path / "archive")
+    sqlite_store.init_db()
+    task_store.init_task_db()
+
+def _store(operation, n, result):
+    sqlite_store.store_request_sqlite(operation, {"n": n}, result)
+
+def test_identical_results_share_one_copy():
+    big = 7 ** 20000
+    for _ in range(3):
+        _store("pow", 20000, big)
+    _store("factorial", 5, 120)
+    flush()
+    report = maintenance.maintain_requests(vacuum=False)
+    blob_size = len(sqlite_store.encode_result(big)[1])
+    assert report["dedupe"] == {"moved": 3, "stored": 1, "bytes_saved": 2 * blob_size}
+    with sqlite3.connect(sqlite_store.DB_FILE) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 1
+    assert sqlite_store.get_request_result(2) == big
+    operations = sorted(row[1] for row in sqlite_store.get_all_requests_sqlite())
+    assert operations == ["factorial", "pow", "pow", "pow"]
+
+def test_retention_archives_oldest_rows(monkeypatch):
+    monkeypatch.setattr(maintenance, "RETENTION_POLICIES", {"factorial": {"max_rows": 2}})
+    for n in range(1, 6):
+        _store("factorial", n, 10 ** 3000 + n)
+    _store("fibonacci", 10, 55)
+    flush()
+    report = maintenance.maintain_requests()
+    assert report["expired"] == 3
+    kept = sorted(row[0] for row in sqlite_store.get_all_requests_sqlite())
+    assert kept == [4, 5, 6]
+    archived = list(maintenance.iter_archive(report["archives"][0]))
+    assert sorted(row["result"] for row in archived) == [10 ** 3000 + n for n in (1, 2, 3)]
+    # Results of archived rows are no longer kept in the results table
+    assert report["orphaned_results"] == 3
+
+def test_max_bytes_and_age(monkeypatch):
+    monkeypatch.setattr(maintenance, "RETENTION_MAX_BYTES", 3000)
+    monkeypatch.setattr(maintenance, "RETENTION_MAX_AGE_DAYS", 30)
+    _store("pow", 1, 2 ** 20000)
+    _store("pow", 2, 2 ** 20000 + 1)
+    _store("factorial", 5, 120)
+    flush()
+    with sqlite3.connect(sqlite_store.DB_FILE) as conn:
+        conn.execute("UPDATE requests SET timestamp = '2000-01-01 00:00:00' "
+                     "WHERE operation = 'factorial'")
+    assert maintenance.maintain_requests(dry_run=True)["expired"] == 2
+    assert len(sqlite_store.get_all_requests_sqlite()) == 3
+    maintenance.maintain_requests()
+    assert [row[2] for row in sqlite_store.get_all_requests_sqlite()] == ["{'n': 2}"]
+
+def test_only_finished_tasks_expire(monkeypatch):
+    monkeypatch.setattr(maintenance, "RETENTION_MAX_ROWS", 1)
+    for task_id in ("a", "b", "c"):
+        task_store.save_task(task_id, "factorial", {"n": 5})
+    task_store.update_task_result("a", 120)
+    task_store.update_task_result("b", 120)
+    report = maintenance.maintain_tasks()
+    assert report["expired"] == 1
+    assert {task["task_id"] for task in task_store.get_all_tasks()} == {"b", "c"}
+
+def test_incremental_vacuum_frees_pages():
+    for n in range(20):
+        _store("pow", n, 3 ** 100000 + n)
+    flush()
+    with sqlite3.connect(sqlite_store.DB_FILE) as conn:
+        conn.execute("DELETE FROM requests")
+    conn = sqlite_store.connect(sqlite_store.DB_FILE, isolation_level=None)
+    try:
+        first = maintenance.incremental_vacuum(conn)
+        assert first["converted"]
+        for n in range(20):
+            conn.execute("INSERT INTO requests (operation, input_data, result) "
+                         "VALUES ('pow', '', ?)", ("x" * 50000,))
+        conn.execute("DELETE FROM requests")
+        second = maintenance.incremental_vacuum(conn)
+        assert not second["converted"] and second["bytes_freed"] > 500000
+    finally:
+        conn.close()
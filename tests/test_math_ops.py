@@ -1,4 +1,12 @@
-from services.math_ops import compute_pow, compute_fibonacci, compute_factorial
+from services.math_ops import (
+    compute_pow, compute_fibonacci, compute_fibonacci_mod, compute_factorial
+)
+
+def _fibonacci_linear(n):
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b
+    return a
 
 def test_compute_pow():
     assert compute_pow(2, 3) == 8
@@ -10,7 +18,71 @@ def test_compute_fibonacci():
     assert compute_fibonacci(1) == 1
     assert compute_fibonacci(10) == 55
 
+def test_compute_fibonacci_matches_linear():
+    for n in list(range(50)) + [1000, 4097]:
+        assert compute_fibonacci(n) == _fibonacci_linear(n)
+
+def test_compute_fibonacci_mod():
+    assert compute_fibonacci_mod(10, 7) == 55 % 7
+    assert compute_fibonacci_mod(1000, 10**9 + 7) == _fibonacci_linear(1000) % (10**9 + 7)
+    assert compute_fibonacci_mod(10**18, 1) == 0
+
 def test_compute_factorial():
     assert compute_factorial(0) == 1
     assert compute_factorial(1) == 1
-    assert compute_factorial(5) == 120
\ No newline at end of file
+    assert compute_factorial(5) == 120
+
+def test_compute_factorial_matches_math():
+    import math
+    for n in list(range(40)) + [1000, 5001]:
+        assert compute_factorial(n) == math.factorial(n)
+
+def test_resume_from_checkpoints():
+    import math
+    from services.checkpoints import factorial_checkpoints, fibonacci_checkpoints
+    from services.math_ops import _fibonacci_pair
+    factorial_checkpoints.clear()
+    fibonacci_checkpoints.clear()
+    factorial_checkpoints.add(2000, math.factorial(2000))
+    fibonacci_checkpoints.add(20000, _fibonacci_pair(20000))
+    assert compute_factorial.__wrapped__(2100) == math.factorial(2100)
+    assert compute_fibonacci.__wrapped__(21000) == _fibonacci_linear(21000)
+    assert factorial_checkpoints.floor(2500)[0] == 2100
+    assert fibonacci_checkpoints.floor(21500)[0] == 21000
+
+def test_checkpoint_store_budget():
+    from services.checkpoints import CheckpointStore
+    store = CheckpointStore(max_bytes=300, min_n=0)
+    store.add(10, 2**1000)
+    store.add(20, 2**1000)
+    store.floor(10)
+    store.add(30, 2**1000)
+    assert store.floor(25)[0] == 10
+    assert store.floor(5) is None
+
+def test_pow_modes():
+    import pytest
+    from decimal import Decimal
+    from services.math_ops import (
+        _windowed_pow, compute_pow_decimal, compute_pow_int, compute_pow_mod, pow_operation
+    )
+    for base, exp in [(3, 0), (3, 1), (-7, 1001), (12345678901234567890, 777), (2, 4096)]:
+        assert _windowed_pow(base, exp) == base ** exp
+    assert compute_pow_int(10**20, 3) == 10**60
+    assert compute_pow_mod(3, 10**100, 10**9 + 7) == pow(3, 10**100, 10**9 + 7)
+    assert compute_pow_decimal("2", "0.5", 20) == Decimal("1.4142135623730950488")
+    assert pow_operation("int", 2.0, 10) == ("pow_int", (2, 10))
+    assert pow_operation("mod", 2, 10, 7) == ("pow_mod", (2, 10, 7))
+    assert pow_operation("decimal", 0.1, 2)[1] == ("0.1", "2", 50)
+    for mode, kwargs in [("int", {"exponent": 0.5}), ("int", {"exponent": -1}),
+                         ("mod", {"exponent": 2}), ("decimal", {"exponent": 2, "precision": 0}),
+                         ("complex", {"exponent": 2})]:
+        with pytest.raises(ValueError):
+            pow_operation(mode, 2, **kwargs)
+    for base, exp in [(2, 10**400), (10**400, 2)]:
+        with pytest.raises(ValueError, match="fit in a float"):
+            pow_operation("float", base, exp)
+    with pytest.raises(ValueError, match="too large"):
+        compute_pow_decimal("10", "1e30", 20)
+    with pytest.raises(ValueError, match="not a real number"):
+        compute_pow_decimal("-2", "0.5", 20)
@@ -0,0 +1,38 @@
+import json
+import logging
+from services.log_config import JsonFormatter
+from services.metrics import Registry, size_bucket
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests", ["op"])
+    depth = registry.gauge("depth", "Queue depth")
+    latency = registry.histogram("latency_seconds", "Latency", ["op"], buckets=(0.1, 1))
+    requests.inc(op="pow")
+    requests.inc(2, op="pow")
+    depth.set_function(lambda: 7)
+    latency.observe(0.05, op="pow")
+    latency.observe(0.5, op="pow")
+    latency.observe(5, op="pow")
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{op="pow"} 3' in text
+    assert "depth 7" in text
+    assert 'latency_seconds_bucket{op="pow",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{op="pow",le="1"} 2' in text
+    assert 'latency_seconds_bucket{op="pow",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{op="pow"} 3' in text
+    assert registry.counter("requests_total", "Requests", ["op"]) is requests
+
+def test_size_bucket():
+    assert size_bucket(12345) == "1e4"
+    assert size_bucket(7) == "1e0"
+    assert size_bucket(0) == "0"
+    assert size_bucket(2.5) == "1e0"
+
+def test_json_log_lines_carry_extra_fields():
+    record = logging.makeLogRecord(
+        {"msg": "stored", "levelname": "DEBUG", "name": "storage", "operation": "pow"}
+    )
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "stored" and entry["operation"] == "pow"
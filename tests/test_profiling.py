@@ -0,0 +1,48 @@
+import time
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from services import profiling
+from services.auth import API_KEY
+
+def spin(seconds):
+    # Pure Python work, so the sampler thread gets the GIL between bytecodes
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+def busy_endpoint():
+    spin(0.1)
+    return {"ok": True}
+
+def make_client():
+    app = FastAPI()
+    app.get("/busy")(busy_endpoint)
+    app.middleware("http")(profiling.profile_requests)
+    return TestClient(app, headers={"X-API-Key": API_KEY} if API_KEY else {})
+
+def test_profiled_request_is_stored(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    client = make_client()
+    assert "X-Profile-Id" not in client.get("/busy").headers
+
+    response = client.get("/busy?profile=1")
+    profile_id = response.headers["X-Profile-Id"]
+    [listed] = profiling.list_profiles()
+    assert listed["id"] == profile_id and listed["path"] == "/busy"
+
+    profile = profiling.load_profile(profile_id)
+    assert any("spin (test_profiling.py" in stack for stack in profile["stacks"])
+    collapsed = profiling.to_collapsed(profile)
+    assert collapsed.splitlines()[0].rsplit(" ", 1)[1].isdigit()
+    speedscope = profiling.to_speedscope(profile)
+    frames = speedscope["shared"]["frames"]
+    samples = speedscope["profiles"][0]["samples"]
+    assert all(0 <= i < len(frames) for sample in samples for i in sample)
+
+def test_unauthorized_requests_are_not_profiled(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    monkeypatch.setattr(profiling, "is_authorized", lambda request: False)
+    response = make_client().get("/busy", headers={"X-Profile": "1"})
+    assert "X-Profile-Id" not in response.headers
+    assert profiling.list_profiles() == []
+    assert profiling.load_profile("../../etc/passwd") is None
@@ -0,0 +1,33 @@
+from services.result_cache import ResultCache, decode_value, encode_value
+
+def test_encode_roundtrip():
+    for value in [0, 1, -1, 255, -256, 10**5000, -(3**1000), 0.5, -2.25]:
+        assert decode_value(*encode_value(value)) == value
+
+def test_memory_budget_evicts_lru(tmp_path):
+    cache = ResultCache(memory_bytes=300, db_file=tmp_path / "cache.db", disk_enabled=False)
+    cache.put("a", 2**1000)
+    cache.put("b", 2**1000)
+    cache.put("c", 2**1000)
+    assert cache.get("a") == (False, None)
+    assert cache.get("c") == (True, 2**1000)
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["memory_bytes"] <= 300
+
+def test_disk_tier_shared_between_instances(tmp_path):
+    db_file = tmp_path / "cache.db"
+    big = 7**20000
+    ResultCache(db_file=db_file).put("factorial:1", big)
+    other = ResultCache(db_file=db_file)
+    assert other.get("factorial:1") == (True, big)
+    assert other.stats()["disk_hits"] == 1
+
+def test_disk_budget_evicts_oldest(tmp_path):
+    cache = ResultCache(disk_bytes=20000, db_file=tmp_path / "cache.db")
+    cache.put("x", 2**100000)
+    cache.put("y", 2**100001)
+    cache.clear()
+    assert cache.get("x") == (False, None)
+    assert cache.get("y")[0]
+    assert cache.stats()["disk_evictions"] == 1
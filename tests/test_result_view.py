@@ -0,0 +1,35 @@
+import random
+import sys
+from services.result_view import (
+    digit_count, digit_range, fast_divmod, leading_digits, summarize, to_decimal
+)
+
+def _str(n):
+    limit = sys.get_int_max_str_digits()
+    sys.set_int_max_str_digits(0)
+    try:
+        return str(n)
+    finally:
+        sys.set_int_max_str_digits(limit)
+
+def test_fast_divmod_matches_builtin():
+    rng = random.Random(7)
+    for _ in range(50):
+        a = rng.getrandbits(rng.randint(1, 50000))
+        b = rng.getrandbits(rng.randint(1, 25000)) + 1
+        assert fast_divmod(a, b) == divmod(a, b)
+
+def test_digit_count_and_decimal():
+    for n in [0, 9, 10, 99, 100, 10**4999, 10**5000 - 1, 10**5000, 3**77777, -(7**9999)]:
+        assert digit_count(n) == len(_str(abs(n)))
+        assert to_decimal(n) == _str(n)
+
+def test_digit_views():
+    n = 3**60000
+    s = _str(n)
+    assert leading_digits(n, 300) == s[:300]
+    for start, length in [(0, 10), (7, 100), (len(s) - 10, 10), (len(s) - 3, 10), (12345, 5000)]:
+        assert digit_range(n, start, length) == s[start:start + length]
+    assert digit_range(n, len(s), 5) == ""
+    assert summarize(n, 20) == f"{s[:20]}... [{len(s)} digits total]"
+    assert summarize(12345, 20) == "12345"
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import pytest
+from services.single_flight import SingleFlight, TaskFlight, flight_key
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def compute(n):
+        calls.append(n)
+        await asyncio.sleep(0.05)
+        return n * 2
+
+    async def scenario():
+        calls_in_flight = (flight.run(flight_key("f", 21), compute, 21) for _ in range(10))
+        results = await asyncio.gather(*calls_in_flight)
+        assert results == [42] * 10
+        # Once finished, the next call runs again
+        assert await flight.run(flight_key("f", 21), compute, 21) == 42
+
+    asyncio.run(scenario())
+    assert calls == [21, 21]
+    assert flight.stats() == {"in_flight": 0, "started": 2, "coalesced": 9}
+
+def test_errors_are_shared_and_not_cached():
+    flight = SingleFlight()
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise ValueError("bad input")
+
+    async def scenario():
+        results = await asyncio.gather(flight.run("k", boom), flight.run("k", boom),
+                                       return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+        assert flight.stats()["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+def test_task_flight_reuses_running_task():
+    flight = TaskFlight()
+    first, created = flight.claim(flight_key("factorial", 500000))
+    assert created
+    # 2 and 2.0 are the same input
+    pow_id = flight.claim(flight_key("pow", 2, 10))[0]
+    assert flight.claim(flight_key("pow", 2.0, 10.0))[0] == pow_id
+    assert flight.claim(flight_key("factorial", 500000)) == (first, False)
+    flight.release(first)
+    assert flight.claim(flight_key("factorial", 500000))[1]
+
+    ids = []
+    threads = [threading.Thread(target=lambda: ids.append(flight.claim("burst")[0]))
+               for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(set(ids)) == 1
+
+def test_task_flight_released_when_submit_fails(monkeypatch):
+    from concurrent.futures.process import BrokenProcessPool
+    from services import background_tasks
+    from services.single_flight import task_flight
+
+    def broken(*args, **kwargs):
+        raise BrokenProcessPool("pool died")
+
+    monkeypatch.setattr(background_tasks, "TASK_BACKEND", "pool")
+    monkeypatch.setattr(background_tasks, "submit", broken)
+    task_id, _ = task_flight.claim(flight_key("factorial", 50004))
+    with pytest.raises(BrokenProcessPool):
+        background_tasks.store_and_compute_factorial(50004, task_id)
+    new_id, created = task_flight.claim(flight_key("factorial", 50004))
+    task_flight.release(new_id)
+    assert created
@@ -0,0 +1,123 @@
+import sqlite3
+import pytest
+from storage import sqlite_store
+from storage.engine import WriteBehindQueue, flush
+
+@pytest.fixture
+def db_file(tmp_path, monkeypatch):
+    path = tmp_path / "requests.db"
+    monkeypatch.setattr(sqlite_store, "DB_FILE", path)
+    return path
+
+def test_int_results_stored_as_blobs(db_file):
+    sqlite_store.init_db()
+    big = 3**50000
+    sqlite_store.store_request_sqlite("pow", {"base": 3, "exponent": 50000}, big)
+    flush(db_file)
+    with sqlite3.connect(db_file) as conn:
+        text, encoding, digits = conn.execute(
+            "SELECT result, result_encoding, result_digits FROM requests"
+        ).fetchone()
+    assert text == sqlite_store.result_preview(big)
+    assert text.endswith(f"... [{digits} digits total]")
+    assert encoding == "int"
+    assert digits == len(str(big))
+    assert sqlite_store.get_request_result(1) == big
+
+def test_digit_counts_are_exact_near_powers_of_ten():
+    from storage.task_store import digit_count as task_digit_count
+    for k in (1, 15, 16, 22, 300):
+        for n, digits in ((10**k - 1, k), (10**k, k + 1)):
+            assert sqlite_store.encode_result(n)[3] == digits
+            assert task_digit_count(n) == digits
+
+def test_compressed_results_roundtrip(db_file, monkeypatch):
+    monkeypatch.setattr(sqlite_store, "RESULT_COMPRESSION", "zlib")
+    sqlite_store.init_db()
+    sqlite_store.store_request_sqlite("factorial", {"n": 5}, 120)
+    assert sqlite_store.get_all_requests_sqlite()[0][3] == "120"
+
+def test_legacy_text_rows_stay_readable(db_file):
+    with sqlite3.connect(db_file) as conn:
+        conn.execute("""
+            CREATE TABLE requests (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                operation TEXT NOT NULL,
+                input_data TEXT NOT NULL,
+                result TEXT NOT NULL,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.execute("INSERT INTO requests (operation, input_data, result) "
+                     "VALUES ('factorial', '{}', '120')")
+    sqlite_store.init_db()
+    sqlite_store.store_request_sqlite("fibonacci", {"n": 10}, 55)
+    results = sorted(row[3] for row in sqlite_store.get_all_requests_sqlite())
+    assert results == ["120", "55"]
+    assert sqlite_store.get_request_result(1) == "120"
+
+def test_write_behind_queue_group_commits(tmp_path):
+    db_file = tmp_path / "batch.db"
+    with sqlite3.connect(db_file) as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+    writer = WriteBehindQueue(db_file, batch_rows=100, interval=0.05)
+    for i in range(1000):
+        writer.put("INSERT INTO t (x) VALUES (?)", (i,))
+    writer.flush()
+    with sqlite3.connect(db_file) as conn:
+        assert conn.execute("SELECT COUNT(*), SUM(x) FROM t").fetchone() == (1000, 499500)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+def test_write_behind_queue_reports_failure(tmp_path):
+    writer = WriteBehindQueue(tmp_path / "missing" / "batch.db")
+    # The put may land before or after the writer thread fails to connect
+    with pytest.raises(sqlite3.OperationalError):
+        writer.put("INSERT INTO t (x) VALUES (?)", (1,))
+        writer.flush()
+    with pytest.raises(sqlite3.OperationalError):
+        writer.put("INSERT INTO t (x) VALUES (?)", (2,))
+
+def test_get_requests_page_keyset(db_file):
+    sqlite_store.init_db()
+    for n in range(25):
+        sqlite_store.store_request_sqlite("factorial" if n % 2 else "fibonacci", {"n": n}, n)
+    rows, cursor = sqlite_store.get_requests_page(limit=10)
+    assert [r[0] for r in rows] == list(range(25, 15, -1))
+    rows, cursor = sqlite_store.get_requests_page(limit=10, before=cursor)
+    assert [r[0] for r in rows] == list(range(15, 5, -1))
+    rows, cursor = sqlite_store.get_requests_page(limit=10, before=cursor)
+    assert [r[0] for r in rows] == [5, 4, 3, 2, 1]
+    assert cursor is None
+    rows, _ = sqlite_store.get_requests_page(limit=None, operation="factorial")
+    assert len(rows) == 12 and all(r[1] == "factorial" for r in rows)
+    for cursor in ("garbage", "x|y"):
+        with pytest.raises(sqlite_store.InvalidCursorError):
+            sqlite_store.get_requests_page(before=cursor)
+
+def test_history_query_uses_index(db_file):
+    sqlite_store.init_db()
+    plan = sqlite_store.get_connection(db_file).execute("""
+        EXPLAIN QUERY PLAN SELECT id FROM requests WHERE operation = ?
+        ORDER BY timestamp DESC, id DESC LIMIT 11
+    """, ("pow",)).fetchall()
+    assert "idx_requests_operation_timestamp" in str(plan)
+
+def test_history_previews_and_write_version(db_file):
+    sqlite_store.init_db()
+    big = 7**20000
+    version, _ = sqlite_store.get_requests_version()
+    sqlite_store.store_request_sqlite("pow", {"base": 7, "exponent": 20000}, big)
+    sqlite_store.store_request_sqlite("factorial", {"n": 5}, 120)
+    assert sqlite_store.get_requests_version()[0] == version + 2
+    # A row stored before previews existed gets one computed, without a
+    # write that would bump the version, until init_db() fills it in
+    with sqlite_store.get_connection(db_file) as conn:
+        conn.execute("UPDATE requests SET result = '' WHERE id = 1")
+    version = sqlite_store.get_requests_version()[0]
+    rows, _ = sqlite_store.get_requests_page(limit=10, preview=True)
+    assert [row[3] for row in rows] == ["120", sqlite_store.result_preview(big)]
+    assert sqlite_store.get_requests_version()[0] == version
+    sqlite_store.init_db()
+    with sqlite3.connect(db_file) as conn:
+        assert conn.execute("SELECT result FROM requests WHERE id = 1").fetchone()[0] == rows[1][3]
+    assert sqlite_store.get_request_result(1) == big
@@ -0,0 +1,47 @@
+import asyncio
+import threading
+from services.progress import report, reporting, throttled
+from services.task_events import TaskEventBus
+from services.math_ops import compute_factorial
+
+def test_publish_merges_state_and_bumps_version():
+    bus = TaskEventBus()
+    bus.publish("t1", status="queued", progress=0.0)
+    event = bus.publish("t1", progress=0.5)
+    assert event == {"task_id": "t1", "version": 2, "status": "queued", "progress": 0.5}
+    assert bus.latest("t1") == event
+    assert bus.latest("missing") is None
+
+def test_wait_returns_on_publish_from_another_thread():
+    bus = TaskEventBus()
+    bus.publish("t1", status="in_progress")
+
+    async def scenario():
+        assert (await bus.wait("t1", since=0, timeout=1))["version"] == 1
+        timer = threading.Timer(0.05, bus.publish, args=("t1",), kwargs={"status": "done"})
+        timer.start()
+        event = await bus.wait("t1", since=1, timeout=5)
+        assert event["status"] == "done" and event["version"] == 2
+        # Nothing newer: the current state comes back after the timeout
+        assert (await bus.wait("t1", since=2, timeout=0.05))["version"] == 2
+
+    asyncio.run(scenario())
+
+def test_bus_forgets_oldest_tasks():
+    bus = TaskEventBus(max_tasks=2)
+    for task_id in ("a", "b", "c"):
+        bus.publish(task_id, status="queued")
+    assert bus.latest("a") is None and bus.latest("c") is not None
+
+def test_progress_reports_reach_callback():
+    seen = []
+    report(0.5)  # no-op outside reporting()
+    with reporting(seen.append):
+        compute_factorial.__wrapped__(20000)
+    assert seen and seen == sorted(seen) and seen[-1] == 1.0
+
+    throttled_seen = []
+    callback = throttled(throttled_seen.append, min_interval=60)
+    for fraction in (0.1, 0.2, 0.3, 1.0):
+        callback(fraction)
+    assert throttled_seen == [0.1, 1.0]
@@ -0,0 +1,86 @@
+import time
+import pytest
+from services.task_worker import Worker
+from storage import sqlite_store, task_store
+from storage.task_store import (
+    claim_task, enqueue_task, get_task, init_task_db, recover_expired_tasks,
+    renew_leases, request_cancel
+)
+
+@pytest.fixture(autouse=True)
+def task_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(task_store, "DB_FILE", tmp_path / "tasks.db")
+    monkeypatch.setattr(sqlite_store, "DB_FILE", tmp_path / "requests.db")
+    init_task_db()
+    sqlite_store.init_db()
+
+def _enqueue(task_id, operation="factorial", args=(5,), max_pending=10):
+    job = {
+        "operation": operation, "args": list(args), "input": {"n": args[0]}, "record_as": operation
+    }
+    return enqueue_task(task_id, operation, {"n": args[0]}, job, max_pending)
+
+def test_claim_is_exclusive_and_leased():
+    assert _enqueue("a")
+    task_id, job, attempts = claim_task("worker-1", 30)
+    assert (task_id, job["operation"], attempts) == ("a", "factorial", 1)
+    assert claim_task("worker-2", 30) is None
+    assert get_task("a")["status"] == "in_progress"
+    assert renew_leases("worker-1", 30) == 1
+    assert renew_leases("worker-2", 30) == 0
+
+def test_expired_lease_is_requeued_until_out_of_attempts():
+    assert _enqueue("a")
+    for attempt in (1, 2):
+        assert claim_task("dead-worker", -1)[2] == attempt
+        assert recover_expired_tasks(max_attempts=2) == ((1, 0, 0) if attempt == 1 else (0, 1, 0))
+    task = get_task("a")
+    assert task["status"] == "failed" and "lease expired" in task["result"]
+
+def test_enqueue_respects_max_pending():
+    assert _enqueue("a", max_pending=1)
+    assert not _enqueue("b", max_pending=1)
+
+def test_cancelling_an_unclaimed_job_is_immediate():
+    assert _enqueue("a")
+    assert request_cancel("a")
+    assert get_task("a")["status"] == "cancelled"
+    assert claim_task("worker-1", 30) is None
+
+def test_worker_runs_jobs_and_stores_history():
+    assert _enqueue("a", args=(10,))
+    assert _enqueue("b", operation="pow_mod", args=(3, 5, 0))
+    worker = Worker(poll=0.01)
+    worker.run(burst=True)
+    assert worker.completed == 1
+    assert get_task("a")["status"] == "done" and get_task("a")["result"] == "3628800"
+    # Bad input is not retried
+    assert get_task("b")["status"] == "failed"
+    assert sqlite_store.get_all_requests_sqlite()[0][1] == "factorial"
+
+def test_worker_retries_unexpected_errors(monkeypatch):
+    from services import task_worker
+    calls = []
+
+    def flaky(n):
+        calls.append(n)
+        if len(calls) == 1:
+            raise OSError("disk hiccup")
+        return n
+
+    monkeypatch.setitem(task_worker.OPERATIONS, "factorial", flaky)
+    assert _enqueue("a")
+    Worker(poll=0.01, retry_delay=0).run(burst=True)
+    assert len(calls) == 2
+    assert get_task("a")["status"] == "done"
+
+def test_stopped_worker_gives_the_job_back():
+    assert _enqueue("a", args=(3_000_000,))
+    worker = Worker(poll=0.01)
+    started = time.monotonic()
+    worker.stop()
+    assert worker.run_one()
+    assert time.monotonic() - started < 5
+    task = get_task("a")
+    assert task["status"] == "queued"
+    assert claim_task("worker-2", 30)[2] == 1
@@ -0,0 +1,18 @@
+import pytest
+from services.task_runner import submit
+
+def test_submit_returns_result():
+    assert submit("factorial", 10).result(timeout=60) == 3628800
+    assert submit("fibonacci", 10).result(timeout=60) == 55
+
+def test_submit_unknown_operation():
+    with pytest.raises(ValueError):
+        submit("sqrt", 4)
+
+def test_cancelled_job_stops_at_checkpoint(monkeypatch):
+    from services import task_runner
+    from services.progress import Cancelled
+    monkeypatch.setattr(task_runner, "is_cancel_requested", lambda task_id: True)
+    with pytest.raises(Cancelled):
+        task_runner._compute("factorial", (50000,), "cancel-me")
+    assert task_runner._compute("factorial", (5,)) == 120